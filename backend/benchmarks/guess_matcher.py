@@ -0,0 +1,97 @@
+"""
+Career Path tahmin çözümleme benchmark'ı
+
+Builds a 50k-player catalog from recombined real first names / surnames
+(diacritics included) and times PlayerCatalog.resolve() for exact,
+accent-free, surname-only and misspelled guesses, counting how many
+resolve to the intended player, to another player, or to nobody.
+
+    python benchmarks/guess_matcher.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from player_catalog import PlayerCatalog  # noqa: E402
+from popular_players import POPULAR_PLAYERS  # noqa: E402
+from text_folding import fold  # noqa: E402
+
+
+def synthetic_players(count: int):
+    firsts, lasts = set(), set()
+    for player in POPULAR_PLAYERS:
+        words = player["name"].split()
+        if len(words) > 1:
+            firsts.add(words[0])
+            lasts.add(" ".join(words[1:]))
+    firsts, lasts = sorted(firsts), sorted(lasts)
+    names = {player["name"] for player in POPULAR_PLAYERS}
+    while len(names) < count:
+        names.add(f"{random.choice(firsts)} {random.choice(lasts)}")
+    return [{"name": name, "nationality": "", "position": "", "difficulty": "medium"} for name in names]
+
+
+def misspell(text: str, edits: int) -> str:
+    chars = list(text)
+    for _ in range(edits):
+        i = random.randrange(len(chars))
+        op = random.randint(0, 3)
+        if op == 0:
+            chars[i] = random.choice("abcdefghijklmnopqrstuvwxyz")
+        elif op == 1 and len(chars) > 1:
+            del chars[i]
+        elif op == 2:
+            chars.insert(i, random.choice("abcdefghijklmnopqrstuvwxyz"))
+        elif i + 1 < len(chars):
+            chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    return "".join(chars)
+
+
+def timed(catalog: PlayerCatalog, label: str, guesses, expected=None):
+    times = []
+    hits = unresolved = 0
+    for i, guess in enumerate(guesses):
+        started = time.perf_counter()
+        entry = catalog.resolve(guess)
+        times.append(time.perf_counter() - started)
+        if entry is None:
+            unresolved += 1
+        elif expected is not None and entry.player is expected[i]:
+            hits += 1
+    times.sort()
+    line = (
+        f"{label:<26} mean {sum(times) / len(times) * 1e6:7.1f} µs   "
+        f"p50 {times[len(times) // 2] * 1e6:7.1f} µs   p99 {times[int(len(times) * 0.99)] * 1e6:7.1f} µs"
+    )
+    if expected is not None:
+        # Yanlış oyuncu, çözülemeyenden (belirsiz tahmin) daha kötü
+        wrong = len(guesses) - hits - unresolved
+        line += f"   original {hits / len(guesses):.0%}  wrong {wrong / len(guesses):.1%}  none {unresolved / len(guesses):.0%}"
+    print(line)
+
+
+def main():
+    random.seed(20)
+    players = synthetic_players(50_000)
+    started = time.perf_counter()
+    catalog = PlayerCatalog(players)
+    print(f"{len(players)} players, catalog built in {time.perf_counter() - started:.2f} s\n")
+
+    sample = random.sample(players, 2000)
+    names = [p["name"] for p in sample]
+    folded = [fold(name) for name in names]
+    # fold önbelleğini ısıtmayalım: her sorgu büyük harfle farklı bir metin
+    timed(catalog, "exact name", names, sample)
+    timed(catalog, "accent/case folded", [f.upper() for f in folded], sample)
+    timed(catalog, "surname only", [f.split()[-1].title() + " " for f in folded])
+    timed(catalog, "1 typo", [misspell(f, 1).title() for f in folded], sample)
+    timed(catalog, "2 typos", [misspell(f, 2).title() for f in folded], sample)
+    timed(catalog, "no such player", [misspell("zzqx " + f, 3).title() for f in folded])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Lig / seri bonusu arama mikro-benchmark'ı
+
+Compares the previous linear-scan implementations (copied below) with the
+compiled tables in game_systems, and checks both give the same answers.
+
+    python benchmarks/league_lookup.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_systems import LEAGUES, STREAK_BONUSES, get_league_for_elo, get_streak_bonus  # noqa: E402
+
+
+def legacy_league_for_elo(elo: int) -> dict:
+    for league_id, league in LEAGUES.items():
+        if league["min_elo"] <= elo <= league["max_elo"]:
+            return {"id": league_id, **league}
+    return {"id": "bronze", **LEAGUES["bronze"]}
+
+
+def legacy_streak_bonus(streak: int) -> dict:
+    bonus = None
+    for streak_count, streak_bonus in sorted(STREAK_BONUSES.items(), reverse=True):
+        if streak >= streak_count:
+            bonus = {"streak_count": streak_count, **streak_bonus}
+            break
+    return bonus
+
+
+def compare(name: str, legacy, compiled, inputs, number: int):
+    legacy_time = timeit.timeit(lambda: [legacy(x) for x in inputs], number=number)
+    compiled_time = timeit.timeit(lambda: [compiled(x) for x in inputs], number=number)
+    calls = len(inputs) * number
+    print(
+        f"{name:<22} legacy {legacy_time / calls * 1e9:7.0f} ns/call   "
+        f"compiled {compiled_time / calls * 1e9:7.0f} ns/call   "
+        f"x{legacy_time / compiled_time:.1f}"
+    )
+
+
+def main():
+    random.seed(7)
+    # max_elo üstü (>9999) eski sürümde bronze'a düşüyordu; karşılaştırmayı aralık içinde tut
+    elos = [random.randint(0, 9999) for _ in range(1000)]
+    streaks = [random.randint(0, 15) for _ in range(1000)]
+
+    assert all(legacy_league_for_elo(e) == get_league_for_elo(e) for e in elos)
+    assert all(legacy_streak_bonus(s) == get_streak_bonus(s) for s in streaks)
+
+    compare("get_league_for_elo", legacy_league_for_elo, get_league_for_elo, elos, 200)
+    compare("get_streak_bonus", legacy_streak_bonus, get_streak_bonus, streaks, 200)
+
+    # /game-systems/global-leaderboard: 100 satır = 100 lig araması
+    page = elos[:100]
+    compare("leaderboard page (100)", lambda _: [legacy_league_for_elo(e) for e in page],
+            lambda _: [get_league_for_elo(e) for e in page], [None], 2000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+OAuth session-data çağrısı: istek başına istemci vs paylaşılan havuz
+
+Starts a local stub of the session-data endpoint (plain HTTP on
+127.0.0.1, counting accepted TCP connections) and sends a burst of
+exchanges first with a new httpx.AsyncClient per call, the way
+/auth/session used to, then through one OutboundClient. Then the stub
+starts failing, to show retries and the circuit breaker opening.
+
+The same stub works for manual testing of the server:
+    python benchmarks/oauth_exchange.py serve 8765
+    OAUTH_SESSION_DATA_URL=http://127.0.0.1:8765/session-data python server.py
+
+    python benchmarks/oauth_exchange.py [calls] [concurrency]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from outbound_http import CircuitBreaker, CircuitOpen, OutboundClient  # noqa: E402
+
+
+class StubSessionServer:
+    """Minimal keep-alive HTTP/1.1 server answering every GET with session data"""
+
+    def __init__(self, latency: float = 0.002):
+        self.latency = latency
+        self.status = 200
+        self.connections = 0
+        self.requests = 0
+        self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                session_id = ""
+                for line in head.decode("latin-1").split("\r\n")[1:]:
+                    name, _, value = line.partition(":")
+                    if name.lower() == "x-session-id":
+                        session_id = value.strip()
+                self.requests += 1
+                await asyncio.sleep(self.latency)
+                body = json.dumps({
+                    "id": session_id,
+                    "email": f"{session_id}@example.com",
+                    "name": "Stub User",
+                    "picture": None,
+                    "session_token": f"provider_{session_id}",
+                }).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {self.status} X\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, port: int = 0) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", port)
+        return f"http://127.0.0.1:{self._server.sockets[0].getsockname()[1]}/session-data"
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+
+async def per_call_client(url: str, session_id: str):
+    async with httpx.AsyncClient() as http_client:
+        resp = await http_client.get(url, headers={"X-Session-ID": session_id})
+        resp.raise_for_status()
+        return resp.json()
+
+
+async def shared_client(client: OutboundClient, url: str, session_id: str):
+    resp = await client.get(url, headers={"X-Session-ID": session_id})
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def burst(label: str, stub: StubSessionServer, call, calls: int, concurrency: int):
+    stub.connections = stub.requests = 0
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with gate:
+            started = time.perf_counter()
+            await call(f"sid{i}")
+            return time.perf_counter() - started
+
+    started = time.perf_counter()
+    times = sorted(await asyncio.gather(*(one(i) for i in range(calls))))
+    elapsed = time.perf_counter() - started
+    print(
+        f"{label:<22} {elapsed:6.2f} s  {calls / elapsed:7.0f} req/s  "
+        f"p50 {times[len(times) // 2] * 1e3:6.1f} ms  p99 {times[int(len(times) * 0.99)] * 1e3:6.1f} ms  "
+        f"{stub.connections:5d} TCP connections"
+    )
+
+
+async def main(calls: int, concurrency: int):
+    stub = StubSessionServer()
+    url = await stub.start()
+    print(f"{calls} exchanges, {concurrency} concurrent, stub latency {stub.latency * 1e3:.0f} ms\n")
+
+    await burst("client per call", stub, lambda sid: per_call_client(url, sid), calls, concurrency)
+    client = OutboundClient(max_connections=concurrency, max_keepalive=concurrency)
+    await burst("shared OutboundClient", stub, lambda sid: shared_client(client, url, sid), calls, concurrency)
+    await client.stop()
+
+    # Karşı taraf 503 dönmeye başlarsa: sınırlı retry, sonra devre açılır
+    stub.status = 503
+    stub.requests = 0
+    client = OutboundClient(retries=2, backoff=0.01, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=0.2))
+    outcomes = []
+    for i in range(6):
+        try:
+            outcomes.append(str((await client.get(url)).status_code))
+        except CircuitOpen:
+            outcomes.append("open")
+    print(f"\nupstream 503: {' '.join(outcomes)}  ({stub.requests} upstream requests)")
+    stub.status = 200
+    await asyncio.sleep(0.25)
+    print(f"after reset_timeout: {(await client.get(url)).status_code}, circuit {client.breaker.state}")
+    print(client.stats())
+    await client.stop()
+    await stub.stop()
+
+
+async def serve(port: int):
+    stub = StubSessionServer(latency=0)
+    print(f"stub session-data at {await stub.start(port)}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == "serve":
+        asyncio.run(serve(int(args[1]) if len(args) > 1 else 8765))
+    else:
+        asyncio.run(main(int(args[0]) if args else 500, int(args[1]) if len(args) > 1 else 20))
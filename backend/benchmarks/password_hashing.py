@@ -0,0 +1,78 @@
+"""
+Giriş patlaması sırasında event loop gecikmesi
+
+Simulates a burst of concurrent logins (bcrypt verify) while a 5 ms
+heartbeat task measures how late the event loop wakes it up, which is
+what a live Socket.IO match on the same worker would feel. Compares
+inline bcrypt (the previous verify_password) with PasswordHasher.
+
+    python benchmarks/password_hashing.py [rounds] [logins]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import bcrypt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from password_hasher import HasherOverloaded, PasswordHasher  # noqa: E402
+
+HEARTBEAT = 0.005
+
+
+async def heartbeat(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        expected = time.perf_counter() + HEARTBEAT
+        await asyncio.sleep(HEARTBEAT)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def legacy_login(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+async def burst(label: str, login, logins: int):
+    lags = []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(logins)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await beat
+
+    ok = sum(1 for r in results if r is True)
+    shed = sum(1 for r in results if isinstance(r, HasherOverloaded))
+    lags.sort()
+    print(
+        f"{label:<24} {elapsed:6.2f} s  {ok:4d} ok  {shed:4d} shed (503)   loop lag "
+        f"p50 {lags[len(lags) // 2] * 1e3:7.1f} ms  p99 {lags[int(len(lags) * 0.99)] * 1e3:7.1f} ms  "
+        f"max {lags[-1] * 1e3:7.1f} ms"
+    )
+
+
+async def main(rounds: int, logins: int):
+    password = "correct horse battery staple"
+    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+    print(f"bcrypt cost {rounds}, {logins} concurrent logins, heartbeat every {HEARTBEAT * 1e3:.0f} ms\n")
+
+    await burst("inline bcrypt", lambda: legacy_login(password, hashed), logins)
+
+    hasher = PasswordHasher(rounds=rounds, max_queue=logins)
+    await burst(f"pool ({hasher.max_workers} threads)", lambda: hasher.verify(password, hashed), logins)
+    hasher.shutdown()
+
+    # Kuyruk sınırı: fazlası hemen 503 alır, kabul edilenlerin bekleme süresi sınırlı kalır
+    hasher = PasswordHasher(rounds=rounds, max_queue=8)
+    await burst("pool, max_queue=8", lambda: hasher.verify(password, hashed), logins)
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main(int(args[0]) if args else 10, int(args[1]) if len(args) > 1 else 64))
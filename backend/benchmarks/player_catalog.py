@@ -0,0 +1,107 @@
+"""
+Career Path oyuncu arama mikro-benchmark'ı
+
+Compares the previous per-request scans of POPULAR_PLAYERS (copied below)
+with PlayerCatalog on the real list and on a synthetic 100k-player
+catalog, and checks both give the same answers.
+
+    python benchmarks/player_catalog.py
+"""
+
+import os
+import random
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from player_catalog import PlayerCatalog  # noqa: E402
+from popular_players import POPULAR_PLAYERS  # noqa: E402
+
+
+def legacy_check(players, player_name: str, guess: str):
+    player = next((p for p in players if p["name"].lower() == player_name.lower()), None)
+    if not player:
+        return None
+    is_correct = guess.lower().strip() == player["name"].lower()
+    hints = []
+    if not is_correct:
+        guessed_player = next((p for p in players if p["name"].lower() == guess.lower().strip()), None)
+        if guessed_player:
+            hints.append(guessed_player["nationality"] == player["nationality"])
+            hints.append(guessed_player["position"] == player["position"])
+            guessed_teams = set([t["team"] for t in guessed_player.get("team_history", [])])
+            player_teams = set([t["team"] for t in player.get("team_history", [])])
+            hints.append(sorted(guessed_teams.intersection(player_teams)))
+    return is_correct, hints
+
+
+def catalog_check(catalog: PlayerCatalog, player_name: str, guess: str):
+    target = catalog.entry(player_name)
+    if not target:
+        return None
+    is_correct = guess.lower().strip() == target.player["name"].lower()
+    hints = []
+    if not is_correct:
+        guessed = catalog.entry(guess.strip())
+        if guessed:
+            hints.append(guessed.nationality == target.nationality)
+            hints.append(guessed.position == target.position)
+            hints.append(sorted(guessed.teams & target.teams))
+    return is_correct, hints
+
+
+def legacy_random(players, difficulty: str):
+    bucket = [p for p in players if p.get("difficulty") == difficulty]
+    return random.choice(bucket or players)
+
+
+def synthetic_players(count: int):
+    teams = [f"Team {i}" for i in range(400)]
+    countries = [f"Country {i}" for i in range(120)]
+    positions = ["Kaleci", "Defans", "Orta Saha", "Forvet"]
+    return [{
+        "name": f"Player {i:06d}",
+        "nationality": random.choice(countries),
+        "position": random.choice(positions),
+        "difficulty": random.choice(["easy", "medium", "hard"]),
+        "team_history": [{"team": t} for t in random.sample(teams, random.randint(1, 6))],
+    } for i in range(count)]
+
+
+def compare(name: str, legacy, compiled, number: int):
+    legacy_time = timeit.timeit(legacy, number=number) / number
+    compiled_time = timeit.timeit(compiled, number=number) / number
+    print(
+        f"{name:<28} legacy {legacy_time * 1e6:10.1f} µs   "
+        f"catalog {compiled_time * 1e6:6.2f} µs   x{legacy_time / compiled_time:,.0f}"
+    )
+
+
+def run(label: str, players, number: int):
+    started = time.perf_counter()
+    catalog = PlayerCatalog(players)
+    print(f"\n{label}: {len(players)} players, catalog built in {(time.perf_counter() - started) * 1e3:.1f} ms")
+
+    names = [p["name"] for p in players]
+    pairs = [(random.choice(names), random.choice(names).upper() + " ") for _ in range(200)]
+    pairs += [(random.choice(names), "nobody"), ("nobody", "x")]
+    for player_name, guess in pairs:
+        assert legacy_check(players, player_name, guess) == catalog_check(catalog, player_name, guess)
+
+    player_name, guess = pairs[0]
+    compare("check-guess (wrong guess)", lambda: legacy_check(players, player_name, guess),
+            lambda: catalog_check(catalog, player_name, guess), number)
+    compare("random-player (medium)", lambda: legacy_random(players, "medium"),
+            lambda: catalog.random_player("medium"), number)
+
+
+def main():
+    random.seed(19)
+    run("POPULAR_PLAYERS", POPULAR_PLAYERS, 200)
+    run("synthetic", synthetic_players(100_000), 5)
+
+
+if __name__ == "__main__":
+    main()
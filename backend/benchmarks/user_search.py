@@ -0,0 +1,79 @@
+"""
+Kullanıcı adı arama benchmark'ı (bellek içi infix / fuzzy katmanları)
+
+Builds UsernameIndex over growing numbers of synthetic usernames (first
+name + surname fragments + digits, as people pick them) and times one
+20-row page of infix and one-typo matches for queries sampled from the
+index. The exact / prefix tiers are range scans on the
+(username_key, user_id) Mongo index and are not measured here.
+
+    python benchmarks/user_search.py [max_users]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from popular_players import POPULAR_PLAYERS  # noqa: E402
+from user_search import START, UsernameIndex, username_key  # noqa: E402
+
+
+def synthetic_usernames(count: int):
+    words = sorted({word for player in POPULAR_PLAYERS for word in player["name"].split() if len(word) > 2})
+    for i in range(count):
+        name = random.choice(words)
+        if random.random() < 0.5:
+            name += random.choice(words)[:random.randint(2, 5)]
+        if random.random() < 0.6:
+            name += str(random.randint(1, 9999))
+        yield f"user_{i:08x}", name
+
+
+def misspell(text: str) -> str:
+    i = random.randrange(len(text))
+    return text[:i] + random.choice("abcdefghijklmnopqrstuvwxyz") + text[i + 1:]
+
+
+def timed(label: str, queries, search):
+    times = []
+    rows = 0
+    for query in queries:
+        started = time.perf_counter()
+        rows += len(search(query))
+        times.append(time.perf_counter() - started)
+    times.sort()
+    print(
+        f"  {label:<8} mean {sum(times) / len(times) * 1e6:8.1f} µs   p50 {times[len(times) // 2] * 1e6:8.1f} µs   "
+        f"p99 {times[int(len(times) * 0.99)] * 1e6:8.1f} µs   {rows / len(queries):5.1f} rows/page"
+    )
+
+
+def main(max_users: int):
+    random.seed(25)
+    count = 50_000
+    while count <= max_users:
+        users = list(synthetic_usernames(count))
+        index = UsernameIndex()
+        started = time.perf_counter()
+        index.load(users)
+        print(f"{count:>9} users, index built in {time.perf_counter() - started:.2f} s")
+
+        keys = [username_key(name) for _, name in random.sample(users, 500)]
+        # Anahtarın ortasından 4-6 karakter: infix
+        infix = []
+        for key in keys:
+            if len(key) >= 6:
+                start = random.randrange(1, len(key) - 4)
+                infix.append(key[start:start + random.randint(4, 6)])
+        timed("infix", infix, lambda q: index.infix(q, START, None, 21))
+        timed("fuzzy", [misspell(key) for key in keys if len(key) >= 6],
+              lambda q: index.fuzzy(q, START, None, 21))
+        count *= 4
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 800_000)
@@ -7,6 +7,7 @@ import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
+from player_pool import bump_pool_version
 from pathlib import Path
 import random
 
@@ -907,6 +908,10 @@ async def generate_comprehensive_database():
     for league in leagues[:10]:
         print(f"  {league['_id']}: {league['count']} teams")
     
+    # Çalışan sunucuların oyuncu havuzunu yenilemesi için
+    version = await bump_pool_version(db)
+    print(f"Player pool version: {version}")
+    
     client.close()
     print("\n✅ Database ready for use!")
 
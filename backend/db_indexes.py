@@ -0,0 +1,321 @@
+"""
+Index Provisioning - server.py'nin sorguladığı tüm koleksiyonlar için index'ler
+
+Runs on app startup and from the command line:
+    python db_indexes.py           # ensure indexes + print query report
+    python db_indexes.py --report  # only print the query report (no DB)
+"""
+
+import ast
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+SERVER_SOURCE = Path(__file__).parent / "server.py"
+
+# (collection, keys, options) - isimler sabit, create_index tekrar çalıştırılınca no-op
+INDEXES = [
+    # users
+    ("users", [("user_id", ASCENDING)], {"name": "user_id_unique", "unique": True}),
+    ("users", [("email", ASCENDING)], {"name": "email_unique", "unique": True}),
+    # OAuth ile gelen kullanıcılar profili tamamlayana kadar username="" taşıyor
+    ("users", [("username", ASCENDING)], {
+        "name": "username_unique",
+        "unique": True,
+        "partialFilterExpression": {"username": {"$type": "string", "$gt": ""}}
+    }),
+    # /users/search: exact / önek sorguları + diğer worker'lardaki ad değişikliklerinin taranması
+    ("users", [("username_key", ASCENDING), ("user_id", ASCENDING)], {"name": "username_key_user_id"}),
+    ("users", [("username_updated_at", ASCENDING)], {"name": "username_updated_at"}),
+    ("users", [("stats.points", DESCENDING)], {"name": "stats_points_desc"}),
+    ("users", [("location", ASCENDING), ("stats.points", DESCENDING)], {"name": "location_points"}),
+    ("users", [("elo", DESCENDING)], {"name": "elo_desc"}),
+    ("users", [("career_path_stats.high_score", DESCENDING)], {"name": "career_high_score_desc"}),
+    # user_sessions
+    ("user_sessions", [("session_token", ASCENDING)], {"name": "session_token_unique", "unique": True}),
+    ("user_sessions", [("user_id", ASCENDING)], {"name": "user_id"}),
+    ("user_sessions", [("expires_at", ASCENDING)], {"name": "expires_at_ttl", "expireAfterSeconds": 0}),
+    # revoked_sessions: imzalı token iptalleri, token süresi dolunca Mongo siler
+    ("revoked_sessions", [("expires_at", ASCENDING)], {"name": "expires_at_ttl", "expireAfterSeconds": 0}),
+    ("revoked_sessions", [("created_at", ASCENDING)], {"name": "created_at"}),
+    # password_resets
+    ("password_resets", [("token", ASCENDING)], {"name": "token_unique", "unique": True}),
+    ("password_resets", [("expires_at", ASCENDING)], {"name": "expires_at_ttl", "expireAfterSeconds": 0}),
+    # daily_tasks
+    ("daily_tasks", [("user_id", ASCENDING), ("date", ASCENDING)], {"name": "user_date_unique", "unique": True}),
+    # daily / weekly leaderboards
+    ("daily_scores", [("date", ASCENDING), ("points", DESCENDING)], {"name": "date_points"}),
+    ("weekly_scores", [("week_start", ASCENDING), ("points", DESCENDING)], {"name": "week_points"}),
+    # score_ledger rollup'ındaki $merge "on" alanları unique index ister
+    ("daily_scores", [("user_id", ASCENDING), ("date", ASCENDING)], {"name": "user_date_unique", "unique": True}),
+    ("weekly_scores", [("user_id", ASCENDING), ("week_start", ASCENDING)], {
+        "name": "user_week_unique", "unique": True
+    }),
+    # score_events: rollup filigranından sonraki aralık (at: logged_at'tan önceki olaylar)
+    ("score_events", [("logged_at", ASCENDING)], {"name": "logged_at"}),
+    ("score_events", [("at", ASCENDING)], {"name": "at"}),
+    # friend_requests
+    ("friend_requests", [("request_id", ASCENDING)], {"name": "request_id_unique", "unique": True}),
+    ("friend_requests", [("receiver_id", ASCENDING), ("status", ASCENDING)], {"name": "receiver_status"}),
+    ("friend_requests", [("sender_id", ASCENDING), ("receiver_id", ASCENDING), ("status", ASCENDING)], {
+        "name": "sender_receiver_status"
+    }),
+    # players
+    ("players", [("player_id", ASCENDING)], {"name": "player_id_unique", "unique": True}),
+]
+
+
+async def ensure_indexes(db) -> List[dict]:
+    """Create every index in INDEXES; failures are logged, never raised"""
+    results = []
+    for collection, keys, options in INDEXES:
+        try:
+            await db[collection].create_index(keys, **options)
+            results.append({"collection": collection, "index": options["name"], "ok": True})
+        except OperationFailure as e:
+            # Ör. mevcut veride tekrar eden değerler unique index'i engelliyor
+            logger.error("Index %s.%s could not be created: %s", collection, options["name"], e)
+            results.append({"collection": collection, "index": options["name"], "ok": False, "error": str(e)})
+    return results
+
+
+# ============ QUERY SHAPE REPORT ============
+
+QUERY_METHODS = {
+    "find", "find_one", "count_documents", "update_one", "update_many",
+    "delete_one", "delete_many", "find_one_and_update", "find_one_and_delete", "aggregate"
+}
+RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte", "$in"}
+
+
+def _literal_key(node) -> Optional[str]:
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    return None
+
+
+def _classify_condition(value) -> str:
+    """eq / range / regex / prefix / negation / dynamic for a single filter value"""
+    if not isinstance(value, ast.Dict):
+        return "eq"
+    operators = {_literal_key(k) for k in value.keys}
+    if "$regex" in operators:
+        pattern = value.values[[_literal_key(k) for k in value.keys].index("$regex")]
+        if isinstance(pattern, ast.Constant) and str(pattern.value).startswith("^"):
+            return "prefix"
+        return "regex"
+    if operators & RANGE_OPERATORS:
+        return "range"
+    if operators <= {"$ne", "$nin", "$exists", "$not"}:
+        return "negation"
+    return "eq"
+
+
+def _filter_shape(node) -> Optional[Dict[str, str]]:
+    if not isinstance(node, ast.Dict):
+        return None
+    shape = {}
+    for key, value in zip(node.keys, node.values):
+        field = _literal_key(key)
+        if field is None:
+            return None
+        if field.startswith("$"):
+            # $or / $expr gibi üst seviye operatörler index'e güvenilir şekilde eşlenemez
+            shape[field] = "operator"
+            continue
+        shape[field] = _classify_condition(value)
+    return shape
+
+
+def _resolve_name(name: str, call, parents) -> Optional[ast.AST]:
+    """Find the literal assigned to a local variable in the enclosing function"""
+    scope = call
+    while scope is not None and not isinstance(scope, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        scope = parents.get(scope)
+    if scope is None:
+        return None
+    value = None
+    for node in ast.walk(scope):
+        if isinstance(node, ast.Assign) and any(
+            isinstance(t, ast.Name) and t.id == name for t in node.targets
+        ):
+            value = node.value
+    return value
+
+
+def _chained_sort(call, parents) -> List[str]:
+    """Collect .sort("field", dir) calls chained onto a find()"""
+    sort_fields = []
+    node = call
+    while True:
+        attr = parents.get(node)
+        if not isinstance(attr, ast.Attribute):
+            break
+        outer = parents.get(attr)
+        if not isinstance(outer, ast.Call):
+            break
+        if attr.attr == "sort" and outer.args:
+            field = _literal_key(outer.args[0])
+            if field:
+                sort_fields.append(field)
+        node = outer
+    return sort_fields
+
+
+def collect_query_shapes(source_path: Path = SERVER_SOURCE) -> List[dict]:
+    """Statically extract db.<collection>.<method>(filter) shapes from a module"""
+    tree = ast.parse(source_path.read_text(encoding="utf-8"))
+    parents = {}
+    for node in ast.walk(tree):
+        for child in ast.iter_child_nodes(node):
+            parents[child] = node
+
+    shapes = []
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)):
+            continue
+        method = node.func.attr
+        target = node.func.value
+        if method not in QUERY_METHODS or not (
+            isinstance(target, ast.Attribute)
+            and isinstance(target.value, ast.Name)
+            and target.value.id == "db"
+        ):
+            continue
+
+        arg = node.args[0] if node.args else ast.Dict(keys=[], values=[])
+        if isinstance(arg, ast.Name):
+            arg = _resolve_name(arg.id, node, parents) or arg
+
+        sort_fields = _chained_sort(node, parents)
+        if method == "aggregate":
+            stages = arg.elts if isinstance(arg, ast.List) else []
+            first = stages[0] if stages and isinstance(stages[0], ast.Dict) else None
+            stage_name = _literal_key(first.keys[0]) if first is not None and first.keys else None
+            if stage_name == "$match":
+                arg = first.values[0]
+            else:
+                arg = ast.Dict(keys=[], values=[])
+            for stage in stages[1:2]:
+                if isinstance(stage, ast.Dict) and stage.keys and _literal_key(stage.keys[0]) == "$sort":
+                    sort_fields = [k for k in map(_literal_key, stage.values[0].keys) if k]
+
+        shapes.append({
+            "collection": target.attr,
+            "method": method,
+            "line": node.lineno,
+            "filter": _filter_shape(arg),
+            "sort": sort_fields,
+        })
+    return sorted(shapes, key=lambda s: s["line"])
+
+
+def plan_query(shape: dict, indexes=INDEXES) -> str:
+    """Rough planner: IXSCAN / IXSCAN+SORT / COLLSCAN / COLLSCAN+SORT / DYNAMIC"""
+    filter_shape = shape["filter"]
+    if filter_shape is None:
+        return "DYNAMIC"
+
+    usable = {f for f, kind in filter_shape.items() if kind in ("eq", "range", "prefix")}
+    equality = {f for f, kind in filter_shape.items() if kind == "eq"}
+    sort_fields = shape["sort"]
+
+    best = None
+    for collection, keys, options in indexes:
+        if collection != shape["collection"]:
+            continue
+        fields = [k for k, _ in keys]
+        if fields[0] in usable:
+            # Sıralama index'ten geliyor mu? (eşitlik öneki + sort alanı)
+            prefix = 0
+            while prefix < len(fields) and fields[prefix] in equality:
+                prefix += 1
+            sorted_by_index = not sort_fields or fields[prefix:prefix + len(sort_fields)] == sort_fields
+            plan = "IXSCAN" if sorted_by_index else "IXSCAN+SORT"
+        elif not usable and sort_fields and fields[:len(sort_fields)] == sort_fields:
+            # Filtresiz sıralama: index sırayla taranır, limit ile erken durur
+            plan = "IXSCAN"
+        else:
+            continue
+        if best is None or plan == "IXSCAN":
+            best = plan
+    if best:
+        return best
+    return "COLLSCAN+SORT" if sort_fields else "COLLSCAN"
+
+
+def build_query_report(source_path: Path = SERVER_SOURCE) -> List[dict]:
+    report = []
+    for shape in collect_query_shapes(source_path):
+        report.append({**shape, "plan": plan_query(shape)})
+    return report
+
+
+def _is_flagged(entry: dict) -> bool:
+    return entry["plan"].startswith("COLLSCAN") or entry["plan"] == "IXSCAN+SORT"
+
+
+def flagged_queries(report: List[dict]) -> List[dict]:
+    return [r for r in report if _is_flagged(r)]
+
+
+def format_report(report: List[dict]) -> str:
+    lines = []
+    for r in report:
+        filter_desc = "?" if r["filter"] is None else ", ".join(
+            f"{k}:{v}" for k, v in r["filter"].items()
+        )
+        sort_desc = f" sort={','.join(r['sort'])}" if r["sort"] else ""
+        marker = "!!" if _is_flagged(r) else "  "
+        lines.append(
+            f"{marker} {r['plan']:<14} {r['collection']}.{r['method']} "
+            f"(server.py:{r['line']}) filter={{{filter_desc}}}{sort_desc}"
+        )
+    return "\n".join(lines)
+
+
+def log_flagged_queries():
+    """Warn about query shapes that will still scan the collection"""
+    try:
+        report = build_query_report()
+    except (OSError, SyntaxError) as e:
+        logger.warning("Query report unavailable: %s", e)
+        return
+    for r in flagged_queries(report):
+        logger.warning(
+            "Unindexed query shape %s on %s.%s (server.py:%s)",
+            r["plan"], r["collection"], r["method"], r["line"]
+        )
+
+
+async def main(report_only: bool = False):
+    if not report_only:
+        from dotenv import load_dotenv
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        load_dotenv(Path(__file__).parent / '.env')
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        db = client[os.environ.get('DB_NAME', 'test_database')]
+
+        results = await ensure_indexes(db)
+        for r in results:
+            status = "✅" if r["ok"] else "❌"
+            print(f"{status} {r['collection']}.{r['index']}" + (f" - {r['error']}" if not r["ok"] else ""))
+        client.close()
+        print()
+
+    report = build_query_report()
+    print(format_report(report))
+    print(f"\n{len(flagged_queries(report))} of {len(report)} query shapes still scan or sort in memory")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(report_only="--report" in sys.argv))
@@ -0,0 +1,346 @@
+"""
+Oyun Durumu Deposu - aktif oyunlar, özel oda kodları ve eşleştirme kuyruğu
+
+InMemoryGameStore keeps everything in process (single worker). RedisGameStore
+keeps the same state in any Redis-protocol server so N uvicorn workers share
+games, room codes and the matchmaking queue; Socket.IO emits between workers
+go through socketio.AsyncRedisManager on the same server.
+
+Handlers mutate a game only inside `transaction(room_id)`, which holds the
+room lock and writes the game back on exit.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from matchmaking import Searcher
+
+logger = logging.getLogger(__name__)
+
+# Terk edilen oyunlar / oda kodları Redis'te sonsuza kadar kalmasın
+GAME_TTL_SECONDS = 3600
+PRIVATE_ROOM_TTL_SECONDS = 1800
+ROOM_LOCK_TTL_MS = 10000
+LEADER_TTL_MS = 5000
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _decode(obj: dict):
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+def dumps(value) -> str:
+    return json.dumps(value, default=_encode, separators=(",", ":"))
+
+
+def loads(raw):
+    return json.loads(raw, object_hook=_decode) if raw is not None else None
+
+
+class GameStateStore:
+    """Interface shared by the in-process and Redis implementations"""
+
+    # True when several workers see the same state (matchmaking needs a leader)
+    shared = False
+
+    def lock(self, room_id: str):
+        raise NotImplementedError
+
+    async def get_game(self, room_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def save_game(self, game: dict):
+        raise NotImplementedError
+
+    async def create_game(self, game: dict):
+        """Store a new game and index its players' sockets"""
+        raise NotImplementedError
+
+    async def pop_game(self, room_id: str) -> Optional[dict]:
+        """Remove a game; only one caller ever gets it back"""
+        raise NotImplementedError
+
+    async def room_of(self, sid: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def open_private_room(self, room_code: str, room: dict) -> bool:
+        """False if the code is already taken"""
+        raise NotImplementedError
+
+    async def claim_private_room(self, room_code: str) -> Optional[dict]:
+        """Atomically take a room code so only one guest can join it"""
+        raise NotImplementedError
+
+    async def close_private_room(self, room_code: str):
+        raise NotImplementedError
+
+    async def stats(self) -> dict:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    @asynccontextmanager
+    async def transaction(self, room_id: str):
+        """Yield the game under its room lock (None if missing) and save it on exit"""
+        async with self.lock(room_id):
+            game = await self.get_game(room_id)
+            yield game
+            if game is not None:
+                await self.save_game(game)
+
+
+class InMemoryGameStore(GameStateStore):
+    """Plain dicts; the right choice for a single worker"""
+
+    def __init__(self):
+        self._games: Dict[str, dict] = {}
+        self._rooms_by_sid: Dict[str, str] = {}
+        self._private_rooms: Dict[str, dict] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def lock(self, room_id: str) -> asyncio.Lock:
+        lock = self._locks.get(room_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            # Yalnızca var olan oyunlar için saklanır; istemcinin uydurduğu
+            # room_id'ler için kilit birikmesin (pop_game saklananı siler)
+            if room_id in self._games:
+                self._locks[room_id] = lock
+        return lock
+
+    async def get_game(self, room_id: str) -> Optional[dict]:
+        return self._games.get(room_id)
+
+    async def save_game(self, game: dict):
+        # get_game aynı dict nesnesini döndürür; yazılacak bir şey yok
+        pass
+
+    async def create_game(self, game: dict):
+        self._games[game['room_id']] = game
+        for player in game['players']:
+            self._rooms_by_sid[player['sid']] = game['room_id']
+
+    async def pop_game(self, room_id: str) -> Optional[dict]:
+        game = self._games.pop(room_id, None)
+        # Kilidi bekleyen varsa oyunu bulamayıp çıkar
+        self._locks.pop(room_id, None)
+        if game is not None:
+            for player in game['players']:
+                if self._rooms_by_sid.get(player['sid']) == room_id:
+                    del self._rooms_by_sid[player['sid']]
+        return game
+
+    async def room_of(self, sid: str) -> Optional[str]:
+        return self._rooms_by_sid.get(sid)
+
+    async def open_private_room(self, room_code: str, room: dict) -> bool:
+        if room_code in self._private_rooms:
+            return False
+        self._private_rooms[room_code] = room
+        return True
+
+    async def claim_private_room(self, room_code: str) -> Optional[dict]:
+        return self._private_rooms.pop(room_code, None)
+
+    async def close_private_room(self, room_code: str):
+        self._private_rooms.pop(room_code, None)
+
+    async def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "active_games": len(self._games),
+            "private_rooms": len(self._private_rooms),
+        }
+
+
+class RedisLock:
+    """SET NX PX lock with a watched compare-and-delete release (no Lua needed)"""
+
+    def __init__(self, redis, key: str, ttl_ms: int = ROOM_LOCK_TTL_MS, timeout: float = 5.0):
+        self.redis = redis
+        self.key = key
+        self.ttl_ms = ttl_ms
+        self.timeout = timeout
+        self.token = uuid.uuid4().hex
+
+    async def __aenter__(self):
+        deadline = time.monotonic() + self.timeout
+        delay = 0.005
+        while not await self.redis.set(self.key, self.token, nx=True, px=self.ttl_ms):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Could not lock {self.key}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.05)
+        return self
+
+    async def __aexit__(self, *exc):
+        from redis.exceptions import WatchError
+
+        async with self.redis.pipeline() as pipe:
+            try:
+                await pipe.watch(self.key)
+                if await pipe.get(self.key) == self.token:
+                    pipe.multi()
+                    pipe.delete(self.key)
+                    await pipe.execute()
+            except WatchError:
+                # Kilit TTL ile düşüp başkasına geçmiş; dokunma
+                pass
+
+
+class RedisGameStore(GameStateStore):
+    """Games, room codes and the matchmaking queue in a Redis-protocol server"""
+
+    shared = True
+
+    def __init__(self, redis, prefix: str = "fc:"):
+        self.redis = redis
+        self.prefix = prefix
+        self.worker_id = uuid.uuid4().hex[:12]
+        # Bu worker'ın sayaçları (stats tüm anahtarları taramasın)
+        self.games_created = 0
+        self.games_ended = 0
+
+    def _key(self, *parts: str) -> str:
+        return self.prefix + ":".join(str(part) for part in parts)
+
+    def lock(self, room_id: str) -> RedisLock:
+        return RedisLock(self.redis, self._key("lock", room_id))
+
+    async def get_game(self, room_id: str) -> Optional[dict]:
+        return loads(await self.redis.get(self._key("game", room_id)))
+
+    async def save_game(self, game: dict):
+        # xx: pop_game'den sonra gelen geç bir yazma oyunu diriltmesin
+        await self.redis.set(
+            self._key("game", game['room_id']), dumps(game), ex=GAME_TTL_SECONDS, xx=True
+        )
+
+    async def create_game(self, game: dict):
+        room_id = game['room_id']
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._key("game", room_id), dumps(game), ex=GAME_TTL_SECONDS)
+            for player in game['players']:
+                pipe.set(self._key("sid", player['sid']), room_id, ex=GAME_TTL_SECONDS)
+            await pipe.execute()
+        self.games_created += 1
+
+    async def pop_game(self, room_id: str) -> Optional[dict]:
+        game = loads(await self.redis.getdel(self._key("game", room_id)))
+        if game is not None:
+            self.games_ended += 1
+            await self.redis.delete(*[self._key("sid", p['sid']) for p in game['players']])
+        return game
+
+    async def room_of(self, sid: str) -> Optional[str]:
+        return await self.redis.get(self._key("sid", sid))
+
+    async def open_private_room(self, room_code: str, room: dict) -> bool:
+        return bool(await self.redis.set(
+            self._key("room_code", room_code), dumps(room), ex=PRIVATE_ROOM_TTL_SECONDS, nx=True
+        ))
+
+    async def claim_private_room(self, room_code: str) -> Optional[dict]:
+        return loads(await self.redis.getdel(self._key("room_code", room_code)))
+
+    async def close_private_room(self, room_code: str):
+        await self.redis.delete(self._key("room_code", room_code))
+
+    # ---- paylaşılan eşleştirme kuyruğu ----
+
+    @staticmethod
+    def _dump_searcher(searcher: Searcher) -> str:
+        # monotonic zaman worker'lar arasında karşılaştırılamaz, duvar saatine çevir
+        joined_wall = time.time() - (time.monotonic() - searcher.joined_at)
+        return dumps([searcher.user_id, searcher.sid, searcher.username, searcher.elo, joined_wall])
+
+    @staticmethod
+    def _load_searcher(raw: str) -> Searcher:
+        user_id, sid, username, elo, joined_wall = loads(raw)
+        return Searcher(user_id, sid, username, elo, time.monotonic() - (time.time() - joined_wall))
+
+    async def queue_searcher(self, game_mode: str, searcher: Searcher) -> bool:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hsetnx(self._key("queue", game_mode), searcher.user_id, self._dump_searcher(searcher))
+            pipe.sadd(self._key("queue_modes"), game_mode)
+            added, _ = await pipe.execute()
+        return bool(added)
+
+    async def dequeue_searcher(self, game_mode: str, user_id: str, sid: Optional[str] = None) -> bool:
+        key = self._key("queue", game_mode)
+        if sid is not None:
+            raw = await self.redis.hget(key, user_id)
+            if raw is None or self._load_searcher(raw).sid != sid:
+                return False
+        return bool(await self.redis.hdel(key, user_id))
+
+    async def queue_length(self, game_mode: str) -> int:
+        return await self.redis.hlen(self._key("queue", game_mode))
+
+    async def queue_modes(self) -> List[str]:
+        return sorted(await self.redis.smembers(self._key("queue_modes")))
+
+    async def queued_searchers(self, game_mode: str) -> Dict[str, Searcher]:
+        raw = await self.redis.hgetall(self._key("queue", game_mode))
+        return {user_id: self._load_searcher(value) for user_id, value in raw.items()}
+
+    async def claim_searchers(self, game_mode: str, searchers: Iterable[Searcher]) -> bool:
+        """Remove a matched pair; if one of them already left, put the other back"""
+        key = self._key("queue", game_mode)
+        searchers = list(searchers)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for searcher in searchers:
+                pipe.hdel(key, searcher.user_id)
+            removed = await pipe.execute()
+        if all(removed):
+            return True
+        for searcher, was_removed in zip(searchers, removed):
+            if was_removed:
+                await self.redis.hsetnx(key, searcher.user_id, self._dump_searcher(searcher))
+        return False
+
+    async def acquire_leader(self, name: str, ttl_ms: int = LEADER_TTL_MS) -> bool:
+        """Single-holder lease (e.g. the matchmaking tick), renewed by its holder"""
+        key = self._key("leader", name)
+        if await self.redis.set(key, self.worker_id, nx=True, px=ttl_ms):
+            return True
+        if await self.redis.get(key) == self.worker_id:
+            await self.redis.pexpire(key, ttl_ms)
+            return True
+        return False
+
+    async def stats(self) -> dict:
+        return {
+            "backend": "redis",
+            "worker_id": self.worker_id,
+            "games_created": self.games_created,
+            "games_ended": self.games_ended,
+        }
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+def create_game_store(redis_url: Optional[str]) -> GameStateStore:
+    """REDIS_URL unset -> in-process; 'fakeredis://' -> local stand-in for tests"""
+    if not redis_url:
+        return InMemoryGameStore()
+    if redis_url.startswith("fakeredis://"):
+        from fakeredis import FakeAsyncRedis
+        return RedisGameStore(FakeAsyncRedis(decode_responses=True))
+    from redis.asyncio import Redis
+    return RedisGameStore(Redis.from_url(redis_url, decode_responses=True))
@@ -2,6 +2,9 @@
 Ortak Oyun Sistemleri - ELO, Lig, Seri Bonusları
 """
 
+import bisect
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
 # Lig Seviyeleri ve ELO Aralıkları
 LEAGUES = {
     "bronze": {
@@ -145,12 +148,73 @@ GAME_MODES = {
     }
 }
 
+class League(NamedTuple):
+    """One compiled league row; `info` is the shared API payload (do not mutate)"""
+    id: str
+    minimum: int
+    info: dict
+
+
+class LeagueTable:
+    """League definitions compiled once into a sorted threshold table
+
+    Lookups are a bisect over the minimums; the league rows and their
+    payloads are built at import time and shared by every caller.
+    """
+
+    def __init__(self, leagues: Dict[str, dict], min_key: str, default: str):
+        rows = sorted(leagues.items(), key=lambda item: item[1][min_key])
+        self.leagues: Tuple[League, ...] = tuple(
+            League(league_id, data[min_key], {"id": league_id, **data}) for league_id, data in rows
+        )
+        self._minimums = [league.minimum for league in self.leagues]
+        self._index = {league.id: i for i, league in enumerate(self.leagues)}
+        self.default = self.leagues[self._index[default]]
+
+    def __getitem__(self, league_id: str) -> League:
+        return self.leagues[self._index[league_id]]
+
+    def lookup(self, value: float) -> League:
+        """Highest league whose minimum is <= value (default below the first one)"""
+        i = bisect.bisect_right(self._minimums, value) - 1
+        return self.leagues[i] if i >= 0 else self.default
+
+    def next_league(self, league_id: str) -> Optional[League]:
+        i = self._index.get(league_id, self._index[self.default.id]) + 1
+        return self.leagues[i] if i < len(self.leagues) else None
+
+    def mongo_switch(self, field: str, then: Callable[[League], object] = lambda league: league.id) -> dict:
+        """The same lookup as a $switch expression for update pipelines"""
+        return {"$switch": {
+            "branches": [
+                {"case": {"$gte": [field, league.minimum]}, "then": then(league)}
+                for league in reversed(self.leagues)
+            ],
+            "default": then(self.default)
+        }}
+
+
+# max_elo yalnızca gösterim için; en üst lig üst sınırsız
+ELO_LEAGUES = LeagueTable(LEAGUES, "min_elo", default="bronze")
+
+
+def _compile_streak_table() -> Tuple[Optional[dict], ...]:
+    # streak -> o seriye denk gelen en yüksek bonus; son eleman üstündeki her seri için geçerli
+    table = []
+    bonus = None
+    for streak in range(max(STREAK_BONUSES) + 1):
+        if streak in STREAK_BONUSES:
+            bonus = {"streak_count": streak, **STREAK_BONUSES[streak]}
+        table.append(bonus)
+    return tuple(table)
+
+
+STREAK_TABLE = _compile_streak_table()
+
+
 def get_league_for_elo(elo: int) -> dict:
     """ELO puanına göre lig bilgisini döndür"""
-    for league_id, league in LEAGUES.items():
-        if league["min_elo"] <= elo <= league["max_elo"]:
-            return {"id": league_id, **league}
-    return {"id": "bronze", **LEAGUES["bronze"]}
+    return ELO_LEAGUES.lookup(elo).info
 
 def calculate_elo_change(winner_elo: int, loser_elo: int, k_factor: int = 32) -> tuple:
     """ELO değişimini hesapla"""
@@ -164,12 +228,9 @@ def calculate_elo_change(winner_elo: int, loser_elo: int, k_factor: int = 32) ->
 
 def get_streak_bonus(streak: int) -> dict:
     """Seri bonusunu al"""
-    bonus = None
-    for streak_count, streak_bonus in sorted(STREAK_BONUSES.items(), reverse=True):
-        if streak >= streak_count:
-            bonus = {"streak_count": streak_count, **streak_bonus}
-            break
-    return bonus
+    if streak < 0:
+        return None
+    return STREAK_TABLE[min(streak, len(STREAK_TABLE) - 1)]
 
 def calculate_game_rewards(
     won: bool,
@@ -216,3 +277,84 @@ def calculate_game_rewards(
             "streak_bonus": None,
             "league": league
         }
+
+
+def _truncated(expr, factor) -> dict:
+    # Python'daki int(x * factor) ile aynı: sıfıra doğru kes, tamsayı sakla
+    return {"$toInt": {"$trunc": {"$multiply": [expr, factor]}}}
+
+
+def game_result_pipeline(result, time_bonus: float, elo_change: int) -> list:
+    """Update pipeline applying one game result, mirroring the Python reward rules
+
+    `result` is a submitted game result (game_mode, won, score, time_taken,
+    perfect_game); the pipeline reads elo, streaks and badges from the document.
+    """
+    badges = {"$ifNull": ["$badges", []]}
+    league_rewards = ELO_LEAGUES.mongo_switch("$_result.elo", then=lambda league: league.info["rewards"])
+    streak_bonus = {"$switch": {
+        "branches": [
+            {"case": {"$gte": ["$_result.streak", streak_count]},
+             "then": {"coins": bonus["bonus_coins"], "xp": bonus["bonus_xp"],
+                      "multiplier": bonus["multiplier"], "badge": bonus.get("badge")}}
+            for streak_count, bonus in sorted(STREAK_BONUSES.items(), reverse=True)
+        ],
+        "default": {"coins": 0, "xp": 0, "multiplier": 1, "badge": None}
+    }}
+    
+    if result.won:
+        rewards = {}
+        for field, base in (("coins", "coins_per_win"), ("xp", "xp_per_win")):
+            amount = _truncated({"$add": [f"$_result.rewards.{base}", f"$_result.bonus.{field}"]}, "$_result.bonus.multiplier")
+            amount = _truncated(amount, time_bonus)
+            if result.perfect_game:
+                amount = _truncated(amount, 1.5)
+            rewards[field] = amount
+    else:
+        rewards = {"coins": 5, "xp": 10}
+    
+    candidate_badges = []
+    if result.won:
+        candidate_badges.append("first_win")
+    candidate_badges.append("$_result.bonus.badge")
+    if result.won and result.time_taken < 3:
+        candidate_badges.append("speed_demon")
+    if result.perfect_game:
+        candidate_badges.append("perfect_game")
+    candidate_badges.append({"$cond": [
+        {"$gte": ["$_result.new_elo", ELO_LEAGUES["legend"].minimum]}, "legend_rank", None
+    ]})
+    
+    mode = f"game_stats.{result.game_mode}"
+    updates = {
+        "elo": "$_result.new_elo",
+        "coins": {"$add": [{"$ifNull": ["$coins", 0]}, rewards["coins"]]},
+        "xp": {"$add": [{"$ifNull": ["$xp", 0]}, rewards["xp"]]},
+        "win_streak": "$_result.streak",
+        "best_streak": {"$max": [{"$ifNull": ["$best_streak", 0]}, "$_result.streak"]},
+        "total_games": {"$add": [{"$ifNull": ["$total_games", 0]}, 1]},
+        f"{mode}.games_played": {"$add": [{"$ifNull": [f"${mode}.games_played", 0]}, 1]},
+        f"{mode}.wins": {"$add": [{"$ifNull": [f"${mode}.wins", 0]}, 1 if result.won else 0]},
+        f"{mode}.high_score": {"$max": [{"$ifNull": [f"${mode}.high_score", 0]}, result.score]},
+        f"{mode}.total_score": {"$add": [{"$ifNull": [f"${mode}.total_score", 0]}, result.score]},
+        "badges": {"$concatArrays": [badges, {"$filter": {
+            "input": candidate_badges,
+            "cond": {"$and": [{"$ne": ["$$this", None]}, {"$not": {"$in": ["$$this", badges]}}]}
+        }}]}
+    }
+    outcome = "wins" if result.won else "losses"
+    updates[outcome] = {"$add": [{"$ifNull": [f"${outcome}", 0]}, 1]}
+    
+    return [
+        {"$set": {
+            "_result.elo": {"$ifNull": ["$elo", 1000]},
+            "_result.streak": {"$add": [{"$ifNull": ["$win_streak", 0]}, 1]} if result.won else 0
+        }},
+        {"$set": {
+            "_result.rewards": league_rewards,
+            "_result.bonus": streak_bonus,
+            "_result.new_elo": {"$max": [0, {"$add": ["$_result.elo", elo_change]}]}
+        }},
+        {"$set": updates},
+        {"$unset": "_result"}
+    ]
@@ -0,0 +1,520 @@
+"""
+Liderlik Tabloları - bellekte / Redis sorted set'te tutulan sıralı tablolar
+
+Every board (points, elo, career, location:<name>) is a ranked set of
+user_id -> score, next to one "card" per user holding the fields the
+leaderboard endpoints return. Top-N, "my rank" and "rank of score X" /
+percentile are O(log n + N) and do not touch MongoDB. Writes only mark users dirty; a background task re-reads
+the dirty users with one $in query and updates their boards.
+"""
+
+import asyncio
+import logging
+import random
+import uuid
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from game_state import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# Kartta tutulan alanlar; her endpoint kendi alt kümesini seçer
+CARD_PROJECTION = {
+    "_id": 0, "user_id": 1, "username": 1, "name": 1, "avatar": 1, "location": 1,
+    "stats": 1, "elo": 1, "wins": 1, "losses": 1, "best_streak": 1, "career_path_stats": 1
+}
+
+LOCATION_PREFIX = "location:"
+
+# Redis'te yeniden kurulum sırasında yazılan geçici anahtarların ömrü
+STAGING_TTL_SECONDS = 600
+
+
+def board_scores(card: dict) -> Dict[str, float]:
+    """Boards a user belongs to and their score on each"""
+    points = (card.get("stats") or {}).get("points") or 0
+    scores = {"points": points}
+    elo = card.get("elo")
+    if elo and elo > 0:
+        scores["elo"] = elo
+    high_score = (card.get("career_path_stats") or {}).get("high_score") or 0
+    if high_score > 0:
+        scores["career"] = high_score
+    if card.get("location"):
+        scores[LOCATION_PREFIX + card["location"]] = points
+    return scores
+
+
+# ============ SKIP LIST ============
+
+MAX_LEVEL = 32
+LEVEL_P = 0.25
+
+
+class _AfterAll:
+    """Sorts after every user_id; (-score, _AFTER_ALL) ends a score's run of ties"""
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+
+_AFTER_ALL = _AfterAll()
+
+
+class _Node:
+    __slots__ = ("key", "next", "span")
+
+    def __init__(self, key, level: int):
+        self.key = key
+        self.next: List[Optional["_Node"]] = [None] * level
+        self.span: List[int] = [0] * level
+
+
+class RankedSet:
+    """Indexable skip list ordered by score desc, then user_id
+
+    Each forward pointer stores how many nodes it skips, so insert, remove,
+    rank and "element at rank" are all O(log n).
+    """
+
+    def __init__(self):
+        self._head = _Node(None, MAX_LEVEL)
+        self._level = 1
+        self._scores: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, member: str) -> bool:
+        return member in self._scores
+
+    def score(self, member: str) -> Optional[float]:
+        return self._scores.get(member)
+
+    @staticmethod
+    def _key(member: str, score: float) -> tuple:
+        return (-score, member)
+
+    @staticmethod
+    def _random_level() -> int:
+        level = 1
+        while level < MAX_LEVEL and random.random() < LEVEL_P:
+            level += 1
+        return level
+
+    def add(self, member: str, score: float):
+        current = self._scores.get(member)
+        if current is not None:
+            if current == score:
+                return
+            self._delete(self._key(member, current))
+        self._insert(self._key(member, score))
+        self._scores[member] = score
+
+    def remove(self, member: str) -> bool:
+        score = self._scores.pop(member, None)
+        if score is None:
+            return False
+        self._delete(self._key(member, score))
+        return True
+
+    def _insert(self, key: tuple):
+        update = [self._head] * MAX_LEVEL
+        rank = [0] * MAX_LEVEL
+        x = self._head
+        for i in range(self._level - 1, -1, -1):
+            rank[i] = 0 if i == self._level - 1 else rank[i + 1]
+            while x.next[i] is not None and x.next[i].key < key:
+                rank[i] += x.span[i]
+                x = x.next[i]
+            update[i] = x
+
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._head
+                self._head.span[i] = len(self._scores)
+            self._level = level
+
+        node = _Node(key, level)
+        for i in range(level):
+            node.next[i] = update[i].next[i]
+            update[i].next[i] = node
+            node.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = rank[0] - rank[i] + 1
+        for i in range(level, self._level):
+            update[i].span[i] += 1
+
+    def _delete(self, key: tuple):
+        update = [self._head] * MAX_LEVEL
+        x = self._head
+        for i in range(self._level - 1, -1, -1):
+            while x.next[i] is not None and x.next[i].key < key:
+                x = x.next[i]
+            update[i] = x
+        x = x.next[0]
+        for i in range(self._level):
+            if update[i].next[i] is x:
+                update[i].span[i] += x.span[i] - 1
+                update[i].next[i] = x.next[i]
+            else:
+                update[i].span[i] -= 1
+        while self._level > 1 and self._head.next[self._level - 1] is None:
+            self._level -= 1
+
+    def _count_before(self, key: tuple) -> int:
+        """Number of members ordered strictly before `key`"""
+        rank = 0
+        x = self._head
+        for i in range(self._level - 1, -1, -1):
+            while x.next[i] is not None and x.next[i].key < key:
+                rank += x.span[i]
+                x = x.next[i]
+        return rank
+
+    def rank(self, member: str) -> Optional[int]:
+        """1-based position, or None if not on the board"""
+        score = self._scores.get(member)
+        if score is None:
+            return None
+        return self._count_before(self._key(member, score)) + 1
+
+    def count_above(self, score: float, inclusive: bool = False) -> int:
+        """Members scoring more than `score` (or at least `score` if inclusive)"""
+        return self._count_before((-score, _AFTER_ALL if inclusive else ""))
+
+    def range(self, start: int, stop: int) -> List[Tuple[str, float]]:
+        """Members at 0-based positions [start, stop)"""
+        stop = min(stop, len(self._scores))
+        if start >= stop:
+            return []
+        traversed = 0
+        x = self._head
+        for i in range(self._level - 1, -1, -1):
+            while x.next[i] is not None and traversed + x.span[i] <= start:
+                traversed += x.span[i]
+                x = x.next[i]
+        result = []
+        x = x.next[0]
+        while x is not None and len(result) < stop - start:
+            result.append((x.key[1], -x.key[0]))
+            x = x.next[0]
+        return result
+
+
+# ============ DEPOLAR ============
+
+class InMemoryLeaderboardStore:
+    """Boards as RankedSets in this process (single worker)"""
+
+    def __init__(self):
+        self._boards: Dict[str, RankedSet] = {}
+        self._cards: Dict[str, dict] = {}
+
+    def _board(self, name: str) -> RankedSet:
+        board = self._boards.get(name)
+        if board is None:
+            board = self._boards[name] = RankedSet()
+        return board
+
+    def _upsert(self, card: dict):
+        user_id = card["user_id"]
+        old = self._cards.get(user_id)
+        scores = board_scores(card)
+        if old is not None:
+            for name in board_scores(old).keys() - scores.keys():
+                self._boards[name].remove(user_id)
+                if not self._boards[name]:
+                    del self._boards[name]
+        for name, score in scores.items():
+            self._board(name).add(user_id, score)
+        self._cards[user_id] = card
+
+    async def upsert_many(self, cards: Iterable[dict]):
+        for card in cards:
+            self._upsert(card)
+
+    async def remove_many(self, user_ids: Iterable[str]):
+        for user_id in user_ids:
+            card = self._cards.pop(user_id, None)
+            if card is None:
+                continue
+            for name in board_scores(card):
+                self._boards[name].remove(user_id)
+                if not self._boards[name]:
+                    del self._boards[name]
+
+    async def replace_all(self, cards: Iterable[dict]):
+        fresh = InMemoryLeaderboardStore()
+        for card in cards:
+            fresh._upsert(card)
+        # Yeni tablolar hazır olunca tek atamayla değiştir
+        self._boards, self._cards = fresh._boards, fresh._cards
+
+    async def top(self, board: str, limit: int) -> List[dict]:
+        ranked = self._boards.get(board)
+        if ranked is None or limit <= 0:
+            return []
+        return [self._cards[user_id] for user_id, _ in ranked.range(0, limit)]
+
+    async def rank(self, board: str, user_id: str) -> Optional[int]:
+        ranked = self._boards.get(board)
+        return ranked.rank(user_id) if ranked is not None else None
+
+    async def size(self, board: str) -> int:
+        ranked = self._boards.get(board)
+        return len(ranked) if ranked is not None else 0
+
+    async def count_above(self, board: str, score: float, inclusive: bool = False) -> int:
+        ranked = self._boards.get(board)
+        return ranked.count_above(score, inclusive) if ranked is not None else 0
+
+    async def claim_rebuild(self, interval: float) -> bool:
+        return True
+
+    async def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "cards": len(self._cards),
+            "boards": {name: len(board) for name, board in self._boards.items() if ":" not in name},
+            "location_boards": sum(1 for name in self._boards if name.startswith(LOCATION_PREFIX)),
+        }
+
+
+class RedisLeaderboardStore:
+    """Boards as Redis sorted sets and cards in a hash, shared by all workers"""
+
+    def __init__(self, redis, prefix: str = "fc:lb:"):
+        self.redis = redis
+        self.prefix = prefix
+        self.cards_key = prefix + "cards"
+
+    def _board_key(self, board: str) -> str:
+        return self.prefix + "board:" + board
+
+    async def upsert_many(self, cards: Iterable[dict], chunk: int = 500):
+        cards = list(cards)
+        for offset in range(0, len(cards), chunk):
+            batch = cards[offset:offset + chunk]
+            # Eski kartlar: konum değiştiyse eski konum tablosundan çıkarmak için
+            old_cards = await self.redis.hmget(self.cards_key, [card["user_id"] for card in batch])
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for card, old_raw in zip(batch, old_cards):
+                    user_id = card["user_id"]
+                    scores = board_scores(card)
+                    if old_raw is not None:
+                        for name in board_scores(loads(old_raw)).keys() - scores.keys():
+                            pipe.zrem(self._board_key(name), user_id)
+                    for name, score in scores.items():
+                        pipe.zadd(self._board_key(name), {user_id: score})
+                    pipe.hset(self.cards_key, user_id, dumps(card))
+                await pipe.execute()
+
+    async def remove_many(self, user_ids: Iterable[str]):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        old_cards = await self.redis.hmget(self.cards_key, user_ids)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id, old_raw in zip(user_ids, old_cards):
+                if old_raw is None:
+                    continue
+                for name in board_scores(loads(old_raw)):
+                    pipe.zrem(self._board_key(name), user_id)
+                pipe.hdel(self.cards_key, user_id)
+            await pipe.execute()
+
+    async def replace_all(self, cards: Iterable[dict], chunk: int = 500):
+        """Build fresh boards under staging keys, then swap them in with one MULTI
+
+        Boards and cards of users that no longer exist in the source go away
+        with the old keys.
+        """
+        staging = f"{self.prefix}staging:{uuid.uuid4().hex[:12]}:"
+        staged_cards = staging + "cards"
+        boards: Set[str] = set()
+        cards = list(cards)
+        for offset in range(0, len(cards), chunk):
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for card in cards[offset:offset + chunk]:
+                    for name, score in board_scores(card).items():
+                        pipe.zadd(staging + "board:" + name, {card["user_id"]: score})
+                        boards.add(name)
+                    pipe.hset(staged_cards, card["user_id"], dumps(card))
+                # Yarıda kalan bir yeniden kurulumun anahtarları birikmesin
+                for key in [staged_cards] + [staging + "board:" + name for name in boards]:
+                    pipe.expire(key, STAGING_TTL_SECONDS)
+                await pipe.execute()
+
+        # Saatte bir, tek worker'da çalışır; canlı tablo anahtarlarını bulmak için SCAN yeterli
+        live = [key async for key in self.redis.scan_iter(match=self._board_key("*"), count=1000)]
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for key in live:
+                if key[len(self._board_key("")):] not in boards:
+                    pipe.delete(key)
+            for name in boards:
+                pipe.rename(staging + "board:" + name, self._board_key(name))
+                # RENAME kaynağın TTL'ini de taşır
+                pipe.persist(self._board_key(name))
+            if cards:
+                pipe.rename(staged_cards, self.cards_key)
+                pipe.persist(self.cards_key)
+            else:
+                pipe.delete(self.cards_key)
+            await pipe.execute()
+
+    async def top(self, board: str, limit: int) -> List[dict]:
+        if limit <= 0:
+            return []
+        user_ids = await self.redis.zrevrange(self._board_key(board), 0, limit - 1)
+        if not user_ids:
+            return []
+        raw_cards = await self.redis.hmget(self.cards_key, user_ids)
+        return [loads(raw) for raw in raw_cards if raw is not None]
+
+    async def rank(self, board: str, user_id: str) -> Optional[int]:
+        position = await self.redis.zrevrank(self._board_key(board), user_id)
+        return position + 1 if position is not None else None
+
+    async def size(self, board: str) -> int:
+        return await self.redis.zcard(self._board_key(board))
+
+    async def count_above(self, board: str, score: float, inclusive: bool = False) -> int:
+        # ZCOUNT skip list üzerinden O(log n)
+        low = repr(score) if inclusive else "(" + repr(score)
+        return await self.redis.zcount(self._board_key(board), low, "+inf")
+
+    async def claim_rebuild(self, interval: float) -> bool:
+        """Only one worker rebuilds per interval"""
+        return bool(await self.redis.set(self.prefix + "rebuilt", "1", nx=True, ex=max(1, int(interval))))
+
+    async def stats(self) -> dict:
+        return {
+            "backend": "redis",
+            "cards": await self.redis.hlen(self.cards_key),
+            "boards": {name: await self.size(name) for name in ("points", "elo", "career")},
+        }
+
+
+# ============ SERVİS ============
+
+class LeaderboardService:
+    """Keeps the boards in step with the users collection"""
+
+    def __init__(self, store, refresh_interval: float = 0.5, rebuild_interval: float = 3600.0):
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self._dirty: Set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.rebuilds = 0
+
+    def mark_dirty(self, user_ids: Iterable[str]):
+        """Called after any write that changes a leaderboard field"""
+        self._dirty.update(user_id for user_id in user_ids if user_id)
+        if self._dirty:
+            self._wakeup.set()
+
+    async def refresh(self, db, user_ids: Iterable[str]):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        cards = await db.users.find({"user_id": {"$in": user_ids}}, CARD_PROJECTION).to_list(None)
+        await self.store.upsert_many(cards)
+        found = {card["user_id"] for card in cards}
+        await self.store.remove_many([user_id for user_id in user_ids if user_id not in found])
+        self.refreshes += 1
+
+    async def flush_dirty(self, db):
+        if not self._dirty:
+            return
+        user_ids, self._dirty = self._dirty, set()
+        try:
+            await self.refresh(db, user_ids)
+        except Exception as e:
+            self._dirty.update(user_ids)
+            logger.error("Leaderboard refresh failed: %s", e)
+
+    async def rebuild(self, db):
+        cards = await db.users.find({}, CARD_PROJECTION).to_list(None)
+        await self.store.replace_all(cards)
+        self.rebuilds += 1
+        logger.info("Leaderboards rebuilt from %d users", len(cards))
+
+    async def _run(self, db):
+        loop = asyncio.get_running_loop()
+        next_rebuild = loop.time() + self.rebuild_interval
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(0, next_rebuild - loop.time()))
+            except asyncio.TimeoutError:
+                pass
+            if self._wakeup.is_set():
+                self._wakeup.clear()
+                # Kısa bir süre bekle; aynı anda biten maçlar tek sorguda toplanır
+                await asyncio.sleep(self.refresh_interval)
+                await self.flush_dirty(db)
+            if loop.time() >= next_rebuild:
+                next_rebuild = loop.time() + self.rebuild_interval
+                try:
+                    if await self.store.claim_rebuild(self.rebuild_interval):
+                        await self.rebuild(db)
+                except Exception as e:
+                    logger.error("Leaderboard rebuild failed: %s", e)
+
+    async def start(self, db):
+        if self._task is None:
+            if await self.store.claim_rebuild(self.rebuild_interval):
+                await self.rebuild(db)
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def top(self, board: str, limit: int) -> List[dict]:
+        return await self.store.top(board, limit)
+
+    async def rank(self, board: str, user_id: str) -> Optional[int]:
+        return await self.store.rank(board, user_id)
+
+    async def size(self, board: str) -> int:
+        return await self.store.size(board)
+
+    async def standing(self, board: str, score: float) -> dict:
+        """Rank a score would have on a board, and the share of the board below it
+
+        Works for any score, so callers can use the user's fresh score even
+        before their own refresh has reached the board.
+        """
+        above = await self.store.count_above(board, score)
+        at_or_above = await self.store.count_above(board, score, inclusive=True)
+        total = await self.store.size(board)
+        return {
+            "rank": above + 1,
+            "total": total,
+            "percentile": round(100.0 * (total - at_or_above) / total, 1) if total else 0.0,
+        }
+
+    async def stats(self) -> dict:
+        return {
+            **await self.store.stats(),
+            "dirty_users": len(self._dirty),
+            "refreshes": self.refreshes,
+            "rebuilds": self.rebuilds,
+        }
+
+
+def create_leaderboard_store(game_store):
+    """Share the game-state store's Redis connection when there is one"""
+    redis = getattr(game_store, "redis", None)
+    if redis is not None:
+        return RedisLeaderboardStore(redis)
+    return InMemoryLeaderboardStore()
@@ -0,0 +1,288 @@
+"""
+Eşleştirme Motoru - ELO aralıklarına göre gruplanmış arama kuyruğu
+
+Searchers are kept in ELO buckets (sorted bucket keys + per-bucket FIFO).
+Pairing runs in batches on a tick: the oldest searchers are served first
+and the acceptable ELO window widens with waiting time. With several workers
+the queue lives in the shared game-state store and only the worker holding
+the matchmaking lease runs the tick.
+"""
+
+import asyncio
+import bisect
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WAIT_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120)
+DEPTH_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class Histogram:
+    """Fixed-bound cumulative histogram (Prometheus style)"""
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.samples = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.samples += 1
+
+    def snapshot(self) -> dict:
+        buckets = {}
+        running = 0
+        for bound, count in zip(self.bounds, self.counts):
+            running += count
+            buckets[str(bound)] = running
+        buckets["+Inf"] = self.samples
+        return {
+            "buckets": buckets,
+            "count": self.samples,
+            "mean": round(self.total / self.samples, 3) if self.samples else 0.0,
+        }
+
+
+class Searcher(NamedTuple):
+    user_id: str
+    sid: str
+    username: str
+    elo: int
+    joined_at: float  # time.monotonic()
+
+
+class MatchmakingEngine:
+    """ELO-bucketed queue for a single game mode"""
+
+    def __init__(
+        self,
+        bucket_width: int = 50,
+        base_window: int = 100,
+        widen_per_second: float = 20.0,
+        max_window: int = 1000
+    ):
+        self.bucket_width = bucket_width
+        self.base_window = base_window
+        self.widen_per_second = widen_per_second
+        self.max_window = max_window
+        # Ekleme sırası = bekleme sırası
+        self._searchers: "OrderedDict[str, Searcher]" = OrderedDict()
+        self._buckets: Dict[int, "OrderedDict[str, Searcher]"] = {}
+        self._bucket_keys: List[int] = []
+        self.wait_seconds = Histogram(WAIT_BUCKETS)
+        self.queue_depth = Histogram(DEPTH_BUCKETS)
+        self.matches = 0
+
+    def __len__(self) -> int:
+        return len(self._searchers)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._searchers
+
+    def __iter__(self):
+        return iter(list(self._searchers.values()))
+
+    def get(self, user_id: str) -> Optional[Searcher]:
+        return self._searchers.get(user_id)
+
+    def _bucket_of(self, elo: int) -> int:
+        return elo // self.bucket_width
+
+    def add(self, searcher: Searcher) -> bool:
+        if searcher.user_id in self._searchers:
+            return False
+        self._searchers[searcher.user_id] = searcher
+        key = self._bucket_of(searcher.elo)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = OrderedDict()
+            bisect.insort(self._bucket_keys, key)
+        bucket[searcher.user_id] = searcher
+        return True
+
+    def remove(self, user_id: str) -> Optional[Searcher]:
+        searcher = self._searchers.pop(user_id, None)
+        if searcher is None:
+            return None
+        key = self._bucket_of(searcher.elo)
+        bucket = self._buckets[key]
+        del bucket[user_id]
+        if not bucket:
+            del self._buckets[key]
+            del self._bucket_keys[bisect.bisect_left(self._bucket_keys, key)]
+        return searcher
+
+    def window_for(self, searcher: Searcher, now: float) -> int:
+        waited = now - searcher.joined_at
+        return int(min(self.max_window, self.base_window + waited * self.widen_per_second))
+
+    def _closest(self, searcher: Searcher, window: int) -> Optional[Searcher]:
+        """Nearest-ELO opponent within the window, scanning buckets outward"""
+        own = self._bucket_of(searcher.elo)
+        lo = bisect.bisect_left(self._bucket_keys, self._bucket_of(searcher.elo - window))
+        hi = bisect.bisect_right(self._bucket_keys, self._bucket_of(searcher.elo + window))
+        # Pencere sınırlı olduğundan buradaki bucket sayısı küçük (max_window / bucket_width)
+        nearby = sorted(self._bucket_keys[lo:hi], key=lambda key: abs(key - own))
+
+        best = None
+        best_diff = window + 1
+        for key in nearby:
+            gap = max(0, abs(key - own) - 1) * self.bucket_width
+            if gap >= best_diff:
+                break
+            checked = 0
+            for candidate in self._buckets[key].values():
+                if candidate.user_id == searcher.user_id:
+                    continue
+                diff = abs(candidate.elo - searcher.elo)
+                if diff < best_diff:
+                    # Bucket içinde en uzun bekleyen uygun aday yeterli
+                    best, best_diff = candidate, diff
+                    break
+                checked += 1
+                if checked >= 8:
+                    break
+        return best
+
+    def tick(self, now: Optional[float] = None) -> List[Tuple[Searcher, Searcher]]:
+        """Pair as many searchers as possible, oldest first"""
+        now = time.monotonic() if now is None else now
+        self.queue_depth.observe(len(self._searchers))
+        pairs = []
+        for user_id in list(self._searchers):
+            searcher = self._searchers.get(user_id)
+            if searcher is None:
+                continue  # bu tick'te zaten eşleşti
+            opponent = self._closest(searcher, self.window_for(searcher, now))
+            if opponent is None:
+                continue
+            self.remove(searcher.user_id)
+            self.remove(opponent.user_id)
+            self.wait_seconds.observe(now - searcher.joined_at)
+            self.wait_seconds.observe(now - opponent.joined_at)
+            pairs.append((searcher, opponent))
+        self.matches += len(pairs)
+        return pairs
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._searchers),
+            "elo_buckets": len(self._bucket_keys),
+            "matches": self.matches,
+            "wait_seconds": self.wait_seconds.snapshot(),
+            "queue_depth": self.queue_depth.snapshot(),
+        }
+
+
+class MatchmakingService:
+    """One engine per game mode, paired in batches by a periodic tick
+
+    `shared_queue` (a RedisGameStore) makes the queue visible to every
+    worker; the lease holder mirrors it into its engines before pairing.
+    """
+
+    def __init__(
+        self,
+        on_match: Callable[[str, Searcher, Searcher], Awaitable],
+        tick_interval: float = 1.0,
+        shared_queue=None,
+        **engine_options
+    ):
+        self.on_match = on_match
+        self.tick_interval = tick_interval
+        self.shared_queue = shared_queue
+        self.engine_options = engine_options
+        self.engines: Dict[str, MatchmakingEngine] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def engine(self, game_mode: str) -> MatchmakingEngine:
+        engine = self.engines.get(game_mode)
+        if engine is None:
+            engine = self.engines[game_mode] = MatchmakingEngine(**self.engine_options)
+        return engine
+
+    async def add(self, game_mode: str, searcher: Searcher) -> bool:
+        if self.shared_queue is not None:
+            return await self.shared_queue.queue_searcher(game_mode, searcher)
+        return self.engine(game_mode).add(searcher)
+
+    async def remove(self, game_mode: str, user_id: str, sid: Optional[str] = None) -> bool:
+        if self.shared_queue is not None:
+            return await self.shared_queue.dequeue_searcher(game_mode, user_id, sid)
+        engine = self.engines.get(game_mode)
+        if engine is None:
+            return False
+        searcher = engine.get(user_id)
+        if searcher is None or (sid is not None and searcher.sid != sid):
+            return False
+        return engine.remove(user_id) is not None
+
+    async def queue_length(self, game_mode: str) -> int:
+        if self.shared_queue is not None:
+            return await self.shared_queue.queue_length(game_mode)
+        return len(self.engine(game_mode))
+
+    async def _sync(self, game_mode: str) -> MatchmakingEngine:
+        """Mirror the shared queue into the local engine (O(queue) per tick)"""
+        engine = self.engine(game_mode)
+        queued = await self.shared_queue.queued_searchers(game_mode)
+        for searcher in engine:
+            current = queued.get(searcher.user_id)
+            if current is None or current.sid != searcher.sid:
+                engine.remove(searcher.user_id)
+        for searcher in queued.values():
+            if searcher.user_id not in engine:
+                engine.add(searcher)
+        return engine
+
+    async def _pairs(self, now: float):
+        if self.shared_queue is None:
+            for game_mode, engine in list(self.engines.items()):
+                for pair in engine.tick(now):
+                    yield game_mode, pair
+            return
+
+        if not await self.shared_queue.acquire_leader("matchmaking"):
+            # Başka bir worker eşleştiriyor; yerel kopyayı bırak
+            self.engines.clear()
+            return
+        for game_mode in await self.shared_queue.queue_modes():
+            engine = await self._sync(game_mode)
+            for pair in engine.tick(now):
+                # Bu arada kuyruktan çıkan olduysa eşleşmeyi kur(ma)
+                if await self.shared_queue.claim_searchers(game_mode, pair):
+                    yield game_mode, pair
+
+    async def tick(self):
+        now = time.monotonic()
+        async for game_mode, (player1, player2) in self._pairs(now):
+            try:
+                await self.on_match(game_mode, player1, player2)
+            except Exception as e:
+                logger.error("Failed to create %s match: %s", game_mode, e)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error("Matchmaking tick failed: %s", e)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {mode: engine.stats() for mode, engine in self.engines.items()}
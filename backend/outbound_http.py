@@ -0,0 +1,194 @@
+"""
+Dış HTTP İstemcisi - paylaşılan, havuzlu httpx istemcisi + retry + circuit breaker
+
+/auth/session used to open a new httpx.AsyncClient per call: a fresh
+TCP + TLS handshake per social login, no timeout and no retry. One
+OutboundClient per process keeps a keep-alive connection pool instead.
+
+Requests get a total timeout. Idempotent requests are retried a bounded
+number of times with full-jitter exponential backoff, on transport
+errors and 502/503/504. A circuit breaker opens after
+`failure_threshold` consecutive failed calls and rejects new calls with
+CircuitOpen for `reset_timeout` seconds. After that one trial call is
+let through; if it succeeds the circuit closes again. A trial that ends
+any other way (cancelled, or an error that says nothing about the
+upstream such as DecodingError or InvalidURL) is released without being
+counted, so the next call becomes the trial.
+
+`transport` is passed to httpx as-is, e.g. httpx.MockTransport(handler)
+for an in-process stub. Endpoint URLs come from the environment, so a
+local stub server can stand in for the real provider
+(see benchmarks/oauth_exchange.py).
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class CircuitOpen(Exception):
+    """The upstream failed repeatedly; calls are rejected until reset_timeout passes"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"circuit open, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open (one trial) -> closed"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self.opens = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def before_call(self) -> bool:
+        """Raises CircuitOpen; True if this call is the half-open trial"""
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial_running):
+            raise CircuitOpen(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)))
+        if state == "half_open":
+            self._trial_running = True
+            return True
+        return False
+
+    def release_trial(self):
+        """End the half-open trial without a verdict (cancelled or unrelated error)"""
+        self._trial_running = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_running = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            # Yarı açıkken başarısız deneme süreyi yeniden başlatır
+            if self.opened_at is None:
+                self.opens += 1
+            self.opened_at = time.monotonic()
+
+
+class OutboundClient:
+    """Shared pooled httpx.AsyncClient with timeouts, retries and a circuit breaker"""
+
+    def __init__(
+        self,
+        timeout: float = 5.0,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        keepalive_expiry: float = 30.0,
+        retries: int = 2,
+        backoff: float = 0.1,
+        breaker: Optional[CircuitBreaker] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self.requests = 0
+        self.retried = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # İlk kullanımda açılır; start() çağrılmamış olsa da çalışır
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout, limits=self.limits, transport=self.transport
+            )
+        return self._client
+
+    def start(self):
+        self.client
+
+    async def stop(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request; raises CircuitOpen, httpx.TransportError or returns the last response"""
+        try:
+            trial = self.breaker.before_call()
+        except CircuitOpen:
+            self.rejected += 1
+            raise
+        try:
+            return await self._attempts(method, url, **kwargs)
+        finally:
+            # Sonuçlanmadan biten deneme (iptal, DecodingError...) devreyi kilitli bırakmasın
+            if trial:
+                self.breaker.release_trial()
+
+    async def _attempts(self, method: str, url: str, **kwargs) -> httpx.Response:
+        attempts = 1 + (self.retries if method.upper() in IDEMPOTENT_METHODS else 0)
+        for attempt in range(attempts):
+            self.requests += 1
+            last = attempt == attempts - 1
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if last:
+                    self.failed += 1
+                    self.breaker.record_failure()
+                    raise
+                logger.warning("%s %s failed (%s), retrying", method, url, e.__class__.__name__)
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    # 4xx istemci hatasıdır, karşı tarafın sağlığını göstermez
+                    self.breaker.record_success()
+                    return response
+                if last:
+                    self.failed += 1
+                    self.breaker.record_failure()
+                    return response
+                await response.aclose()
+            self.retried += 1
+            # Full jitter: aynı anda düşen istekler aynı anda tekrar denemesin
+            await asyncio.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    def stats(self) -> dict:
+        return {
+            "circuit": self.breaker.state,
+            "circuit_opens": self.breaker.opens,
+            "consecutive_failures": self.breaker.failures,
+            "requests": self.requests,
+            "retried": self.retried,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,122 @@
+"""
+Şifre Özetleme - bcrypt'i event loop dışında, sınırlı bir thread havuzunda çalıştırır
+
+bcrypt deliberately takes tens to hundreds of milliseconds per call; run
+inline it froze every socket on the worker. Calls go to a small thread
+pool (bcrypt releases the GIL while hashing). When more than
+`max_workers + max_queue` calls are in flight new ones are rejected with
+HasherOverloaded, which the API turns into 503 + Retry-After instead of
+letting the backlog grow. Hashes made with a different cost than
+`rounds` are reported by needs_rehash() so login can upgrade them.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import bcrypt
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+
+# $2b$12$ + 22 karakter tuz + 31 karakter özet
+BCRYPT_HASH_RE = re.compile(r"^\$2[abxy]?\$\d{2}\$[./A-Za-z0-9]{53}$")
+
+
+class HasherOverloaded(Exception):
+    """Too many hash/verify calls already waiting"""
+
+    def __init__(self, retry_after: float = 1.0):
+        super().__init__("password hasher overloaded")
+        self.retry_after = retry_after
+
+
+async def hasher_overloaded_handler(request: Request, exc: HasherOverloaded) -> JSONResponse:
+    """Exception handler: shed the request with 503 + Retry-After"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Sunucu şu an yoğun, lütfen tekrar deneyin"},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+    )
+
+
+def hash_rounds(hashed: str) -> Optional[int]:
+    """Cost factor of a "$2b$12$..." hash, None if it is not a bcrypt hash"""
+    parts = hashed.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """bcrypt on a bounded thread pool with load shedding"""
+
+    def __init__(self, rounds: int = 12, max_workers: Optional[int] = None, max_queue: int = 32):
+        self.rounds = rounds
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="bcrypt")
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+
+    def _hash(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(self.rounds)).decode("utf-8")
+
+    @staticmethod
+    def _verify(password: str, hashed: str) -> bool:
+        try:
+            return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+        except ValueError:
+            # Boş / bozuk özet (ör. yalnızca OAuth ile giriş yapan hesap)
+            return False
+
+    async def _run(self, fn, *args):
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            # Kuyruğun erimesi için tahmini süre
+            mean = self.busy_seconds / self.completed if self.completed else 0.25
+            raise HasherOverloaded(self._in_flight / self.max_workers * mean)
+        self._in_flight += 1
+        started = time.monotonic()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._in_flight -= 1
+            self.completed += 1
+            self.busy_seconds += time.monotonic() - started
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self._hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        # Kırpılmış özetlerde bcrypt ValueError yerine panic fırlatıyor, havuza hiç gönderme
+        if not hashed or not BCRYPT_HASH_RE.match(hashed):
+            return False
+        return await self._run(self._verify, password, hashed)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        rounds = hash_rounds(hashed)
+        return rounds is not None and rounds != self.rounds
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "rounds": self.rounds,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "mean_seconds": round(self.busy_seconds / self.completed, 4) if self.completed else 0.0,
+        }
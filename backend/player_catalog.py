@@ -0,0 +1,177 @@
+"""
+Oyuncu Kataloğu - POPULAR_PLAYERS için bir kez kurulan indeksler
+
+Career Path endpoints used to scan the whole player list (lowercasing
+every name) per request. The catalog is built once: a lowercased-name
+dict, per-difficulty buckets for random picks, and per player the
+interned nationality / position codes and a frozen set of teams, so a
+guess check is a couple of dict lookups and a set intersection.
+
+Free-text guesses go through `resolve()`: exact name first, then the
+accent/case-folded full name or surname ("odegaard" -> Martin Ødegaard),
+then the closest folded name within a small edit distance. Typos are
+corrected word by word against a SymSpell-style deletion index of the
+(much smaller) name vocabulary; the players containing a correction of
+every guessed word come from set intersections over per-word player
+sets, and only those are compared against the whole guess.
+
+A guess that fits several different players equally well (a surname
+three players share, a typo halfway between two names) resolves to
+nobody rather than to an arbitrary one of them.
+"""
+
+import random
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set
+
+from text_folding import DeleteIndex, bounded_distance, fold
+
+
+# Kısa soyadlar ("kim", "rui") tek başına fazla belirsiz
+MIN_SURNAME_LENGTH = 4
+
+
+def max_typos(folded: str) -> int:
+    """Edit distance tolerated for a folded guess of this length"""
+    if len(folded) <= 3:
+        return 0
+    return 1 if len(folded) <= 7 else 2
+
+
+class CatalogEntry(NamedTuple):
+    player: dict
+    nationality: int
+    position: int
+    teams: FrozenSet[str]
+    folded: str
+
+
+class PlayerCatalog:
+    """Read-only indexes over a list of player dicts"""
+
+    def __init__(self, players: List[dict]):
+        self.players = players
+        self._by_name: Dict[str, CatalogEntry] = {}
+        self._by_difficulty: Dict[str, List[dict]] = {}
+        # Ülke / pozisyon adı -> küçük tamsayı kodu
+        self._codes: Dict[str, int] = {}
+        # Katlanmış tam ad ve soyad -> oyuncu(lar)
+        self._aliases: Dict[str, List[CatalogEntry]] = {}
+        self._entries: List[CatalogEntry] = []
+        # Katlanmış kelime -> o kelimeyi içeren oyuncuların _entries sırası (yazım hatası düzeltme)
+        self._words = DeleteIndex(max_distance=2)
+        self._players_with: Dict[str, Set[int]] = {}
+
+        for player in players:
+            difficulty = player.get("difficulty")
+            self._by_difficulty.setdefault(difficulty, []).append(player)
+            key = player["name"].lower()
+            # Aynı isim birden fazla ligde geçebiliyor; eski taramadaki gibi ilki kazanır
+            if key in self._by_name:
+                continue
+            entry = self._by_name[key] = CatalogEntry(
+                player,
+                self._code("nationality:" + str(player.get("nationality"))),
+                self._code("position:" + str(player.get("position"))),
+                frozenset(t["team"] for t in player.get("team_history", [])),
+                fold(player["name"]),
+            )
+            words = entry.folded.split()
+            self._aliases.setdefault(entry.folded, []).append(entry)
+            if len(words) > 1:
+                # Boşluksuz yazılmış tam ad: "alassanenubel"
+                self._aliases.setdefault("".join(words), []).append(entry)
+                if len(words[-1]) >= MIN_SURNAME_LENGTH:
+                    self._aliases.setdefault(words[-1], []).append(entry)
+            position = len(self._entries)
+            self._entries.append(entry)
+            for word in words:
+                self._words.add(word)
+                self._players_with.setdefault(word, set()).add(position)
+
+    def _code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._codes)
+        return code
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def entry(self, name: str) -> Optional[CatalogEntry]:
+        """Case-insensitive exact-name lookup (name.lower(), like the old scan)"""
+        return self._by_name.get(name.lower())
+
+    def find(self, name: str) -> Optional[dict]:
+        entry = self.entry(name)
+        return entry.player if entry is not None else None
+
+    def resolve(self, guess: str, prefer: Optional[CatalogEntry] = None) -> Optional[CatalogEntry]:
+        """Player a free-text guess most likely means, or None
+
+        None also when the best matches are different players (a shared
+        surname, a typo equally close to two names). `prefer` (the player
+        being guessed) only breaks ties between players of the same name.
+        """
+        entry = self.entry(guess.strip())
+        if entry is not None:
+            # Yalnızca aksanı farklı aynı ad: tahmin edilen oyuncu sayılır
+            if prefer is not None and prefer.folded == entry.folded:
+                return prefer
+            return entry
+        folded = fold(guess)
+        if not folded:
+            return None
+        matches = self._aliases.get(folded) or self._closest(folded)
+        if not matches or any(match.folded != matches[0].folded for match in matches):
+            return None
+        if prefer is not None and any(match is prefer for match in matches):
+            return prefer
+        return matches[0]
+
+    def _closest(self, folded: str) -> List[CatalogEntry]:
+        """Players whose folded name (or surname, for one word) is nearest within max_typos"""
+        budget = max_typos(folded)
+        if budget == 0:
+            return []
+        words = folded.split()
+
+        if len(words) == 1:
+            scored = []
+            for distance, word in self._words.search(folded, budget):
+                for position in self._players_with[word]:
+                    entry = self._entries[position]
+                    # Tek kelime yalnızca soyada ya da tek isimli oyuncuya eşlenir
+                    last = entry.folded.rsplit(" ", 1)[-1]
+                    if last == word and (len(word) >= MIN_SURNAME_LENGTH or last == entry.folded):
+                        scored.append((distance, entry))
+        else:
+            # Her kelime için: düzeltmelerinden birini içeren oyuncular; kesişim tüm kelimelere uyanlar
+            groups = []
+            for word in words:
+                # Diğer kelimeler aday kümesini daralttığı için 3 harflik kelimede de bir hata olabilir
+                allowed = max_typos(word) or (1 if len(word) >= 3 else 0)
+                found = self._words.search(word, min(budget, allowed))
+                if not found:
+                    return []
+                groups.append([self._players_with[correction] for _, correction in found])
+            groups.sort(key=lambda sets: sum(len(players) for players in sets))
+            candidates = set().union(*groups[0])
+            for sets in groups[1:]:
+                candidates = {position for position in candidates if any(position in players for players in sets)}
+                if not candidates:
+                    return []
+            scored = []
+            for position in candidates:
+                entry = self._entries[position]
+                scored.append((bounded_distance(folded, entry.folded, budget), entry))
+
+        scored = [(distance, entry) for distance, entry in scored if distance <= budget]
+        if not scored:
+            return []
+        best = min(distance for distance, _ in scored)
+        return [entry for distance, entry in scored if distance == best]
+
+    def random_player(self, difficulty: str = "all") -> dict:
+        """Uniform pick from the difficulty's bucket; falls back to every player"""
+        bucket = self.players if difficulty == "all" else self._by_difficulty.get(difficulty)
+        return random.choice(bucket or self.players)
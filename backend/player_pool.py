@@ -0,0 +1,328 @@
+"""
+Oyuncu Havuzu - players koleksiyonunun bellekteki, salt okunur kopyası
+
+Loaded once at startup and reloaded when the seeders bump the version in
+db.meta (or when the snapshot gets too old), so question generation never
+touches MongoDB.
+"""
+
+import asyncio
+import logging
+import random
+import re
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+POOL_META_ID = "players"
+
+# Oyuncu dokümanlarından okunan alanlar; market_values geçmişinden yalnızca son değer gelir
+POOL_PROJECTION = {
+    "_id": 0, "name": 1, "team_history": 1, "teams": 1,
+    "nationality": 1, "position": 1, "market_values": {"$slice": -1}, "difficulty": 1
+}
+
+
+class PoolPlayer(NamedTuple):
+    name: str
+    team_history: Tuple[Tuple[str, str], ...]  # (team, years)
+    nationality: str
+    position: str
+    market_value: Optional[str]
+    difficulty: str
+
+    @property
+    def teams(self) -> Tuple[str, ...]:
+        return tuple(team for team, _ in self.team_history)
+
+    def as_dict(self) -> dict:
+        """Client-facing player data (no DB internals)"""
+        return {
+            "name": self.name,
+            "team_history": [{"team": team, "years": years} for team, years in self.team_history],
+            "nationality": self.nationality,
+            "position": self.position,
+        }
+
+
+def format_market_value(value) -> Optional[str]:
+    """200000000 -> '200M €'; string values are kept as they are"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        if value >= 1_000_000:
+            return f"{int(value // 1_000_000)}M €"
+        return f"{int(value // 1_000)}K €"
+    return str(value)
+
+
+def _difficulty_for(doc: dict, market_value) -> str:
+    if doc.get("difficulty"):
+        return doc["difficulty"]
+    # Seed verisinde zorluk yok, piyasa değerinden tahmin et
+    if isinstance(market_value, (int, float)):
+        if market_value >= 50_000_000:
+            return "easy"
+        if market_value >= 15_000_000:
+            return "medium"
+        return "hard"
+    return "medium"
+
+
+def compact_player(doc: dict) -> Optional[PoolPlayer]:
+    """Normalize both seed schemas (team_history / teams) into a PoolPlayer"""
+    name = doc.get("name")
+    if not name:
+        return None
+
+    history = []
+    for entry in doc.get("team_history") or doc.get("teams") or []:
+        team = entry.get("team")
+        if not team:
+            continue
+        years = entry.get("years", "")
+        if isinstance(years, (list, tuple)):
+            years = "-".join(str(y) for y in years)
+        history.append((team, str(years)))
+
+    market_values = doc.get("market_values") or []
+    raw_value = market_values[-1].get("value") if market_values else None
+
+    return PoolPlayer(
+        name=name,
+        team_history=tuple(history),
+        nationality=doc.get("nationality", ""),
+        position=doc.get("position", ""),
+        market_value=format_market_value(raw_value),
+        difficulty=_difficulty_for(doc, raw_value),
+    )
+
+
+def _freeze_index(index: Dict[str, List[int]]) -> Dict[str, Tuple[int, ...]]:
+    return {key: tuple(ids) for key, ids in index.items()}
+
+
+YEAR_RE = re.compile(r"(\d{4})")
+
+# İki takım bu kadar yıl yakın dönemdeyse "aynı dönem" sayılır
+ERA_WINDOW = 10
+
+
+def _start_year(years: str) -> Optional[int]:
+    match = YEAR_RE.search(years or "")
+    return int(match.group(1)) if match else None
+
+
+class TeamUniverse:
+    """Deduplicated team index with precomputed plausible-distractor lists"""
+
+    def __init__(self, players: Tuple[PoolPlayer, ...]):
+        start_years: Dict[str, List[int]] = {}
+        neighbours: Dict[str, set] = {}
+        for player in players:
+            teams = set()
+            for team, years in player.team_history:
+                teams.add(team)
+                year = _start_year(years)
+                if year is not None:
+                    start_years.setdefault(team, []).append(year)
+                else:
+                    start_years.setdefault(team, [])
+            # Aynı oyuncunun kariyerindeki takımlar genelde aynı lig/ülke çevresinde
+            for team in teams:
+                neighbours.setdefault(team, set()).update(teams - {team})
+
+        self.teams: Tuple[str, ...] = tuple(sorted(start_years))
+        self.era: Dict[str, Optional[int]] = {}
+        for team, years in start_years.items():
+            years.sort()
+            self.era[team] = years[len(years) // 2] if years else None
+
+        by_decade: Dict[Optional[int], List[str]] = {}
+        for team in self.teams:
+            era = self.era[team]
+            by_decade.setdefault(era // 10 if era is not None else None, []).append(team)
+        self.by_decade = {decade: tuple(teams) for decade, teams in by_decade.items()}
+
+        self.plausible: Dict[str, Tuple[str, ...]] = {}
+        for team in self.teams:
+            era = self.era[team]
+            self.plausible[team] = tuple(sorted(
+                other for other in neighbours.get(team, ())
+                if era is None or self.era[other] is None or abs(self.era[other] - era) <= ERA_WINDOW
+            ))
+
+    def __len__(self) -> int:
+        return len(self.teams)
+
+    def _candidate_tiers(self, team: str):
+        yield self.plausible.get(team, ())
+        era = self.era.get(team)
+        yield self.by_decade.get(era // 10 if era is not None else None, ())
+        yield self.teams
+
+    def sample_distractors(self, team: str, exclude=(), count: int = 3) -> List[str]:
+        """Pick `count` wrong teams, preferring linked clubs of the same era
+
+        Each option is a random.choice from a precomputed tuple with a
+        bounded number of rejections, so the cost does not grow with the pool.
+        If the draws keep hitting blocked teams, the rest is filled by walking
+        the team list from a random offset, so fewer than `count` options
+        come back only when the universe has fewer other teams.
+        """
+        picked: List[str] = []
+        blocked = set(exclude)
+        blocked.add(team)
+        for candidates in self._candidate_tiers(team):
+            if not candidates:
+                continue
+            attempts = 4 * count
+            while len(picked) < count and attempts > 0:
+                attempts -= 1
+                choice = random.choice(candidates)
+                if choice not in blocked:
+                    blocked.add(choice)
+                    picked.append(choice)
+            if len(picked) == count:
+                return picked
+        # Şans kötü gittiyse (ya da takım az) rastgele bir noktadan sırayla doldur
+        if self.teams:
+            start = random.randrange(len(self.teams))
+            for i in range(len(self.teams)):
+                choice = self.teams[(start + i) % len(self.teams)]
+                if choice not in blocked:
+                    blocked.add(choice)
+                    picked.append(choice)
+                    if len(picked) == count:
+                        break
+        return picked
+
+
+class PlayerPool:
+    """Immutable snapshot of the player collection with secondary indexes"""
+
+    def __init__(self, players: List[PoolPlayer], version: int = 0):
+        self.version = version
+        self.loaded_at = time.time()
+        self.players: Tuple[PoolPlayer, ...] = tuple(players)
+        self.names: Tuple[str, ...] = tuple(p.name for p in self.players)
+
+        by_nationality: Dict[str, List[int]] = {}
+        by_position: Dict[str, List[int]] = {}
+        by_team: Dict[str, List[int]] = {}
+        by_difficulty: Dict[str, List[int]] = {}
+        for i, player in enumerate(self.players):
+            by_nationality.setdefault(player.nationality, []).append(i)
+            by_position.setdefault(player.position, []).append(i)
+            by_difficulty.setdefault(player.difficulty, []).append(i)
+            for team in set(player.teams):
+                by_team.setdefault(team, []).append(i)
+
+        self.by_nationality = _freeze_index(by_nationality)
+        self.by_position = _freeze_index(by_position)
+        self.by_team = _freeze_index(by_team)
+        self.by_difficulty = _freeze_index(by_difficulty)
+        self.team_universe = TeamUniverse(self.players)
+
+    @classmethod
+    def from_documents(cls, docs: List[dict], version: int = 0) -> "PlayerPool":
+        seen = set()
+        players = []
+        for doc in docs:
+            player = compact_player(doc)
+            if player and player.name not in seen:
+                seen.add(player.name)
+                players.append(player)
+        return cls(players, version)
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def sample(self, count: int, difficulty: Optional[str] = None) -> List[PoolPlayer]:
+        """Random distinct players, optionally from one difficulty bucket"""
+        if difficulty and difficulty in self.by_difficulty:
+            ids = self.by_difficulty[difficulty]
+            return [self.players[i] for i in random.sample(ids, min(count, len(ids)))]
+        return random.sample(self.players, min(count, len(self.players)))
+
+    def random_names(self, count: int, exclude: str) -> List[str]:
+        """Distinct random names other than `exclude` (rejection sampling, O(count))"""
+        if len(self.names) <= count:
+            return [n for n in self.names if n != exclude][:count]
+        picked = set()
+        while len(picked) < count:
+            name = random.choice(self.names)
+            if name != exclude:
+                picked.add(name)
+        return list(picked)
+
+
+async def read_pool_version(db) -> int:
+    meta = await db.meta.find_one({"_id": POOL_META_ID}, {"version": 1})
+    return meta.get("version", 0) if meta else 0
+
+
+async def bump_pool_version(db) -> int:
+    """Called by the seeders after rewriting the players collection"""
+    meta = await db.meta.find_one_and_update(
+        {"_id": POOL_META_ID},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return meta["version"]
+
+
+class PlayerPoolService:
+    """Holds the current PlayerPool and swaps in a fresh one when the data changes"""
+
+    def __init__(self, check_interval: float = 60.0, max_age: float = 3600.0):
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self.current = PlayerPool([])
+        self._task: Optional[asyncio.Task] = None
+
+    async def load(self, db) -> PlayerPool:
+        version = await read_pool_version(db)
+        docs = await db.players.find({}, POOL_PROJECTION).to_list(None)
+        # Referans ataması atomik; okuyucular ya eski ya yeni snapshot'ı görür
+        self.current = PlayerPool.from_documents(docs, version)
+        logger.info("Player pool loaded: %d players (version %d)", len(self.current), version)
+        return self.current
+
+    async def refresh_if_stale(self, db) -> bool:
+        version = await read_pool_version(db)
+        too_old = time.time() - self.current.loaded_at > self.max_age
+        if version != self.current.version or too_old:
+            await self.load(db)
+            return True
+        return False
+
+    async def _refresh_loop(self, db):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.refresh_if_stale(db)
+            except Exception as e:
+                logger.error("Player pool refresh failed: %s", e)
+
+    def start(self, db):
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop(db))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        pool = self.current
+        return {
+            "players": len(pool),
+            "version": pool.version,
+            "age_seconds": round(time.time() - pool.loaded_at, 1),
+            "teams": len(pool.team_universe),
+        }
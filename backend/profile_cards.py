@@ -0,0 +1,60 @@
+"""
+Profil Kartları - user_id -> herkese açık profil alanları (toplu okuma + LRU/TTL)
+
+Endpoints that list other users (daily/weekly leaderboards, friend
+requests, ...) hydrate all rows with one `hydrate()` call: cached cards
+are served from memory and the rest are read with a single $in query,
+so the cost no longer grows with one round-trip per row.
+"""
+
+import copy
+import time
+from typing import Dict, Iterable
+
+from ttl_cache import TTLCache
+
+
+# Başka kullanıcılara gösterilen alanlar
+PROFILE_CARD_PROJECTION = {"_id": 0, "user_id": 1, "username": 1, "name": 1, "avatar": 1}
+
+
+class ProfileCardCache(TTLCache):
+    """Profile cards keyed by user_id, filled in batches from `collection`"""
+
+    def __init__(self, collection, max_entries: int = 20000, ttl_seconds: float = 30.0):
+        super().__init__(max_entries, ttl_seconds)
+        self.collection = collection
+        self.queries = 0
+
+    async def hydrate(self, user_ids: Iterable[str]) -> Dict[str, dict]:
+        """Cards for the given users (unknown users are left out), one query at most"""
+        now = time.monotonic()
+        cards: Dict[str, dict] = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            if user_id is None:
+                continue
+            card = self.get(user_id, now)
+            if card is not None:
+                cards[user_id] = card
+            else:
+                missing.append(user_id)
+
+        if missing:
+            self.queries += 1
+            found = await self.collection.find(
+                {"user_id": {"$in": missing}}, PROFILE_CARD_PROJECTION
+            ).to_list(None)
+            for card in found:
+                cards[card["user_id"]] = card
+                self.put(card["user_id"], card, now=now)
+
+        # Çağıran satırlara karıştırabilir, önbelleği korumak için kopyala
+        return {user_id: copy.copy(card) for user_id, card in cards.items()}
+
+    def invalidate(self, user_id: str):
+        """Drop a card after the user's username/name/avatar changed"""
+        self.pop(user_id)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "queries": self.queries}
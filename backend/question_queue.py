@@ -0,0 +1,167 @@
+"""
+Soru Seti Kuyruğu - her oyun modu için önceden hazırlanmış 10 soruluk setler
+
+A background producer keeps a bounded deque of ready question sets per
+mode, so creating a match is a pop instead of a generation pass.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUE_MODES = ("mystery-player", "value-guess", "career-path", "letter-hunt", "default")
+
+
+class QuestionSet(NamedTuple):
+    pool_version: int
+    questions: List[dict]
+    players: frozenset
+
+
+def _question_players(questions: List[dict]) -> frozenset:
+    return frozenset(q.get("player_name") or q["correct_answer"] for q in questions)
+
+
+class RecentPlayers:
+    """Bounded per-user memory of recently seen players (LRU over users)"""
+
+    def __init__(self, per_user: int = 60, max_users: int = 50000):
+        self.per_user = per_user
+        self.max_users = max_users
+        self._users: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def seen(self, user_id: str) -> set:
+        entry = self._users.get(user_id)
+        return entry[1] if entry else set()
+
+    def remember(self, user_id: str, players: Iterable[str]):
+        entry = self._users.get(user_id)
+        if entry is None:
+            entry = (deque(), set())
+            self._users[user_id] = entry
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+
+        order, members = entry
+        for name in players:
+            if name in members:
+                continue
+            order.append(name)
+            members.add(name)
+            if len(order) > self.per_user:
+                members.discard(order.popleft())
+
+
+class QuestionSetQueue:
+    """Per-mode buffers of question sets, refilled asynchronously"""
+
+    def __init__(
+        self,
+        generator: Callable[[str, int], List[dict]],
+        pool_version: Callable[[], int],
+        depth: int = 8,
+        questions_per_set: int = 10,
+        scan_window: int = 4,
+        recent_per_user: int = 60
+    ):
+        self.generator = generator
+        self.pool_version = pool_version
+        self.depth = depth
+        self.questions_per_set = questions_per_set
+        self.scan_window = scan_window
+        self.recent = RecentPlayers(per_user=recent_per_user)
+        self._sets: Dict[str, deque] = {mode: deque() for mode in QUEUE_MODES}
+        self._refill = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.repeats_avoided = 0
+
+    @staticmethod
+    def mode_key(game_mode: str) -> str:
+        return game_mode if game_mode in QUEUE_MODES else "default"
+
+    def _generate(self, mode: str) -> QuestionSet:
+        questions = self.generator(mode, self.questions_per_set)
+        return QuestionSet(self.pool_version(), questions, _question_players(questions))
+
+    def take(self, game_mode: str, user_ids: Iterable[str] = ()) -> List[dict]:
+        """Pop a ready set, skipping ones the players have seen recently"""
+        mode = self.mode_key(game_mode)
+        buffer = self._sets[mode]
+        user_ids = [u for u in user_ids if u]
+        version = self.pool_version()
+
+        # Havuz yenilendiyse eski sürümden kalan setleri at
+        while buffer and buffer[0].pool_version != version:
+            buffer.popleft()
+
+        chosen = None
+        if buffer:
+            seen = set()
+            for user_id in user_ids:
+                seen |= self.recent.seen(user_id)
+            index = 0
+            for i in range(min(self.scan_window, len(buffer))):
+                if not (buffer[i].players & seen):
+                    index = i
+                    break
+            if index:
+                self.repeats_avoided += 1
+            chosen = buffer[index]
+            del buffer[index]
+            self.hits += 1
+        else:
+            # Kuyruk boşsa (ör. ani yoğunluk) seti yerinde üret
+            chosen = self._generate(mode)
+            self.misses += 1
+
+        for user_id in user_ids:
+            self.recent.remember(user_id, chosen.players)
+        self._refill.set()
+        return chosen.questions
+
+    def fill(self):
+        """Top every buffer up to depth synchronously (startup)"""
+        for mode, buffer in self._sets.items():
+            while len(buffer) < self.depth:
+                question_set = self._generate(mode)
+                if not question_set.questions:
+                    break
+                buffer.append(question_set)
+
+    async def _producer(self):
+        while True:
+            await self._refill.wait()
+            self._refill.clear()
+            for mode, buffer in self._sets.items():
+                while len(buffer) < self.depth:
+                    question_set = self._generate(mode)
+                    if not question_set.questions:
+                        break
+                    buffer.append(question_set)
+                    # Her set arasında event loop'a nefes aldır
+                    await asyncio.sleep(0)
+
+    def start(self):
+        if self._task is None:
+            self.fill()
+            self._task = asyncio.create_task(self._producer())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "depth": {mode: len(buffer) for mode, buffer in self._sets.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+            "repeats_avoided": self.repeats_avoided,
+        }
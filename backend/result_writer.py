@@ -0,0 +1,188 @@
+"""
+Maç Sonucu Yazıcı - biten maçların istatistiklerini toplu yazar (write-behind)
+
+end_game only records each player's outcome here. Outcomes for the same
+user are coalesced in memory and flushed periodically as one unordered
+bulk_write of pipeline updates; the league (stats.rank) is computed by
+MongoDB from the updated points, so no read-back is needed. Everything
+still pending is flushed on shutdown.
+"""
+
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+def _add(field: str, amount: int) -> dict:
+    return {"$add": [{"$ifNull": ["$" + field, 0]}, amount]}
+
+
+class PendingResult:
+    """Not-yet-written outcomes of one user, merged"""
+
+    __slots__ = ("games", "points", "xp", "coins", "wins", "losses", "streak_reset", "streak_wins")
+
+    def __init__(self):
+        self.games = 0
+        self.points = 0
+        self.xp = 0
+        self.coins = 0
+        self.wins = 0
+        self.losses = 0
+        # Bir yenilgi seriyi sıfırlar; sonraki galibiyetler sıfırdan sayılır
+        self.streak_reset = False
+        self.streak_wins = 0
+
+    def add(self, points: int, xp: int, coins: int, outcome: str):
+        self.games += 1
+        self.points += points
+        self.xp += xp
+        self.coins += coins
+        if outcome == "win":
+            self.wins += 1
+            self.streak_wins += 1
+        elif outcome == "loss":
+            self.losses += 1
+            self.streak_reset = True
+            self.streak_wins = 0
+
+
+class ResultWriter:
+    """Coalesces end-of-match stat updates into periodic bulk_write flushes"""
+
+    def __init__(
+        self,
+        collection,
+        league_table,
+        flush_interval: float = 0.5,
+        max_pending: int = 1000,
+        on_flushed: Optional[Callable[[List[str]], None]] = None
+    ):
+        self.collection = collection
+        self.rank_expr = league_table.mongo_switch("$stats.points")
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.on_flushed = on_flushed
+        self._pending: Dict[str, PendingResult] = {}
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.flushes = 0
+        self.users_written = 0
+        self.failures = 0
+
+    def record(self, user_id: str, points: int, xp: int, coins: int, outcome: str):
+        """outcome: 'win' | 'loss' | 'draw'"""
+        pending = self._pending.get(user_id)
+        if pending is None:
+            pending = self._pending[user_id] = PendingResult()
+        pending.add(points, xp, coins, outcome)
+        if len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+
+    def _update_for(self, user_id: str, pending: PendingResult) -> UpdateOne:
+        counters = {
+            "stats.total_games": _add("stats.total_games", pending.games),
+            "stats.points": _add("stats.points", pending.points),
+            "stats.xp": _add("stats.xp", pending.xp),
+            "coins": _add("coins", pending.coins),
+        }
+        if pending.wins:
+            counters["stats.wins"] = _add("stats.wins", pending.wins)
+        if pending.losses:
+            counters["stats.losses"] = _add("stats.losses", pending.losses)
+        if pending.streak_reset:
+            counters["stats.win_streak"] = pending.streak_wins
+        elif pending.streak_wins:
+            counters["stats.win_streak"] = _add("stats.win_streak", pending.streak_wins)
+
+        return UpdateOne({"user_id": user_id}, [
+            {"$set": counters},
+            # Lig, güncellenmiş puandan sunucu tarafında hesaplanır
+            {"$set": {"stats.rank": self.rank_expr}}
+        ])
+
+    def _requeue(self, batch: Dict[str, PendingResult]):
+        # Yazılamayanları, bu arada gelen yeni sonuçların önüne geri koy
+        for user_id, pending in batch.items():
+            newer = self._pending.get(user_id)
+            if newer is not None:
+                pending.games += newer.games
+                pending.points += newer.points
+                pending.xp += newer.xp
+                pending.coins += newer.coins
+                pending.wins += newer.wins
+                pending.losses += newer.losses
+                if newer.streak_reset:
+                    pending.streak_reset = True
+                    pending.streak_wins = newer.streak_wins
+                else:
+                    pending.streak_wins += newer.streak_wins
+            self._pending[user_id] = pending
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            user_ids = list(batch)
+            operations = [self._update_for(user_id, batch[user_id]) for user_id in user_ids]
+            try:
+                # Her kullanıcı batch'te tek kez geçtiği için sıra önemsiz
+                await self.collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                failed = {user_ids[error["index"]] for error in e.details.get("writeErrors", [])}
+                self._requeue({user_id: batch[user_id] for user_id in failed})
+                self.failures += 1
+                logger.error("Result flush: %d of %d updates failed", len(failed), len(user_ids))
+                user_ids = [user_id for user_id in user_ids if user_id not in failed]
+            except Exception as e:
+                self._requeue(batch)
+                self.failures += 1
+                logger.error("Result flush failed, %d users kept for retry: %s", len(user_ids), e)
+                return 0
+
+            self.flushes += 1
+            self.users_written += len(user_ids)
+            if self.on_flushed:
+                self.on_flushed(user_ids)
+            return len(user_ids)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write everything still pending"""
+        # İptal etmek yazılmakta olan batch'i kaybettirir; döngünün bitmesini bekle
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._pending:
+            logger.error("Result writer stopped with %d unwritten users", len(self._pending))
+
+    def stats(self) -> dict:
+        return {
+            "pending_users": len(self._pending),
+            "flushes": self.flushes,
+            "users_written": self.users_written,
+            "failures": self.failures,
+        }
@@ -0,0 +1,109 @@
+"""
+Tur Zamanlayıcı - tüm aktif oyunların zaman aşımlarını tek bir task yönetir
+
+Each room has at most one pending deadline (next round start, round
+timeout, ...). Deadlines live in a heap serviced by a single task;
+scheduling a new deadline for a room replaces the old one, so an early
+"everyone answered" transition implicitly cancels the pending timeout.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class RoundScheduler:
+    """Heap of per-room deadlines driven by one worker task"""
+
+    def __init__(self):
+        # (deadline, seq, room_id, callback, args)
+        self._heap: List[tuple] = []
+        # room_id -> seq of the live entry; heap'teki diğerleri iptal edilmiş sayılır
+        self._pending: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+        self.fired = 0
+
+    def schedule(self, room_id: str, delay: float, callback: Callable[..., Awaitable], *args):
+        """Run `callback(*args)` after `delay` seconds, replacing the room's pending timer"""
+        loop = asyncio.get_running_loop()
+        seq = next(self._seq)
+        deadline = loop.time() + delay
+        self._pending[room_id] = seq
+        earliest = self._heap[0][0] if self._heap else None
+        heapq.heappush(self._heap, (deadline, seq, room_id, callback, args))
+        if earliest is None or deadline < earliest:
+            self._wakeup.set()
+        self._compact()
+
+    def cancel(self, room_id: str):
+        self._pending.pop(room_id, None)
+
+    def _is_live(self, entry: tuple) -> bool:
+        return self._pending.get(entry[2]) == entry[1]
+
+    def _compact(self):
+        # Lazy silme: iptal edilen kayıtlar birikirse heap'i yeniden kur
+        if len(self._heap) > 2 * len(self._pending) + 64:
+            self._heap = [entry for entry in self._heap if self._is_live(entry)]
+            heapq.heapify(self._heap)
+
+    def _fire(self, entry: tuple):
+        _, _, room_id, callback, args = entry
+        del self._pending[room_id]
+        self.fired += 1
+        task = asyncio.create_task(callback(*args))
+        self._running.add(task)
+        task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: asyncio.Task):
+        self._running.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Scheduled round callback failed", exc_info=task.exception())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            while self._heap and not self._is_live(self._heap[0]):
+                heapq.heappop(self._heap)
+
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - loop.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._fire(heapq.heappop(self._heap))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._running):
+            task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "heap_size": len(self._heap),
+            "running_callbacks": len(self._running),
+            "fired": self.fired,
+        }
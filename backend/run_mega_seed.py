@@ -7,6 +7,7 @@ import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
+from player_pool import bump_pool_version
 from pathlib import Path
 
 # Load all parts
@@ -89,6 +90,10 @@ async def seed_database():
     for pos in positions:
         print(f"  {pos['_id']}: {pos['count']} players")
     
+    # Çalışan sunucuların oyuncu havuzunu yenilemesi için
+    version = await bump_pool_version(db)
+    print(f"Player pool version: {version}")
+    
     client.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,329 @@
+"""
+Skor Defteri - skor olayları + günlük / haftalık toplamlar (daily_scores, weekly_scores)
+
+end_game, submit_game_result and submit_career_path_score append one
+small event per scored game to `score_events` (buffered, insert_many).
+A periodic rollup aggregates only the events past each target's
+watermark and $merge-adds them into the per-day / per-ISO-week totals, so
+the time-windowed leaderboards are a plain indexed range read.
+
+Events carry two times: `at` (when the game was scored; picks the day /
+week) and `logged_at` (stamped right before each insert attempt). The
+watermark follows `logged_at`, so events held back by a Mongo outage and
+retried later still land past the watermark and are rolled up into
+their original period. The lag only has to cover one insert_many and the
+clock skew between workers. The weekly rollup uses $dateTrunc, so
+MongoDB 5.0 or newer is required.
+
+A lease in `score_rollup_state` keeps two workers (or a backfill) from
+adding the same window twice. Totals can be rebuilt from the ledger:
+    python score_ledger.py backfill                     # everything
+    python score_ledger.py backfill --since 2026-01-01  # from that day/week on
+"""
+
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+EVENTS = "score_events"
+STATE = "score_rollup_state"
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+DUPLICATE_KEY = 11000
+
+# hedef koleksiyon -> (dönem alanı, olay zamanından dönem anahtarı)
+ROLLUPS = {
+    "daily_scores": ("date", {"$dateToString": {"format": "%Y-%m-%d", "date": "$at"}}),
+    # /leaderboard/weekly ile aynı: haftanın Pazartesi günü (ISO hafta)
+    "weekly_scores": ("week_start", {"$dateToString": {
+        "format": "%Y-%m-%d",
+        "date": {"$dateTrunc": {"date": "$at", "unit": "week", "startOfWeek": "monday"}}
+    }}),
+}
+
+
+def period_start(target: str, moment: datetime) -> datetime:
+    """Start of the day / week `moment` falls in (UTC)"""
+    start = moment.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if target == "weekly_scores":
+        start -= timedelta(days=start.weekday())
+    return start
+
+
+def rollup_match(start: datetime, end: datetime, played_from: Optional[datetime] = None) -> dict:
+    """Events logged in (start, end], optionally only those played at or after `played_from`"""
+    logged = {"$gt": start, "$lte": end}
+    # logged_at'tan önceki sürümün yazdığı olaylarda yalnızca at var
+    match = {"$or": [{"logged_at": logged}, {"logged_at": {"$exists": False}, "at": logged}]}
+    if played_from is not None:
+        match["at"] = {"$gte": played_from}
+    return match
+
+
+def rollup_pipeline(
+    target: str, start: datetime, end: datetime, played_from: Optional[datetime] = None
+) -> List[dict]:
+    """Aggregate events logged in (start, end] and add them into `target`"""
+    period_field, period_expr = ROLLUPS[target]
+    return [
+        {"$match": rollup_match(start, end, played_from)},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "period": period_expr},
+            "points": {"$sum": "$points"},
+            "games": {"$sum": 1},
+            "wins": {"$sum": {"$cond": [{"$eq": ["$won", True]}, 1, 0]}},
+        }},
+        {"$project": {
+            "_id": 0,
+            "user_id": "$_id.user_id",
+            period_field: "$_id.period",
+            "points": 1,
+            "games": 1,
+            "wins": 1,
+            "updated_at": "$$NOW",
+        }},
+        # on alanlarında unique index gerekir (db_indexes.py)
+        {"$merge": {
+            "into": target,
+            "on": ["user_id", period_field],
+            "whenMatched": [{"$set": {
+                "points": {"$add": [{"$ifNull": ["$points", 0]}, "$$new.points"]},
+                "games": {"$add": [{"$ifNull": ["$games", 0]}, "$$new.games"]},
+                "wins": {"$add": [{"$ifNull": ["$wins", 0]}, "$$new.wins"]},
+                "updated_at": "$$new.updated_at",
+            }}],
+            "whenNotMatched": "insert",
+        }},
+    ]
+
+
+async def claim_rollup(db, target: str, lease_seconds: float) -> Optional[datetime]:
+    """Take the target's lease and return its watermark; None if someone else holds it"""
+    now = datetime.now(timezone.utc)
+    try:
+        state = await db[STATE].find_one_and_update(
+            {"_id": target, "busy_until": {"$not": {"$gt": now}}},
+            {"$set": {"busy_until": now + timedelta(seconds=lease_seconds)}},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+    except DuplicateKeyError:
+        # Belge var ama kiralık; upsert yeni _id ile çakıştı
+        return None
+    watermark = (state or {}).get("watermark") or EPOCH
+    return watermark if watermark.tzinfo else watermark.replace(tzinfo=timezone.utc)
+
+
+async def release_rollup(db, target: str, watermark: Optional[datetime] = None):
+    update = {"$set": {"busy_until": None}}
+    if watermark is not None:
+        update["$set"]["watermark"] = watermark
+    await db[STATE].update_one({"_id": target}, update)
+
+
+async def rollup(db, lag_seconds: float = 120.0, lease_seconds: float = 300.0) -> dict:
+    """Add every event logged more than `lag_seconds` ago and past the watermark
+
+    The lag leaves room for inserts still in flight on other workers (and
+    their clock skew), so nothing lands behind an already-advanced watermark.
+    """
+    upto = datetime.now(timezone.utc) - timedelta(seconds=lag_seconds)
+    done = {}
+    for target in ROLLUPS:
+        watermark = await claim_rollup(db, target, lease_seconds)
+        if watermark is None:
+            done[target] = "busy"
+            continue
+        if watermark >= upto:
+            await release_rollup(db, target)
+            done[target] = "current"
+            continue
+        try:
+            await db[EVENTS].aggregate(rollup_pipeline(target, watermark, upto)).to_list(None)
+        except Exception:
+            # Filigran ilerlemez; pencere bir sonraki turda tekrar denenir
+            await release_rollup(db, target)
+            raise
+        await release_rollup(db, target, upto)
+        done[target] = upto.isoformat()
+    return done
+
+
+async def backfill(
+    db,
+    since: Optional[datetime] = None,
+    lag_seconds: float = 120.0,
+    lease_seconds: float = 3600.0
+) -> dict:
+    """Rebuild the totals from the ledger, for periods starting at `since` (or all)"""
+    done = {}
+    for target, (period_field, _) in ROLLUPS.items():
+        watermark = await claim_rollup(db, target, lease_seconds)
+        if watermark is None:
+            raise RuntimeError(f"{target} rollup is running, try again shortly")
+        try:
+            if watermark == EPOCH:
+                # Hiç rollup yapılmamış; şimdiye kadarki her şeyi biz ekleyelim
+                watermark = datetime.now(timezone.utc) - timedelta(seconds=lag_seconds)
+            start = period_start(target, since) if since else None
+            if start is None:
+                deleted = await db[target].delete_many({})
+            else:
+                deleted = await db[target].delete_many({period_field: {"$gte": start.strftime("%Y-%m-%d")}})
+            # Filigrandan sonra kaydedilen olaylar normal rollup'a kalır
+            low = EPOCH - timedelta(microseconds=1)
+            await db[EVENTS].aggregate(rollup_pipeline(target, low, watermark, start)).to_list(None)
+        except Exception:
+            await release_rollup(db, target)
+            raise
+        await release_rollup(db, target, watermark)
+        done[target] = {"deleted": deleted.deleted_count, "rebuilt_through": watermark.isoformat()}
+    return done
+
+
+class ScoreLedger:
+    """Buffers score events, writes them with insert_many and runs the rollups"""
+
+    def __init__(
+        self,
+        db,
+        flush_interval: float = 1.0,
+        max_pending: int = 1000,
+        rollup_interval: float = 60.0,
+        rollup_lag: float = 120.0
+    ):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.rollup_interval = rollup_interval
+        self.rollup_lag = rollup_lag
+        self._pending: List[dict] = []
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.events_written = 0
+        self.failures = 0
+        self.rollups = 0
+
+    def record(self, user_id: str, points: int, source: str, won: Optional[bool] = None):
+        """source: game mode ('quiz', 'career_path', ...); won is None for solo scores"""
+        if not user_id:
+            return
+        self._pending.append({
+            "user_id": user_id,
+            "points": points,
+            "source": source,
+            "won": won,
+            "at": datetime.now(timezone.utc),
+        })
+        if len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, []
+            # Her denemede yeniden damgalanır; kesintiden sonra yazılan olay filigranın gerisinde kalmaz
+            logged_at = datetime.now(timezone.utc)
+            for event in batch:
+                event["logged_at"] = logged_at
+            try:
+                await self.db[EVENTS].insert_many(batch, ordered=False)
+            except BulkWriteError as e:
+                # insert_many _id'yi olaya yazar; önceki denemede yazılmış olan tekrar sayılmaz
+                failed = [
+                    batch[error["index"]] for error in e.details.get("writeErrors", [])
+                    if error.get("code") != DUPLICATE_KEY
+                ]
+                self._pending[:0] = failed
+                self.failures += 1
+                logger.error("Score ledger: %d of %d events failed", len(failed), len(batch))
+                self.events_written += len(batch) - len(failed)
+                return len(batch) - len(failed)
+            except Exception as e:
+                self._pending[:0] = batch
+                self.failures += 1
+                logger.error("Score ledger flush failed, %d events kept for retry: %s", len(batch), e)
+                return 0
+            self.events_written += len(batch)
+            return len(batch)
+
+    async def rollup(self) -> dict:
+        done = await rollup(self.db, self.rollup_lag)
+        self.rollups += 1
+        return done
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_rollup = loop.time() + self.rollup_interval
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+            if loop.time() >= next_rollup:
+                next_rollup = loop.time() + self.rollup_interval
+                try:
+                    await self.rollup()
+                except Exception as e:
+                    logger.error("Score rollup failed: %s", e)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the loop and write every buffered event"""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._pending:
+            logger.error("Score ledger stopped with %d unwritten events", len(self._pending))
+
+    def stats(self) -> dict:
+        return {
+            "pending_events": len(self._pending),
+            "events_written": self.events_written,
+            "failures": self.failures,
+            "rollups": self.rollups,
+        }
+
+
+async def main(argv: List[str]):
+    if not argv or argv[0] != "backfill":
+        print(__doc__)
+        return
+
+    since = None
+    if "--since" in argv:
+        since = datetime.strptime(argv[argv.index("--since") + 1], "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ.get('DB_NAME', 'test_database')]
+
+    for target, result in (await backfill(db, since)).items():
+        print(f"✅ {target}: {result['deleted']} rows replaced, rebuilt through {result['rebuilt_through']}")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
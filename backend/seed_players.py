@@ -16,6 +16,7 @@ import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
+from player_pool import bump_pool_version
 from pathlib import Path
 
 load_dotenv(Path(__file__).parent / '.env')
@@ -367,6 +368,10 @@ async def seed_database():
             all_teams.add(team['team'])
     print(f"\nUnique teams represented: {len(all_teams)}")
     
+    # Çalışan sunucuların oyuncu havuzunu yenilemesi için
+    version = await bump_pool_version(db)
+    print(f"Player pool version: {version}")
+    
     client.close()
 
 if __name__ == "__main__":
@@ -2,6 +2,7 @@ import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
+from player_pool import bump_pool_version
 
 load_dotenv()
 
@@ -102,6 +103,9 @@ async def seed_database():
     
     print(f"✅ Seeded {len(PLAYERS_DATA)} players to database")
     print(f"Players from Premier League, La Liga, Serie A, Bundesliga, Ligue 1")
+    # Çalışan sunucuların oyuncu havuzunu yenilemesi için
+    version = await bump_pool_version(db)
+    print(f"Player pool version: {version}")
     client.close()
 
 if __name__ == "__main__":
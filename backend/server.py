@@ -3,16 +3,18 @@ from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
 import socketio
 import os
+import hmac
 import logging
+import time
 import httpx
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
 from typing import List, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
-import bcrypt
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -22,9 +24,15 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ.get('DB_NAME', 'test_database')]
 
+# Paylaşılan oyun durumu (çoklu worker) için Redis; yoksa her şey process içinde
+REDIS_URL = os.environ.get('REDIS_URL')
+
 # Socket.IO setup
+# Redis varsa emit/enter_room çağrıları pub/sub ile tüm worker'lara ulaşır
+sio_manager = socketio.AsyncRedisManager(REDIS_URL) if REDIS_URL and REDIS_URL.startswith(('redis://', 'rediss://')) else None
 sio = socketio.AsyncServer(
     async_mode='asgi',
+    client_manager=sio_manager,
     cors_allowed_origins='*',
     logger=True,
     engineio_logger=True
@@ -97,8 +105,8 @@ class GameRoom(BaseModel):
 
 # Import game systems
 from game_systems import (
-    LEAGUES, STREAK_BONUSES, BADGES, GAME_MODES,
-    get_league_for_elo, calculate_elo_change, get_streak_bonus, calculate_game_rewards
+    LEAGUES, STREAK_BONUSES, BADGES, GAME_MODES, LeagueTable,
+    get_league_for_elo, calculate_game_rewards, game_result_pipeline
 )
 
 class DailyTask(BaseModel):
@@ -168,8 +176,66 @@ class FriendRequest(BaseModel):
 
 # ============ AUTH UTILS ============
 
-async def get_current_user(request: Request) -> Optional[dict]:
-    """Get current user from session token in cookie or Authorization header"""
+from session_cache import SessionCache
+from profile_cards import ProfileCardCache
+from user_search import UserSearch, username_fields
+
+session_cache = SessionCache(
+    max_entries=int(os.environ.get('SESSION_CACHE_SIZE', '10000')),
+    ttl_seconds=float(os.environ.get('SESSION_CACHE_TTL', '60'))
+)
+
+# Önbellek süreç içi: bir worker'daki çıkış diğer worker'ların önbelleğine ulaşmaz ve
+# orada token SESSION_CACHE_TTL kadar daha geçerli kalırdı. Birden fazla worker varken
+# opak token'lar bu yüzden her istekte user_sessions'tan çözülür.
+CACHE_OPAQUE_SESSIONS = os.environ.get(
+    'SESSION_CACHE_OPAQUE', 'true' if int(os.environ.get('WEB_CONCURRENCY', '1')) <= 1 else 'false'
+).lower() == 'true'
+
+# Başka kullanıcıları listeleyen endpoint'ler için toplu profil okuma
+profile_cards = ProfileCardCache(
+    db.users,
+    max_entries=int(os.environ.get('PROFILE_CARD_CACHE_SIZE', '20000')),
+    ttl_seconds=float(os.environ.get('PROFILE_CARD_CACHE_TTL', '30'))
+)
+
+# Kullanıcı adı araması: Mongo'da önek index'i, bellekte trigram indeksi
+user_search = UserSearch(
+    db.users,
+    refresh_interval=float(os.environ.get('USER_SEARCH_REFRESH_INTERVAL', '10'))
+)
+
+# "aggregate": tek $lookup sorgusu, süresi dolan oturumları TTL index siler
+# "legacy": user_sessions + users için iki ayrı sorgu
+SESSION_LOOKUP_MODE = os.environ.get('SESSION_LOOKUP_MODE', 'aggregate')
+
+# Fields handlers actually read from the current user (password_hash stays in the DB)
+SESSION_USER_PROJECTION = {
+    "_id": 0,
+    "user_id": 1, "email": 1, "name": 1, "username": 1, "picture": 1, "avatar": 1,
+    "age": 1, "gender": 1, "location": 1, "language": 1, "created_at": 1,
+    "profile_completed": 1, "friends": 1, "stats": 1, "jokers": 1,
+    "coins": 1, "gems": 1, "elo": 1, "xp": 1, "level": 1,
+    "wins": 1, "losses": 1, "total_games": 1, "win_streak": 1, "best_streak": 1,
+    "badges": 1, "game_stats": 1, "career_path_stats": 1,
+    "daily_login_streak": 1, "last_login_date": 1
+}
+
+from signed_sessions import RevocationList, SessionSigner, load_signing_keys
+
+SESSION_TTL = timedelta(days=7)
+
+# "kid:secret,..." (ilki imzalar); boşsa eskisi gibi opak token + user_sessions satırı
+_signing_kid, _signing_keys = load_signing_keys(os.environ.get('SESSION_SIGNING_KEYS'))
+session_signer = SessionSigner(_signing_keys, _signing_kid, SESSION_TTL) if _signing_keys else None
+revoked_sessions = RevocationList(
+    db.revoked_sessions,
+    sync_interval=float(os.environ.get('SESSION_REVOCATION_SYNC_INTERVAL', '5')),
+    clock_skew=timedelta(seconds=float(os.environ.get('SESSION_CLOCK_SKEW_SECONDS', '2')))
+)
+
+def get_session_token(request: Request) -> Optional[str]:
+    """Read the session token from the cookie or the Authorization header"""
     session_token = request.cookies.get("session_token")
     
     if not session_token:
@@ -177,19 +243,48 @@ async def get_current_user(request: Request) -> Optional[dict]:
         if auth_header and auth_header.startswith("Bearer "):
             session_token = auth_header.replace("Bearer ", "")
     
-    if not session_token:
-        logger.info("No session token found")
+    return session_token
+
+async def lookup_session_aggregate(session_token: str) -> Optional[dict]:
+    """Resolve session and user with a single $lookup round-trip"""
+    pipeline = [
+        {"$match": {
+            "session_token": session_token,
+            "expires_at": {"$gt": datetime.now(timezone.utc)}
+        }},
+        {"$limit": 1},
+        {"$lookup": {
+            "from": "users",
+            "let": {"uid": "$user_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$user_id", "$$uid"]}}},
+                {"$limit": 1},
+                {"$project": SESSION_USER_PROJECTION}
+            ],
+            "as": "user"
+        }},
+        {"$unwind": "$user"},
+        {"$project": {"_id": 0, "expires_at": 1, "user": 1}}
+    ]
+    result = await db.user_sessions.aggregate(pipeline).to_list(1)
+    if not result:
+        logger.debug("Session not found, expired or orphaned")
         return None
     
-    logger.info(f"Looking up session: {session_token[:20]}...")
-    
+    user_doc = result[0]["user"]
+    if CACHE_OPAQUE_SESSIONS:
+        session_cache.put(session_token, user_doc, result[0]["expires_at"])
+    return user_doc
+
+async def lookup_session_legacy(session_token: str) -> Optional[dict]:
+    """Resolve session and user with two sequential queries"""
     session = await db.user_sessions.find_one(
         {"session_token": session_token},
         {"_id": 0}
     )
     
     if not session:
-        logger.info("Session not found in database")
+        logger.debug("Session not found in database")
         return None
     
     expires_at = session["expires_at"]
@@ -198,37 +293,149 @@ async def get_current_user(request: Request) -> Optional[dict]:
     
     if expires_at < datetime.now(timezone.utc):
         await db.user_sessions.delete_one({"session_token": session_token})
-        logger.info("Session expired")
+        session_cache.invalidate_token(session_token)
+        logger.debug("Session expired")
         return None
     
     user_doc = await db.users.find_one(
         {"user_id": session["user_id"]},
-        {"_id": 0}
+        SESSION_USER_PROJECTION
     )
     
     if not user_doc:
-        logger.info("User not found")
+        logger.debug("User not found")
         return None
     
-    logger.info(f"Found user: {user_doc.get('email')}")
+    if CACHE_OPAQUE_SESSIONS:
+        session_cache.put(session_token, user_doc, expires_at)
     return user_doc
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+def verify_signed_token(session_token: str):
+    """Claims of a valid, unrevoked signed token; None otherwise (no I/O)"""
+    if session_signer is None:
+        return None
+    claims = session_signer.verify(session_token)
+    if claims is None or revoked_sessions.is_revoked(claims):
+        return None
+    return claims
 
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+async def resolve_signed_token(session_token: str) -> Optional[dict]:
+    """Signed token: verify in memory, then only the user document is read"""
+    claims = verify_signed_token(session_token)
+    if claims is None:
+        return None
+    
+    user_doc = session_cache.get(session_token)
+    if user_doc is not None:
+        return user_doc
+    
+    user_doc = await db.users.find_one({"user_id": claims.user_id}, SESSION_USER_PROJECTION)
+    if not user_doc:
+        logger.debug("User not found")
+        return None
+    
+    session_cache.put(session_token, user_doc, claims.expires_at)
+    return user_doc
+
+async def resolve_session_token(session_token: str) -> Optional[dict]:
+    """Resolve a session token to its user document, going through the session cache"""
+    if SessionSigner.is_signed(session_token):
+        return await resolve_signed_token(session_token)
+    
+    if CACHE_OPAQUE_SESSIONS:
+        user_doc = session_cache.get(session_token)
+        if user_doc is not None:
+            return user_doc
+    
+    logger.debug("Looking up session: %s...", session_token[:20])
+    
+    if SESSION_LOOKUP_MODE == "aggregate":
+        return await lookup_session_aggregate(session_token)
+    return await lookup_session_legacy(session_token)
+
+async def get_current_user(request: Request) -> Optional[dict]:
+    """Get current user from session token in cookie or Authorization header"""
+    session_token = get_session_token(request)
+    
+    if not session_token:
+        logger.debug("No session token found")
+        return None
+    
+    return await resolve_session_token(session_token)
+
+async def create_session(user_id: str, session_token: Optional[str] = None) -> str:
+    """Issue a session: a signed token, or an opaque one stored in user_sessions"""
+    if session_signer is not None:
+        return session_signer.issue(user_id)[0]
+    
+    session_token = session_token or f"session_{uuid.uuid4().hex}"
+    await db.user_sessions.insert_one({
+        "user_id": user_id,
+        "session_token": session_token,
+        "expires_at": datetime.now(timezone.utc) + SESSION_TTL,
+        "created_at": datetime.now(timezone.utc)
+    })
+    return session_token
+
+def set_session_cookie(response: Response, session_token: str):
+    response.set_cookie(
+        key="session_token",
+        value=session_token,
+        httponly=True,
+        secure=False,
+        samesite="lax",
+        max_age=int(SESSION_TTL.total_seconds()),
+        path="/"
+    )
+
+from password_hasher import HasherOverloaded, PasswordHasher, hasher_overloaded_handler
+
+# bcrypt event loop'u bloklamasın; sınırlı thread havuzu, doluysa 503
+password_hasher = PasswordHasher(
+    rounds=int(os.environ.get('PASSWORD_HASH_ROUNDS', '12')),
+    max_workers=int(os.environ.get('PASSWORD_HASH_WORKERS', '0')) or None,
+    max_queue=int(os.environ.get('PASSWORD_HASH_QUEUE', '32'))
+)
+
+app.add_exception_handler(HasherOverloaded, hasher_overloaded_handler)
+
+from outbound_http import CircuitBreaker, CircuitOpen, OutboundClient
+
+# Dış servis çağrıları (OAuth session-data) için süreç başına tek havuzlu istemci
+OAUTH_SESSION_DATA_URL = os.environ.get(
+    'OAUTH_SESSION_DATA_URL',
+    'https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data'
+)
+outbound_http = OutboundClient(
+    timeout=float(os.environ.get('OUTBOUND_HTTP_TIMEOUT', '5')),
+    max_connections=int(os.environ.get('OUTBOUND_HTTP_MAX_CONNECTIONS', '20')),
+    max_keepalive=int(os.environ.get('OUTBOUND_HTTP_MAX_KEEPALIVE', '10')),
+    retries=int(os.environ.get('OUTBOUND_HTTP_RETRIES', '2')),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.environ.get('OUTBOUND_CIRCUIT_FAILURES', '5')),
+        reset_timeout=float(os.environ.get('OUTBOUND_CIRCUIT_RESET', '30'))
+    )
+)
+
+@app.exception_handler(CircuitOpen)
+async def outbound_circuit_open(request: Request, exc: CircuitOpen):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Giriş servisi şu an yanıt vermiyor, lütfen tekrar deneyin"},
+        headers={"Retry-After": str(max(1, int(exc.retry_after)))}
+    )
+
+# Tekli oyun (/game/finish) rütbeleri
+RANKS = LeagueTable({
+    "Bronze": {"min_points": 0},
+    "Silver": {"min_points": 200},
+    "Gold": {"min_points": 500},
+    "Diamond": {"min_points": 1000}
+}, "min_points", default="Bronze")
 
 def calculate_rank(points: int) -> str:
     """Calculate rank based on points"""
-    if points >= 1000:
-        return "Diamond"
-    elif points >= 500:
-        return "Gold"
-    elif points >= 200:
-        return "Silver"
-    else:
-        return "Bronze"
+    return RANKS.lookup(points).id
 
 # ============ AUTH ROUTES ============
 
@@ -240,13 +447,9 @@ async def process_session_id(
     """Exchange session_id for user data and session_token"""
     try:
         logger.info(f"Processing session_id: {x_session_id[:20]}...")
-        async with httpx.AsyncClient() as http_client:
-            resp = await http_client.get(
-                "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
-                headers={"X-Session-ID": x_session_id}
-            )
-            resp.raise_for_status()
-            user_data = resp.json()
+        resp = await outbound_http.get(OAUTH_SESSION_DATA_URL, headers={"X-Session-ID": x_session_id})
+        resp.raise_for_status()
+        user_data = resp.json()
         
         session_data = SessionDataResponse(**user_data)
         logger.info(f"Got session data for: {session_data.email}")
@@ -265,6 +468,7 @@ async def process_session_id(
                 "email": session_data.email,
                 "name": session_data.name,
                 "username": "",
+                **username_fields(""),
                 "picture": session_data.picture,
                 "avatar": "⚽",
                 "age": None,
@@ -277,29 +481,16 @@ async def process_session_id(
                 "profile_completed": False
             }
             await db.users.insert_one(new_user)
+            leaderboards.mark_dirty([user_id])
             user_id_to_use = user_id
             logger.info(f"Created new user: {user_id}")
         else:
             user_id_to_use = existing_user["user_id"]
             logger.info(f"Found existing user: {user_id_to_use}")
         
-        # Create session
-        await db.user_sessions.insert_one({
-            "user_id": user_id_to_use,
-            "session_token": session_data.session_token,
-            "expires_at": datetime.now(timezone.utc) + timedelta(days=7),
-            "created_at": datetime.now(timezone.utc)
-        })
-        
-        response.set_cookie(
-            key="session_token",
-            value=session_data.session_token,
-            httponly=True,
-            secure=False,
-            samesite="lax",
-            max_age=7*24*60*60,
-            path="/"
-        )
+        # Create session (imzalı token açıksa sağlayıcının token'ı yerine bizimki döner)
+        session_data.session_token = await create_session(user_id_to_use, session_data.session_token)
+        set_session_cookie(response, session_data.session_token)
         
         return session_data
     
@@ -335,13 +526,14 @@ async def register(data: RegisterRequest, response: Response):
         raise HTTPException(status_code=400, detail="Bu kullanıcı adı zaten alınmış")
     
     user_id = f"user_{uuid.uuid4().hex[:12]}"
-    hashed_pw = hash_password(data.password)
+    hashed_pw = await password_hasher.hash(data.password)
     
     new_user = {
         "user_id": user_id,
         "email": data.email,
         "name": data.name,
         "username": username_lower,
+        **username_fields(username_lower),
         "picture": None,
         "avatar": "⚽",
         "age": data.age,
@@ -355,25 +547,12 @@ async def register(data: RegisterRequest, response: Response):
         "profile_completed": True
     }
     await db.users.insert_one(new_user)
+    leaderboards.mark_dirty([user_id])
+    user_search.updated(user_id, username_lower)
     logger.info(f"Created user: {user_id}")
     
-    session_token = f"session_{uuid.uuid4().hex}"
-    await db.user_sessions.insert_one({
-        "user_id": user_id,
-        "session_token": session_token,
-        "expires_at": datetime.now(timezone.utc) + timedelta(days=7),
-        "created_at": datetime.now(timezone.utc)
-    })
-    
-    response.set_cookie(
-        key="session_token",
-        value=session_token,
-        httponly=True,
-        secure=False,
-        samesite="lax",
-        max_age=7*24*60*60,
-        path="/"
-    )
+    session_token = await create_session(user_id)
+    set_session_cookie(response, session_token)
     
     return {"user_id": user_id, "session_token": session_token}
 
@@ -402,6 +581,7 @@ async def complete_profile(data: CompleteProfileRequest, request: Request):
         {"user_id": user["user_id"]},
         {"$set": {
             "username": data.username,
+            **username_fields(data.username),
             "age": data.age,
             "gender": data.gender,
             "avatar": data.avatar,
@@ -410,6 +590,11 @@ async def complete_profile(data: CompleteProfileRequest, request: Request):
         }}
     )
     
+    session_cache.invalidate_user(user["user_id"])
+    profile_cards.invalidate(user["user_id"])
+    leaderboards.mark_dirty([user["user_id"]])
+    user_search.updated(user["user_id"], data.username)
+    
     logger.info(f"Profile update result: modified={result.modified_count}")
     return {"message": "Profile completed", "success": True}
 
@@ -422,26 +607,22 @@ async def login(data: LoginRequest, response: Response):
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not verify_password(data.password, user.get("password_hash", "")):
+    password_hash = user.get("password_hash") or ""
+    if not await password_hasher.verify(data.password, password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    session_token = f"session_{uuid.uuid4().hex}"
-    await db.user_sessions.insert_one({
-        "user_id": user["user_id"],
-        "session_token": session_token,
-        "expires_at": datetime.now(timezone.utc) + timedelta(days=7),
-        "created_at": datetime.now(timezone.utc)
-    })
+    # Maliyet (PASSWORD_HASH_ROUNDS) değiştiyse şifreyi yeni maliyetle yeniden özetle
+    if password_hasher.needs_rehash(password_hash):
+        try:
+            await db.users.update_one(
+                {"user_id": user["user_id"], "password_hash": password_hash},
+                {"$set": {"password_hash": await password_hasher.hash(data.password)}}
+            )
+        except HasherOverloaded:
+            pass  # bir sonraki girişte tekrar denenir
     
-    response.set_cookie(
-        key="session_token",
-        value=session_token,
-        httponly=True,
-        secure=False,
-        samesite="lax",
-        max_age=7*24*60*60,
-        path="/"
-    )
+    session_token = await create_session(user["user_id"])
+    set_session_cookie(response, session_token)
     
     logger.info(f"Login successful for: {user['user_id']}")
     return {"user_id": user["user_id"], "session_token": session_token}
@@ -457,9 +638,15 @@ async def get_me(request: Request):
 @api_router.post("/auth/logout")
 async def logout(request: Request, response: Response):
     """Logout user"""
-    session_token = request.cookies.get("session_token")
+    session_token = get_session_token(request)
     if session_token:
-        await db.user_sessions.delete_one({"session_token": session_token})
+        if SessionSigner.is_signed(session_token):
+            claims = verify_signed_token(session_token)
+            if claims is not None:
+                await revoked_sessions.revoke_token(claims)
+        else:
+            await db.user_sessions.delete_one({"session_token": session_token})
+        session_cache.invalidate_token(session_token)
     
     response.delete_cookie("session_token")
     return {"message": "Logged out"}
@@ -530,11 +717,18 @@ async def reset_password(data: ResetPasswordRequest):
         raise HTTPException(status_code=400, detail="Şifre en az 6 karakter olmalı")
     
     # Update password
-    hashed_pw = hash_password(data.new_password)
-    await db.users.update_one(
+    hashed_pw = await password_hasher.hash(data.new_password)
+    updated_user = await db.users.find_one_and_update(
         {"email": reset_record["email"]},
-        {"$set": {"password_hash": hashed_pw}}
+        {"$set": {"password_hash": hashed_pw}},
+        {"_id": 0, "user_id": 1}
     )
+    if updated_user:
+        # Şifre değişince açık oturumların hepsi kapanır
+        await db.user_sessions.delete_many({"user_id": updated_user["user_id"]})
+        if session_signer is not None:
+            await revoked_sessions.revoke_user(updated_user["user_id"], SESSION_TTL)
+        session_cache.invalidate_user(updated_user["user_id"])
     
     # Mark token as used
     await db.password_resets.update_one(
@@ -571,6 +765,7 @@ async def update_profile(data: UpdateProfileRequest, request: Request):
         if existing:
             raise HTTPException(status_code=400, detail="Username already taken")
         update_data["username"] = data.username
+        update_data.update(username_fields(data.username))
     
     if data.age is not None:
         update_data["age"] = data.age
@@ -586,6 +781,11 @@ async def update_profile(data: UpdateProfileRequest, request: Request):
             {"user_id": user["user_id"]},
             {"$set": update_data}
         )
+        session_cache.invalidate_user(user["user_id"])
+        profile_cards.invalidate(user["user_id"])
+        leaderboards.mark_dirty([user["user_id"]])
+        if data.username:
+            user_search.updated(user["user_id"], data.username)
     
     return {"message": "Profile updated"}
 
@@ -600,29 +800,42 @@ async def update_language(request: Request, language: str):
         {"user_id": user["user_id"]},
         {"$set": {"language": language}}
     )
+    session_cache.invalidate_user(user["user_id"])
     return {"message": "Language updated"}
 
 # ============ GAME SYSTEMS API ============
 
+from static_responses import StaticResponse
+
+STATIC_CACHE_MAX_AGE = int(os.environ.get('STATIC_CACHE_MAX_AGE', '300'))
+
+# Sabit veriler bir kez serileştirilir; istemci ETag ile 304 alabilir
+STATIC_RESPONSES = {
+    "leagues": StaticResponse(LEAGUES, STATIC_CACHE_MAX_AGE),
+    "badges": StaticResponse(BADGES, STATIC_CACHE_MAX_AGE),
+    "game_modes": StaticResponse(GAME_MODES, STATIC_CACHE_MAX_AGE),
+    "streak_bonuses": StaticResponse(STREAK_BONUSES, STATIC_CACHE_MAX_AGE),
+}
+
 @api_router.get("/game-systems/leagues")
-async def get_all_leagues():
+async def get_all_leagues(request: Request):
     """Get all league information"""
-    return LEAGUES
+    return STATIC_RESPONSES["leagues"].respond(request)
 
 @api_router.get("/game-systems/badges")
-async def get_all_badges():
+async def get_all_badges(request: Request):
     """Get all badges"""
-    return BADGES
+    return STATIC_RESPONSES["badges"].respond(request)
 
 @api_router.get("/game-systems/game-modes")
-async def get_all_game_modes():
+async def get_all_game_modes(request: Request):
     """Get all game modes"""
-    return GAME_MODES
+    return STATIC_RESPONSES["game_modes"].respond(request)
 
 @api_router.get("/game-systems/streak-bonuses")
-async def get_all_streak_bonuses():
+async def get_all_streak_bonuses(request: Request):
     """Get all streak bonuses"""
-    return STREAK_BONUSES
+    return STATIC_RESPONSES["streak_bonuses"].respond(request)
 
 @api_router.get("/game-systems/my-stats")
 async def get_my_game_stats(request: Request):
@@ -639,6 +852,7 @@ async def get_my_game_stats(request: Request):
     stats = {
         "elo": elo,
         "league": league,
+        "elo_standing": await leaderboards.standing("elo", elo),
         "coins": user.get("coins", 0),
         "xp": user.get("xp", 0),
         "level": user.get("level", 1),
@@ -668,9 +882,10 @@ async def submit_game_result(result: GameResultSubmit, request: Request):
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
+    if not result.game_mode or "." in result.game_mode or result.game_mode.startswith("$"):
+        raise HTTPException(status_code=400, detail="Invalid game mode")
+    
     user_id = user["user_id"]
-    current_elo = user.get("elo", 1000)
-    current_streak = user.get("win_streak", 0) if result.won else 0
     
     # Zaman bonusu hesapla (hızlı cevap = daha fazla bonus)
     time_bonus = 1.0
@@ -681,6 +896,30 @@ async def submit_game_result(result: GameResultSubmit, request: Request):
     elif result.time_taken < 15:
         time_bonus = 1.1
     
+    # ELO değişimi
+    game_mode_config = GAME_MODES.get(result.game_mode, GAME_MODES["career_path"])
+    if result.won:
+        elo_change = game_mode_config["elo_gain"]
+    else:
+        elo_change = -game_mode_config["elo_loss"]
+    
+    # Tüm değişiklikler tek atomik güncellemede; eşzamanlı gönderimler birbirini ezmez.
+    # Güncelleme öncesi hali döner, yanıt aynı kurallarla ondan hesaplanır
+    before = await db.users.find_one_and_update(
+        {"user_id": user_id},
+        game_result_pipeline(result, time_bonus, elo_change),
+        projection={"_id": 0, "elo": 1, "win_streak": 1, "best_streak": 1, "badges": 1},
+        return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    session_cache.invalidate_user(user_id)
+    leaderboards.mark_dirty([user_id])
+    score_ledger.record(user_id, result.score, result.game_mode, won=result.won)
+    
+    current_elo = before.get("elo", 1000)
+    current_streak = before.get("win_streak", 0) if result.won else 0
+    
     # Ödülleri hesapla
     if result.won:
         new_streak = current_streak + 1
@@ -695,13 +934,6 @@ async def submit_game_result(result: GameResultSubmit, request: Request):
         perfect_game=result.perfect_game
     )
     
-    # ELO değişimi
-    game_mode_config = GAME_MODES.get(result.game_mode, GAME_MODES["career_path"])
-    if result.won:
-        elo_change = game_mode_config["elo_gain"]
-    else:
-        elo_change = -game_mode_config["elo_loss"]
-    
     new_elo = max(0, current_elo + elo_change)
     new_league = get_league_for_elo(new_elo)
     old_league = get_league_for_elo(current_elo)
@@ -712,7 +944,7 @@ async def submit_game_result(result: GameResultSubmit, request: Request):
     
     # Rozetleri kontrol et
     new_badges = []
-    current_badges = user.get("badges", [])
+    current_badges = before.get("badges", [])
     
     # İlk zafer rozeti
     if result.won and "first_win" not in current_badges:
@@ -737,50 +969,7 @@ async def submit_game_result(result: GameResultSubmit, request: Request):
         new_badges.append("legend_rank")
     
     # En iyi seri güncelleme
-    best_streak = user.get("best_streak", 0)
-    if new_streak > best_streak:
-        best_streak = new_streak
-    
-    # Veritabanını güncelle
-    update_data = {
-        "elo": new_elo,
-        "coins": user.get("coins", 0) + rewards["coins"],
-        "xp": user.get("xp", 0) + rewards["xp"],
-        "win_streak": new_streak,
-        "best_streak": best_streak,
-        "total_games": user.get("total_games", 0) + 1
-    }
-    
-    if result.won:
-        update_data["wins"] = user.get("wins", 0) + 1
-    else:
-        update_data["losses"] = user.get("losses", 0) + 1
-    
-    # Oyun modu istatistiklerini güncelle
-    game_stats = user.get("game_stats", {})
-    mode_stats = game_stats.get(result.game_mode, {
-        "games_played": 0,
-        "wins": 0,
-        "high_score": 0,
-        "total_score": 0
-    })
-    mode_stats["games_played"] += 1
-    mode_stats["total_score"] += result.score
-    if result.won:
-        mode_stats["wins"] += 1
-    if result.score > mode_stats["high_score"]:
-        mode_stats["high_score"] = result.score
-    game_stats[result.game_mode] = mode_stats
-    update_data["game_stats"] = game_stats
-    
-    # Rozetleri ekle
-    if new_badges:
-        update_data["badges"] = current_badges + new_badges
-    
-    await db.users.update_one(
-        {"user_id": user_id},
-        {"$set": update_data}
-    )
+    best_streak = max(before.get("best_streak", 0), new_streak)
     
     return {
         "rewards": rewards,
@@ -799,10 +988,7 @@ async def submit_game_result(result: GameResultSubmit, request: Request):
 @api_router.get("/game-systems/global-leaderboard")
 async def get_global_leaderboard(limit: int = 100):
     """Get global leaderboard by ELO"""
-    users = await db.users.find(
-        {"elo": {"$gt": 0}},
-        {"_id": 0, "user_id": 1, "username": 1, "avatar": 1, "elo": 1, "wins": 1, "losses": 1, "best_streak": 1}
-    ).sort("elo", -1).limit(limit).to_list(limit)
+    users = await leaderboards.top("elo", limit)
     
     leaderboard = []
     for i, user in enumerate(users):
@@ -823,33 +1009,67 @@ async def get_global_leaderboard(limit: int = 100):
     return leaderboard
 
 @api_router.get("/users/search")
-async def search_users(username: str, request: Request):
-    """Search users by username"""
+async def search_users(
+    username: str, request: Request, response: Response, cursor: Optional[str] = None, limit: int = 20
+):
+    """Search users by username: exact, prefix, infix, then fuzzy matches
+
+    The body stays a plain list; the next page's cursor is sent in the
+    X-Next-Cursor header (absent on the last page).
+    """
     user = await get_current_user(request)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    users = await db.users.find(
-        {"username": {"$regex": username, "$options": "i"}, "user_id": {"$ne": user["user_id"]}},
-        {"_id": 0, "user_id": 1, "username": 1, "name": 1, "avatar": 1, "stats": 1}
-    ).limit(20).to_list(20)
+    try:
+        hits, next_cursor = await user_search.search(
+            username, exclude=user["user_id"], limit=max(1, min(limit, 50)), cursor=cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
+    found = await db.users.find(
+        {"user_id": {"$in": [hit.user_id for hit in hits]}},
+        {"_id": 0, "user_id": 1, "username": 1, "name": 1, "avatar": 1, "stats": 1}
+    ).to_list(None)
+    by_id = {doc["user_id"]: doc for doc in found}
+    
+    users = []
+    for hit in hits:
+        doc = by_id.get(hit.user_id)
+        if doc is not None:
+            doc["match"] = hit.match
+            users.append(doc)
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return users
 
 # ============ LEADERBOARD ROUTES ============
 
+def leaderboard_rows(cards: List[dict], fields: tuple) -> List[dict]:
+    """Copy the endpoint's fields out of the shared leaderboard cards"""
+    rows = []
+    for i, card in enumerate(cards):
+        row = {field: card[field] for field in fields if field in card}
+        row['rank_position'] = i + 1
+        rows.append(row)
+    return rows
+
 @api_router.get("/leaderboard/global")
 async def get_global_leaderboard(limit: int = 100):
     """Get global leaderboard"""
-    users = await db.users.find(
-        {},
-        {"_id": 0, "user_id": 1, "username": 1, "name": 1, "avatar": 1, "stats": 1, "location": 1}
-    ).sort("stats.points", -1).limit(limit).to_list(limit)
-    
-    for i, user in enumerate(users):
-        user['rank_position'] = i + 1
-    
-    return users
+    cards = await leaderboards.top("points", limit)
+    return leaderboard_rows(cards, ("user_id", "username", "name", "avatar", "stats", "location"))
+
+async def attach_profiles(scores: List[dict]):
+    """Merge username/name/avatar into score rows and number them"""
+    cards = await profile_cards.hydrate(score.get("user_id") for score in scores)
+    for i, score in enumerate(scores):
+        card = cards.get(score.get("user_id"))
+        if card:
+            score.update(card)
+        score['rank_position'] = i + 1
 
 @api_router.get("/leaderboard/daily")
 async def get_daily_leaderboard(limit: int = 100):
@@ -862,15 +1082,8 @@ async def get_daily_leaderboard(limit: int = 100):
         {"_id": 0}
     ).sort("points", -1).limit(limit).to_list(limit)
     
-    # Kullanıcı bilgilerini ekle
-    for i, score in enumerate(daily_scores):
-        user = await db.users.find_one(
-            {"user_id": score.get("user_id")},
-            {"_id": 0, "username": 1, "name": 1, "avatar": 1}
-        )
-        if user:
-            score.update(user)
-        score['rank_position'] = i + 1
+    # Kullanıcı bilgilerini ekle (tek sorgu)
+    await attach_profiles(daily_scores)
     
     return daily_scores
 
@@ -885,14 +1098,7 @@ async def get_weekly_leaderboard(limit: int = 100):
         {"_id": 0}
     ).sort("points", -1).limit(limit).to_list(limit)
     
-    for i, score in enumerate(weekly_scores):
-        user = await db.users.find_one(
-            {"user_id": score.get("user_id")},
-            {"_id": 0, "username": 1, "name": 1, "avatar": 1}
-        )
-        if user:
-            score.update(user)
-        score['rank_position'] = i + 1
+    await attach_profiles(weekly_scores)
     
     return weekly_scores
 
@@ -919,15 +1125,26 @@ async def get_friends_leaderboard(request: Request):
 @api_router.get("/leaderboard/location")
 async def get_location_leaderboard(location: str, limit: int = 100):
     """Get location-based leaderboard"""
-    users = await db.users.find(
-        {"location": location},
-        {"_id": 0, "user_id": 1, "username": 1, "avatar": 1, "stats": 1}
-    ).sort("stats.points", -1).limit(limit).to_list(limit)
+    cards = await leaderboards.top(LOCATION_PREFIX + location, limit)
+    return leaderboard_rows(cards, ("user_id", "username", "avatar", "stats"))
+
+@api_router.get("/leaderboard/my-rank")
+async def get_my_leaderboard_ranks(request: Request):
+    """Current user's position on each board"""
+    user = await get_current_user(request)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
     
-    for i, user in enumerate(users):
-        user['rank_position'] = i + 1
+    boards = {"points": "points", "elo": "elo", "career": "career"}
+    if user.get("location"):
+        boards["location"] = LOCATION_PREFIX + user["location"]
     
-    return users
+    # Tablodaki kayıt yerine kullanıcının güncel skoruyla sırala
+    scores = board_scores(user)
+    ranks = {}
+    for key, board in boards.items():
+        ranks[key] = await leaderboards.standing(board, scores.get(board, 0))
+    return ranks
 
 # ============ DAILY TASKS ============
 
@@ -948,31 +1165,22 @@ async def get_daily_tasks(request: Request):
     
     today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
     
-    # Bugünün görevlerini kontrol et
-    user_tasks = await db.daily_tasks.find_one({
-        "user_id": user["user_id"],
-        "date": today
-    })
-    
-    if not user_tasks:
-        # Yeni günlük görevler oluştur
-        import random
-        selected_tasks = random.sample(DAILY_TASKS_TEMPLATE, min(3, len(DAILY_TASKS_TEMPLATE)))
-        tasks = []
-        for task in selected_tasks:
-            tasks.append({
-                **task,
-                "current": 0,
-                "completed": False,
-                "claimed": False
-            })
-        
-        user_tasks = {
-            "user_id": user["user_id"],
-            "date": today,
-            "tasks": tasks
-        }
-        await db.daily_tasks.insert_one(user_tasks)
+    # Bugünün görevleri yoksa oluştur. Okuyup sonra eklemek, aynı anda gelen iki ilk
+    # istekte user_date_unique'e çarpıp 500 dönüyordu; upsert tek satırda buluşturur
+    # (MongoDB 4.2+ eşzamanlı upsert'in anahtar çakışmasını kendisi yeniden dener)
+    import random
+    selected_tasks = random.sample(DAILY_TASKS_TEMPLATE, min(3, len(DAILY_TASKS_TEMPLATE)))
+    tasks = [
+        {**task, "current": 0, "completed": False, "claimed": False}
+        for task in selected_tasks
+    ]
+    user_tasks = await db.daily_tasks.find_one_and_update(
+        {"user_id": user["user_id"], "date": today},
+        {"$setOnInsert": {"tasks": tasks}},
+        {"_id": 0, "tasks": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
     
     return user_tasks.get("tasks", [])
 
@@ -1011,6 +1219,7 @@ async def claim_daily_task_reward(task_id: str, request: Request):
             "stats.xp": task["reward_xp"]
         }}
     )
+    session_cache.invalidate_user(user["user_id"])
     
     # Görevi claimed olarak işaretle
     await db.daily_tasks.update_one(
@@ -1028,34 +1237,49 @@ async def daily_login_reward(request: Request):
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    last_login = user.get("last_login_date")
-    current_streak = user.get("daily_login_streak", 0)
+    already_claimed = {"message": "Bugün zaten giriş yaptınız", "already_claimed": True}
     
-    if last_login == today:
-        return {"message": "Bugün zaten giriş yaptınız", "streak": current_streak, "already_claimed": True}
+    if user.get("last_login_date") == today:
+        return {**already_claimed, "streak": user.get("daily_login_streak", 0)}
     
-    # Streak kontrolü
+    # Streak ve bonus belgenin güncel halinden tek atomik güncellemede hesaplanır;
+    # önbellekteki kullanıcı eski olabilir, iki istek aynı günü iki kez alamaz
     yesterday = (datetime.now(timezone.utc) - timedelta(days=1)).strftime("%Y-%m-%d")
-    if last_login == yesterday:
-        new_streak = current_streak + 1
-    else:
-        new_streak = 1
-    
-    # Streak bonusu
     base_reward = 10
-    streak_bonus = min(new_streak * 5, 50)  # Max 50 bonus
-    total_coins = base_reward + streak_bonus
-    
-    await db.users.update_one(
-        {"user_id": user["user_id"]},
-        {
-            "$set": {
+    before = await db.users.find_one_and_update(
+        {"user_id": user["user_id"], "last_login_date": {"$ne": today}},
+        [
+            {"$set": {"daily_login_streak": {"$cond": [
+                {"$eq": ["$last_login_date", yesterday]},
+                {"$add": [{"$ifNull": ["$daily_login_streak", 0]}, 1]},
+                1
+            ]}}},
+            {"$set": {
                 "last_login_date": today,
-                "daily_login_streak": new_streak
-            },
-            "$inc": {"coins": total_coins}
-        }
+                # Streak bonusu, en fazla 50
+                "coins": {"$add": [
+                    {"$ifNull": ["$coins", 0]},
+                    base_reward,
+                    {"$min": [{"$multiply": ["$daily_login_streak", 5]}, 50]}
+                ]}
+            }}
+        ],
+        projection={"_id": 0, "user_id": 1, "last_login_date": 1, "daily_login_streak": 1},
+        return_document=ReturnDocument.BEFORE
     )
+    session_cache.invalidate_user(user["user_id"])
+    
+    if before is None:
+        fresh = await db.users.find_one({"user_id": user["user_id"]}, {"_id": 0, "daily_login_streak": 1})
+        return {**already_claimed, "streak": (fresh or {}).get("daily_login_streak", 0)}
+    
+    # Yanıt aynı kurallarla güncelleme öncesi halden hesaplanır
+    if before.get("last_login_date") == yesterday:
+        new_streak = before.get("daily_login_streak", 0) + 1
+    else:
+        new_streak = 1
+    streak_bonus = min(new_streak * 5, 50)
+    total_coins = base_reward + streak_bonus
     
     return {
         "message": "Günlük giriş ödülü!",
@@ -1066,15 +1290,19 @@ async def daily_login_reward(request: Request):
 
 # ============ JOKER SHOP ============
 
+JOKER_SHOP = [
+    {"id": "time_extend", "name": "+5 Saniye", "price_coins": 50, "description": "Süreye 5 saniye ekle"},
+    {"id": "eliminate_two", "name": "2 Şık Sil", "price_coins": 75, "description": "2 yanlış şıkkı sil"},
+    {"id": "reveal_letter", "name": "Harf Aç", "price_coins": 60, "description": "Bir harf göster"},
+    {"id": "skip_question", "name": "Soru Geç", "price_coins": 100, "description": "Soruyu atla"},
+]
+STATIC_RESPONSES["joker_shop"] = StaticResponse(JOKER_SHOP, STATIC_CACHE_MAX_AGE)
+JOKER_TYPES = frozenset(item["id"] for item in JOKER_SHOP)
+
 @api_router.get("/shop/jokers")
-async def get_joker_shop():
+async def get_joker_shop(request: Request):
     """Get joker shop items"""
-    return [
-        {"id": "time_extend", "name": "+5 Saniye", "price_coins": 50, "description": "Süreye 5 saniye ekle"},
-        {"id": "eliminate_two", "name": "2 Şık Sil", "price_coins": 75, "description": "2 yanlış şıkkı sil"},
-        {"id": "reveal_letter", "name": "Harf Aç", "price_coins": 60, "description": "Bir harf göster"},
-        {"id": "skip_question", "name": "Soru Geç", "price_coins": 100, "description": "Soruyu atla"},
-    ]
+    return STATIC_RESPONSES["joker_shop"].respond(request)
 
 @api_router.post("/shop/buy-joker/{joker_id}")
 async def buy_joker(joker_id: str, request: Request):
@@ -1095,11 +1323,9 @@ async def buy_joker(joker_id: str, request: Request):
     
     price = prices[joker_id]
     
-    if user.get("coins", 0) < price:
-        raise HTTPException(status_code=400, detail="Yetersiz coin")
-    
-    await db.users.update_one(
-        {"user_id": user["user_id"]},
+    # Bakiye kontrolü yazmanın içinde: önbellekteki kullanıcı başka worker'a göre eski olabilir
+    result = await db.users.update_one(
+        {"user_id": user["user_id"], "coins": {"$gte": price}},
         {
             "$inc": {
                 "coins": -price,
@@ -1107,6 +1333,9 @@ async def buy_joker(joker_id: str, request: Request):
             }
         }
     )
+    session_cache.invalidate_user(user["user_id"])
+    if result.modified_count == 0:
+        raise HTTPException(status_code=400, detail="Yetersiz coin")
     
     return {"message": "Joker satın alındı!", "joker": joker_id}
 
@@ -1126,14 +1355,9 @@ async def get_user_stats(request: Request):
     current_league = stats.get("rank", "Bronze")
     
     # Sonraki lig için gerekli puan
-    league_order = ["Bronze", "Silver", "Gold", "Platinum", "Diamond", "Legend"]
-    current_idx = league_order.index(current_league) if current_league in league_order else 0
-    
-    next_league = league_order[current_idx + 1] if current_idx < len(league_order) - 1 else None
-    points_for_next = None
-    if next_league:
-        league_thresholds = {"Silver": 1000, "Gold": 2500, "Platinum": 5000, "Diamond": 10000, "Legend": 20000}
-        points_for_next = league_thresholds.get(next_league, 0) - points
+    following = POINT_LEAGUES.next_league(current_league)
+    next_league = following.id if following else None
+    points_for_next = following.minimum - points if following else None
     
     return {
         "stats": stats,
@@ -1143,6 +1367,7 @@ async def get_user_stats(request: Request):
         "current_league": current_league,
         "next_league": next_league,
         "points_for_next_league": points_for_next,
+        "points_standing": await leaderboards.standing("points", points),
         "daily_login_streak": user.get("daily_login_streak", 0)
     }
 
@@ -1156,21 +1381,29 @@ async def finish_game(game_mode: str, won: bool, request: Request):
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     points_change = 10 if won else -3
-    current_points = user.get("stats", {}).get("points", 0)
-    new_points = max(0, current_points + points_change)
-    new_rank = calculate_rank(new_points)
     
-    await db.users.update_one(
+    # Puan önbellekteki kullanıcıdan değil, $inc sonrası belgeden okunur
+    updated = await db.users.find_one_and_update(
         {"user_id": user["user_id"]},
         {
             "$inc": {
                 "stats.total_games": 1,
                 "stats.wins" if won else "stats.losses": 1,
                 "stats.points": points_change
-            },
-            "$set": {"stats.rank": new_rank}
-        }
+            }
+        },
+        projection={"_id": 0, "stats.points": 1, "stats.rank": 1},
+        return_document=ReturnDocument.AFTER
     )
+    session_cache.invalidate_user(user["user_id"])
+    if updated is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    new_points = max(0, updated["stats"]["points"])
+    new_rank = calculate_rank(new_points)
+    if updated["stats"].get("rank") != new_rank:
+        await db.users.update_one({"user_id": user["user_id"]}, {"$set": {"stats.rank": new_rank}})
+    leaderboards.mark_dirty([user["user_id"]])
     
     return {"points": new_points, "rank": new_rank}
 
@@ -1195,58 +1428,60 @@ async def get_random_player():
 # ============ CAREER PATH GAME ROUTES ============
 
 from popular_players import POPULAR_PLAYERS
+from player_catalog import PlayerCatalog
 import random
 
+# İsim indeksi, zorluk grupları ve takım kümeleri bir kez kurulur
+PLAYER_CATALOG = PlayerCatalog(POPULAR_PLAYERS)
+
 @api_router.get("/career-path/random-player")
 async def get_career_path_player(difficulty: str = "all"):
     """Get a random popular player for Career Path game"""
-    if difficulty == "all":
-        players = POPULAR_PLAYERS
-    else:
-        players = [p for p in POPULAR_PLAYERS if p.get("difficulty") == difficulty]
-    
-    if not players:
-        players = POPULAR_PLAYERS
-    
-    player = random.choice(players)
-    return player
+    return PLAYER_CATALOG.random_player(difficulty)
+
+# Otomatik tamamlama listesi her istekte yeniden kurulmasın
+STATIC_RESPONSES["career_path_players"] = StaticResponse(
+    [{"name": p["name"], "difficulty": p.get("difficulty", "medium")} for p in POPULAR_PLAYERS],
+    STATIC_CACHE_MAX_AGE
+)
 
 @api_router.get("/career-path/players")
-async def get_all_career_path_players():
+async def get_all_career_path_players(request: Request):
     """Get all player names for autocomplete"""
-    return [{"name": p["name"], "difficulty": p.get("difficulty", "medium")} for p in POPULAR_PLAYERS]
+    return STATIC_RESPONSES["career_path_players"].respond(request)
 
 @api_router.post("/career-path/check-guess")
 async def check_career_path_guess(player_name: str, guess: str):
     """Check if guess is correct and provide hints"""
     # Oyuncuyu bul
-    player = next((p for p in POPULAR_PLAYERS if p["name"].lower() == player_name.lower()), None)
-    if not player:
+    target = PLAYER_CATALOG.entry(player_name)
+    if not target:
         raise HTTPException(status_code=404, detail="Player not found")
+    player = target.player
+    
+    # Tahmini bir oyuncuya çöz (aksan / büyük harf / küçük yazım hatası toleranslı)
+    guessed = PLAYER_CATALOG.resolve(guess, prefer=target)
     
     # Doğru mu?
-    is_correct = guess.lower().strip() == player["name"].lower()
+    is_correct = guessed is target
     
     # Yanlışsa ipucu ver
     hints = []
     if not is_correct:
         # Aynı ülkeden mi?
-        guessed_player = next((p for p in POPULAR_PLAYERS if p["name"].lower() == guess.lower().strip()), None)
-        if guessed_player:
-            if guessed_player["nationality"] == player["nationality"]:
+        if guessed:
+            if guessed.nationality == target.nationality:
                 hints.append(f"✅ Doğru ülke! ({player['nationality']})")
             else:
                 hints.append(f"❌ Yanlış ülke")
             
-            if guessed_player["position"] == player["position"]:
+            if guessed.position == target.position:
                 hints.append(f"✅ Doğru pozisyon! ({player['position']})")
             else:
                 hints.append(f"❌ Yanlış pozisyon")
             
             # Aynı takımda oynadılar mı?
-            guessed_teams = set([t["team"] for t in guessed_player.get("team_history", [])])
-            player_teams = set([t["team"] for t in player.get("team_history", [])])
-            common_teams = guessed_teams.intersection(player_teams)
+            common_teams = guessed.teams & target.teams
             if common_teams:
                 hints.append(f"🔗 Ortak takım: {list(common_teams)[0]}")
     
@@ -1271,42 +1506,43 @@ async def submit_career_path_score(score_data: CareerPathScoreSubmit, request: R
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    # Kullanıcının kariyer yolu skorunu güncelle
-    career_stats = user.get("career_path_stats", {
-        "high_score": 0,
-        "total_score": 0,
-        "games_played": 0,
-        "correct_guesses": 0,
-        "best_streak": 0
-    })
-    
-    # En yüksek skor kontrolü
-    is_new_high_score = score_data.score > career_stats.get("high_score", 0)
-    
-    # İstatistikleri güncelle
-    career_stats["total_score"] = career_stats.get("total_score", 0) + score_data.score
-    career_stats["games_played"] = career_stats.get("games_played", 0) + score_data.total_games
-    career_stats["correct_guesses"] = career_stats.get("correct_guesses", 0) + score_data.correct_guesses
-    
-    if is_new_high_score:
-        career_stats["high_score"] = score_data.score
-    
-    if score_data.best_streak > career_stats.get("best_streak", 0):
-        career_stats["best_streak"] = score_data.best_streak
+    # Coin ekle (her 100 puan için 1 coin)
+    coins_earned = max(0, score_data.score // 100)
     
-    # Veritabanını güncelle
-    await db.users.update_one(
+    # Alan bazında $inc/$max: eşzamanlı gönderimler birbirinin istatistiğini ezmez.
+    # Güncelleme öncesi hali döner, yanıt ondan hesaplanır
+    before = await db.users.find_one_and_update(
         {"user_id": user["user_id"]},
-        {"$set": {"career_path_stats": career_stats}}
+        {
+            "$inc": {
+                "career_path_stats.total_score": score_data.score,
+                "career_path_stats.games_played": score_data.total_games,
+                "career_path_stats.correct_guesses": score_data.correct_guesses,
+                "coins": coins_earned
+            },
+            "$max": {
+                "career_path_stats.high_score": score_data.score,
+                "career_path_stats.best_streak": score_data.best_streak
+            }
+        },
+        projection={"_id": 0, "user_id": 1, "career_path_stats": 1},
+        return_document=ReturnDocument.BEFORE
     )
-    
-    # Coin ekle (her 100 puan için 1 coin)
-    coins_earned = score_data.score // 100
-    if coins_earned > 0:
-        await db.users.update_one(
-            {"user_id": user["user_id"]},
-            {"$inc": {"coins": coins_earned}}
-        )
+    session_cache.invalidate_user(user["user_id"])
+    if before is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    previous = before.get("career_path_stats") or {}
+    is_new_high_score = score_data.score > previous.get("high_score", 0)
+    career_stats = {
+        "high_score": max(previous.get("high_score", 0), score_data.score),
+        "total_score": previous.get("total_score", 0) + score_data.score,
+        "games_played": previous.get("games_played", 0) + score_data.total_games,
+        "correct_guesses": previous.get("correct_guesses", 0) + score_data.correct_guesses,
+        "best_streak": max(previous.get("best_streak", 0), score_data.best_streak)
+    }
+    leaderboards.mark_dirty([user["user_id"]])
+    score_ledger.record(user["user_id"], score_data.score, "career_path")
     
     return {
         "message": "Score submitted",
@@ -1320,16 +1556,7 @@ async def submit_career_path_score(score_data: CareerPathScoreSubmit, request: R
 async def get_career_path_leaderboard(limit: int = 50):
     """Get career path leaderboard"""
     # En yüksek skorlara göre sırala
-    users = await db.users.find(
-        {"career_path_stats.high_score": {"$gt": 0}},
-        {
-            "_id": 0, 
-            "user_id": 1, 
-            "username": 1, 
-            "avatar": 1,
-            "career_path_stats": 1
-        }
-    ).sort("career_path_stats.high_score", -1).limit(limit).to_list(limit)
+    users = await leaderboards.top("career", limit)
     
     leaderboard = []
     for i, user in enumerate(users):
@@ -1362,14 +1589,13 @@ async def get_my_career_path_stats(request: Request):
         "best_streak": 0
     })
     
-    # Kullanıcının sıralamasını bul
-    rank = await db.users.count_documents({
-        "career_path_stats.high_score": {"$gt": stats.get("high_score", 0)}
-    }) + 1
+    # Kullanıcının sıralamasını bul (kendi skoruyla; tablo henüz yenilenmemiş olabilir)
+    standing = await leaderboards.standing("career", stats.get("high_score", 0))
     
     return {
         "stats": stats,
-        "rank": rank,
+        "rank": standing["rank"],
+        "percentile": standing["percentile"],
         "coins": user.get("coins", 0)
     }
 
@@ -1434,12 +1660,9 @@ async def get_friend_requests(request: Request):
         {"_id": 0}
     ).to_list(100)
     
+    senders = await profile_cards.hydrate(req["sender_id"] for req in requests)
     for req in requests:
-        sender = await db.users.find_one(
-            {"user_id": req["sender_id"]},
-            {"_id": 0, "user_id": 1, "username": 1, "name": 1, "avatar": 1}
-        )
-        req["sender"] = sender
+        req["sender"] = senders.get(req["sender_id"])
     
     return requests
 
@@ -1467,77 +1690,152 @@ async def accept_friend_request(request_id: str, request: Request):
         {"user_id": friend_req["sender_id"]},
         {"$addToSet": {"friends": user["user_id"]}}
     )
+    session_cache.invalidate_user(user["user_id"])
+    session_cache.invalidate_user(friend_req["sender_id"])
     
     return {"message": "Friend request accepted"}
 
+# ============ SYSTEM ============
+
+# İç durum sayaçları yalnızca bu token'la okunur; boşsa endpoint kapalı
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+def require_metrics_token(request: Request):
+    supplied = request.headers.get("X-Metrics-Token", "")
+    if not METRICS_TOKEN or not hmac.compare_digest(supplied.encode("utf-8"), METRICS_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@api_router.get("/system/metrics", dependencies=[Depends(require_metrics_token)])
+async def get_system_metrics():
+    """Process-local cache and runtime counters (needs the X-Metrics-Token header)"""
+    return {
+        "session_cache": session_cache.stats(),
+        "signed_sessions": {
+            "enabled": session_signer is not None,
+            **revoked_sessions.stats()
+        },
+        "password_hasher": password_hasher.stats(),
+        "outbound_http": outbound_http.stats(),
+        "profile_cards": profile_cards.stats(),
+        "user_search": user_search.stats(),
+        "static_responses": {name: response.stats() for name, response in STATIC_RESPONSES.items()},
+        "player_pool": player_pool_service.stats(),
+        "question_queue": question_queue.stats(),
+        "round_scheduler": round_scheduler.stats(),
+        "sockets": socket_registry.gauges(),
+        "matchmaking": matchmaking.stats(),
+        "game_store": await game_store.stats(),
+        "result_writer": result_writer.stats(),
+        "score_ledger": score_ledger.stats(),
+        "leaderboards": await leaderboards.stats()
+    }
+
 # ============ SOCKET.IO HANDLERS ============
 
-matchmaking_queue = {}
-active_games = {}  # room_id -> GameRoom data
-private_rooms = {}  # room_code -> room_id
-
-# Lig sistemleri
-LEAGUES = {
-    "Bronze": {"min_points": 0, "max_points": 999, "icon": "🥉"},
-    "Silver": {"min_points": 1000, "max_points": 2499, "icon": "🥈"},
-    "Gold": {"min_points": 2500, "max_points": 4999, "icon": "🥇"},
-    "Platinum": {"min_points": 5000, "max_points": 9999, "icon": "💎"},
-    "Diamond": {"min_points": 10000, "max_points": 19999, "icon": "💠"},
-    "Legend": {"min_points": 20000, "max_points": float('inf'), "icon": "🏆"}
-}
+from socket_registry import SocketRegistry
+from matchmaking import MatchmakingService, Searcher
+from game_state import create_game_store
+from leaderboard import LeaderboardService, LOCATION_PREFIX, board_scores, create_leaderboard_store
+
+# Aktif oyunlar (room_id -> GameRoom data) ve özel oda kodları (room_code -> oda)
+game_store = create_game_store(REDIS_URL)
+
+# Liderlik tabloları; Redis varsa tüm worker'lar aynı sorted set'leri kullanır
+leaderboards = LeaderboardService(
+    create_leaderboard_store(game_store),
+    refresh_interval=float(os.environ.get('LEADERBOARD_REFRESH_INTERVAL', '0.5')),
+    rebuild_interval=float(os.environ.get('LEADERBOARD_REBUILD_INTERVAL', '3600'))
+)
+# Bu worker'a bağlı soketlerin yerel indeksi
+socket_registry = SocketRegistry()
+
+# Puan ligleri (stats.rank); ELO ligleri game_systems.LEAGUES'ta
+POINT_LEAGUES = LeagueTable({
+    "Bronze": {"min_points": 0, "icon": "🥉"},
+    "Silver": {"min_points": 1000, "icon": "🥈"},
+    "Gold": {"min_points": 2500, "icon": "🥇"},
+    "Platinum": {"min_points": 5000, "icon": "💎"},
+    "Diamond": {"min_points": 10000, "icon": "💠"},
+    "Legend": {"min_points": 20000, "icon": "🏆"}
+}, "min_points", default="Bronze")
 
 def get_league_from_points(points: int) -> str:
-    for league, data in LEAGUES.items():
-        if data["min_points"] <= points <= data["max_points"]:
-            return league
-    return "Bronze"
+    return POINT_LEAGUES.lookup(points).id
+
+from result_writer import ResultWriter
+
+def invalidate_flushed_users(user_ids: List[str]):
+    for user_id in user_ids:
+        session_cache.invalidate_user(user_id)
+    leaderboards.mark_dirty(user_ids)
+
+# Maç sonu istatistikleri: kullanıcı başına birleştirilip periyodik bulk_write ile yazılır
+result_writer = ResultWriter(
+    db.users,
+    league_table=POINT_LEAGUES,
+    flush_interval=float(os.environ.get('RESULT_FLUSH_INTERVAL', '0.5')),
+    max_pending=int(os.environ.get('RESULT_FLUSH_MAX_PENDING', '1000')),
+    on_flushed=invalidate_flushed_users
+)
+
+from score_ledger import ScoreLedger
+
+# Skor olayları -> daily_scores / weekly_scores (artımlı $merge rollup'ı)
+score_ledger = ScoreLedger(
+    db,
+    flush_interval=float(os.environ.get('SCORE_LEDGER_FLUSH_INTERVAL', '1.0')),
+    rollup_interval=float(os.environ.get('SCORE_ROLLUP_INTERVAL', '60')),
+    rollup_lag=float(os.environ.get('SCORE_ROLLUP_LAG', '120'))
+)
 
 def calculate_xp_for_level(level: int) -> int:
     return level * 100 + (level - 1) * 50
 
-async def generate_questions(game_mode: str, count: int = 10) -> List[dict]:
-    """Generate questions based on game mode"""
+from player_pool import PlayerPoolService
+
+player_pool_service = PlayerPoolService(
+    check_interval=float(os.environ.get('PLAYER_POOL_CHECK_INTERVAL', '60')),
+    max_age=float(os.environ.get('PLAYER_POOL_MAX_AGE', '3600'))
+)
+
+def generate_questions(game_mode: str, count: int = 10) -> List[dict]:
+    """Generate questions based on game mode (bellekteki oyuncu havuzundan, DB I/O yok)"""
     questions = []
     
     # Oyuncu havuzunu al
-    players = await db.players.find({}).to_list(500)
+    pool = player_pool_service.current
+    if len(pool) < 4:
+        logger.warning("Player pool too small for questions: %d players", len(pool))
+        return questions
     
     if game_mode == "mystery-player":
         # Gizli Oyuncu modu - ipuçları ile tahmin
-        import random
-        random.shuffle(players)
-        for player in players[:count]:
-            teams = player.get("team_history", [])
+        for player in pool.sample(count):
+            teams = player.teams
             hints = []
             if teams:
-                hints.append(f"Oynadığı takımlardan biri: {teams[0].get('team', 'Bilinmiyor')}")
+                hints.append(f"Oynadığı takımlardan biri: {teams[0]}")
             if len(teams) > 1:
-                hints.append(f"Başka bir takım: {teams[1].get('team', 'Bilinmiyor')}")
+                hints.append(f"Başka bir takım: {teams[1]}")
             
             # Yanlış şıklar için diğer oyuncuları seç
-            wrong_answers = random.sample([p["name"] for p in players if p["name"] != player["name"]], 3)
-            options = wrong_answers + [player["name"]]
+            wrong_answers = pool.random_names(3, exclude=player.name)
+            options = wrong_answers + [player.name]
             random.shuffle(options)
             
             questions.append({
                 "question_id": f"q_{uuid.uuid4().hex[:8]}",
                 "type": "mystery-player",
                 "hints": hints,
-                "correct_answer": player["name"],
+                "correct_answer": player.name,
                 "options": options,
-                "player_data": player
+                "player_data": player.as_dict()
             })
     
     elif game_mode == "value-guess":
         # Değer Tahmini modu
-        import random
-        random.shuffle(players)
-        for player in players[:count]:
-            market_values = player.get("market_values", [])
-            if market_values:
-                value = market_values[-1].get("value", "10M €")
-            else:
-                value = "10M €"
+        for player in pool.sample(count):
+            value = player.market_value or "10M €"
             
             # Değer seçenekleri oluştur
             base_value = 10  # Milyon
@@ -1549,21 +1847,22 @@ async def generate_questions(game_mode: str, count: int = 10) -> List[dict]:
             questions.append({
                 "question_id": f"q_{uuid.uuid4().hex[:8]}",
                 "type": "value-guess",
-                "player_name": player["name"],
+                "player_name": player.name,
                 "correct_answer": value,
                 "options": options
             })
     
     elif game_mode == "career-path":
         # Kariyer Yolu - hangi takımlarda oynadı
-        import random
-        random.shuffle(players)
-        for player in players[:count]:
-            teams = player.get("team_history", [])
+        team_universe = pool.team_universe
+        for player in pool.sample(count):
+            teams = player.teams
             if len(teams) >= 2:
-                correct_teams = [t.get("team", "") for t in teams[:3]]
-                all_teams = list(set([t.get("team", "") for p in players for t in p.get("team_history", [])]))
-                wrong_teams = random.sample([t for t in all_teams if t not in correct_teams], 3)
+                correct_teams = list(teams[:3])
+                # Aynı çevreden/dönemden, oyuncunun hiç oynamadığı takımlar
+                wrong_teams = team_universe.sample_distractors(correct_teams[0], exclude=teams)
+                if len(wrong_teams) < 3:
+                    continue
                 
                 options = wrong_teams + [correct_teams[0]]
                 random.shuffle(options)
@@ -1571,18 +1870,16 @@ async def generate_questions(game_mode: str, count: int = 10) -> List[dict]:
                 questions.append({
                     "question_id": f"q_{uuid.uuid4().hex[:8]}",
                     "type": "career-path",
-                    "player_name": player["name"],
-                    "question": f"{player['name']} hangi takımda oynadı?",
+                    "player_name": player.name,
+                    "question": f"{player.name} hangi takımda oynadı?",
                     "correct_answer": correct_teams[0],
                     "options": options
                 })
     
     elif game_mode == "letter-hunt":
         # Harf Avı - harflerden oyuncu bul
-        import random
-        random.shuffle(players)
-        for player in players[:count]:
-            name = player["name"]
+        for player in pool.sample(count):
+            name = player.name
             hidden_name = ""
             revealed_indices = random.sample(range(len(name)), min(3, len(name)))
             for i, char in enumerate(name):
@@ -1591,7 +1888,7 @@ async def generate_questions(game_mode: str, count: int = 10) -> List[dict]:
                 else:
                     hidden_name += "_"
             
-            wrong_answers = random.sample([p["name"] for p in players if p["name"] != name], 3)
+            wrong_answers = pool.random_names(3, exclude=name)
             options = wrong_answers + [name]
             random.shuffle(options)
             
@@ -1605,54 +1902,169 @@ async def generate_questions(game_mode: str, count: int = 10) -> List[dict]:
     
     else:
         # Varsayılan mod
-        import random
-        random.shuffle(players)
-        for player in players[:count]:
-            wrong_answers = random.sample([p["name"] for p in players if p["name"] != player["name"]], 3)
-            options = wrong_answers + [player["name"]]
+        for player in pool.sample(count):
+            wrong_answers = pool.random_names(3, exclude=player.name)
+            options = wrong_answers + [player.name]
             random.shuffle(options)
             
             questions.append({
                 "question_id": f"q_{uuid.uuid4().hex[:8]}",
                 "type": "general",
                 "question": f"Bu oyuncunun adı nedir?",
-                "correct_answer": player["name"],
+                "correct_answer": player.name,
                 "options": options
             })
     
     return questions
 
+from question_queue import QuestionSetQueue
+from round_scheduler import RoundScheduler
+
+question_queue = QuestionSetQueue(
+    generator=generate_questions,
+    pool_version=lambda: player_pool_service.current.version,
+    depth=int(os.environ.get('QUESTION_QUEUE_DEPTH', '8'))
+)
+
+# Tüm odaların tur geçişlerini tek bir task yönetir
+round_scheduler = RoundScheduler()
+
+from http.cookies import CookieError, SimpleCookie
+from socketio.exceptions import ConnectionRefusedError as SocketConnectionRefused
+
+# "optional": oturumu olmayan soketler misafir olarak bağlanır
+# "required": oturumu olmayan bağlantılar reddedilir
+# İstemci (SocketContext) artık auth.token gönderiyor; eski uygulama sürümleri
+# kullanımdan kalkınca varsayılan "required" yapılacak. Misafirin kimliği
+# payload'dan değil sunucudan gelir (guest_<sid>), böylece başka bir kullanıcının
+# jokerlerini harcayamaz ve ELO/istatistiğine yazamaz.
+SOCKET_AUTH_MODE = os.environ.get('SOCKET_AUTH_MODE', 'optional')
+GUEST_PREFIX = 'guest_'
+
+def is_guest(user_id: str) -> bool:
+    return user_id.startswith(GUEST_PREFIX)
+
+def socket_session_token(environ: dict, auth) -> Optional[str]:
+    """Session token from the Socket.IO auth payload, the cookie or the Authorization header"""
+    if isinstance(auth, dict) and auth.get('token'):
+        return auth['token']
+    try:
+        cookie = SimpleCookie(environ.get('HTTP_COOKIE', ''))
+    except CookieError:
+        cookie = {}
+    if 'session_token' in cookie:
+        return cookie['session_token'].value
+    auth_header = environ.get('HTTP_AUTHORIZATION', '')
+    if auth_header.startswith('Bearer '):
+        return auth_header.replace('Bearer ', '')
+    return None
+
+def socket_profile(session_token: str, user: dict) -> dict:
+    """What a socket keeps in its sid session for the whole connection"""
+    return {
+        'token': session_token,
+        'user_id': user['user_id'],
+        'username': user.get('username') or user.get('name') or 'Player',
+        'elo': user.get('elo', 1000)
+    }
+
+async def socket_identity(sid: str, data: dict):
+    """(user_id, username): the authenticated profile, else a server-assigned guest id"""
+    session = await sio.get_session(sid)
+    if session.get('user_id'):
+        return session['user_id'], session['username']
+    return f"{GUEST_PREFIX}{sid}", data.get('username', 'Player')
+
+async def match_profile(sid: str, data: dict) -> Optional[dict]:
+    """Profile for a match about to start; None (error sent) if the session is gone
+
+    Authenticated sockets re-resolve through the session cache (normally no
+    I/O) so a logout or revoked session since connect is noticed. Guest
+    sockets get their guest_<sid> id and the starting ELO.
+    """
+    session = await sio.get_session(sid)
+    if not session.get('token'):
+        return {
+            'user_id': f"{GUEST_PREFIX}{sid}",
+            'username': data.get('username', 'Player'),
+            'elo': 1000
+        }
+    
+    user = await resolve_session_token(session['token'])
+    if user is None:
+        # Bağlantı açıkken çıkış yapılmış ya da oturum iptal edilmiş
+        await sio.emit('error', {'message': 'Not authenticated'}, to=sid)
+        return None
+    
+    profile = socket_profile(session['token'], user)
+    await sio.save_session(sid, profile)
+    return profile
+
+def room_player(sid: str, user_id: str, username: str) -> dict:
+    return {'sid': sid, 'user_id': user_id, 'username': username, 'score': 0, 'combo': 0}
+
 @sio.event
-async def connect(sid, environ):
+async def connect(sid, environ, auth=None):
+    user = None
+    session_token = socket_session_token(environ, auth)
+    if session_token:
+        user = await resolve_session_token(session_token)
+    
+    if user is None and SOCKET_AUTH_MODE == 'required':
+        raise SocketConnectionRefused('Not authenticated')
+    
+    if user is not None:
+        # Profil bağlantı boyunca sid oturumunda; olaylar kullanıcıyı DB'den okumaz
+        await sio.save_session(sid, socket_profile(session_token, user))
+        socket_registry.bind(sid, user['user_id'])
+    
     logger.info(f"Client connected: {sid}")
-    await sio.emit('connected', {'sid': sid}, to=sid)
+    await sio.emit('connected', {
+        'sid': sid,
+        'authenticated': user is not None,
+        'user_id': user['user_id'] if user is not None else f"{GUEST_PREFIX}{sid}"
+    }, to=sid)
 
 @sio.event
 async def disconnect(sid):
     logger.info(f"Client disconnected: {sid}")
+    attached = socket_registry.drop(sid)
+    
     # Remove from matchmaking
-    for mode in matchmaking_queue:
-        matchmaking_queue[mode] = [p for p in matchmaking_queue[mode] if p['sid'] != sid]
+    if attached['queue_mode']:
+        await matchmaking.remove(attached['queue_mode'], attached['user_id'], sid)
+    
+    # Bekleyen özel odanın kodunu geçersiz kıl
+    if attached['private_code']:
+        await game_store.close_private_room(attached['private_code'])
     
     # Handle disconnection in active games
-    for room_id, game in list(active_games.items()):
-        for player in game.get('players', []):
-            if player.get('sid') == sid:
-                # Oyuncu disconnected - rakibe bildir
-                await sio.emit('opponent_disconnected', {
-                    'room_id': room_id,
-                    'wait_time': 30  # 30 saniye bekle
-                }, room=room_id)
-                player['disconnected'] = True
-                player['disconnect_time'] = datetime.now(timezone.utc)
-                break
+    # (oda başka bir worker'da kurulduysa yerel indeks bilmez, depoya sor)
+    room_id = attached['room_id'] or await game_store.room_of(sid)
+    if not room_id:
+        return
+    async with game_store.transaction(room_id) as game:
+        player = next((p for p in game['players'] if p.get('sid') == sid), None) if game else None
+        if player:
+            player['disconnected'] = True
+            player['disconnect_time'] = datetime.now(timezone.utc)
+    
+    if player:
+        # Oyuncu disconnected - rakibe bildir
+        await sio.emit('opponent_disconnected', {
+            'room_id': room_id,
+            'wait_time': 30  # 30 saniye bekle
+        }, room=room_id)
 
 @sio.event
 async def join_matchmaking(sid, data):
     """Join matchmaking queue for quick match"""
     game_mode = data.get('game_mode')
-    user_id = data.get('user_id')
-    username = data.get('username', 'Player')
+    profile = await match_profile(sid, data)
+    if profile is None:
+        return
+    user_id = profile['user_id']
+    username = profile['username']
     
     if not game_mode or not user_id:
         await sio.emit('error', {'message': 'Invalid data'}, to=sid)
@@ -1660,107 +2072,118 @@ async def join_matchmaking(sid, data):
     
     logger.info(f"User {user_id} joining {game_mode} matchmaking")
     
-    if game_mode not in matchmaking_queue:
-        matchmaking_queue[game_mode] = []
-    
     # Check if already in queue
-    for p in matchmaking_queue[game_mode]:
-        if p['user_id'] == user_id:
-            await sio.emit('already_in_queue', {}, to=sid)
-            return
+    searcher = Searcher(user_id, sid, username, profile['elo'], time.monotonic())
+    if not await matchmaking.add(game_mode, searcher):
+        await sio.emit('already_in_queue', {}, to=sid)
+        return
+    
+    socket_registry.bind(sid, user_id)
+    socket_registry.enqueue(sid, game_mode)
     
-    matchmaking_queue[game_mode].append({
-        'sid': sid, 
-        'user_id': user_id,
-        'username': username,
-        'joined_at': datetime.now(timezone.utc)
+    # Eşleştirme tick'te toplu yapılır
+    await sio.emit('searching', {
+        'position': await matchmaking.queue_length(game_mode),
+        'estimated_wait': '~30 saniye'
+    }, to=sid)
+
+async def create_match(game_mode: str, player1: Searcher, player2: Searcher):
+    """Create a room for a pair produced by the matchmaking tick"""
+    socket_registry.dequeue(player1.sid)
+    socket_registry.dequeue(player2.sid)
+    
+    room_id = f"game_{uuid.uuid4().hex[:12]}"
+    
+    # Hazır soru setini kuyruktan al
+    questions = question_queue.take(game_mode, [player1.user_id, player2.user_id])
+    
+    # Oyun odasını oluştur
+    await game_store.create_game({
+        'room_id': room_id,
+        'game_mode': game_mode,
+        'players': [
+            room_player(player1.sid, player1.user_id, player1.username),
+            room_player(player2.sid, player2.user_id, player2.username)
+        ],
+        'questions': questions,
+        'current_question': 0,
+        'status': 'starting',
+        'created_at': datetime.now(timezone.utc),
+        'round_answers': {}
     })
     
-    # Eşleşme var mı kontrol et
-    if len(matchmaking_queue[game_mode]) >= 2:
-        player1 = matchmaking_queue[game_mode].pop(0)
-        player2 = matchmaking_queue[game_mode].pop(0)
-        
-        room_id = f"game_{uuid.uuid4().hex[:12]}"
-        
-        # Soruları oluştur
-        questions = await generate_questions(game_mode, 10)
-        
-        # Oyun odasını oluştur
-        active_games[room_id] = {
-            'room_id': room_id,
-            'game_mode': game_mode,
-            'players': [
-                {'sid': player1['sid'], 'user_id': player1['user_id'], 'username': player1['username'], 'score': 0, 'combo': 0},
-                {'sid': player2['sid'], 'user_id': player2['user_id'], 'username': player2['username'], 'score': 0, 'combo': 0}
-            ],
-            'questions': questions,
-            'current_question': 0,
-            'status': 'starting',
-            'created_at': datetime.now(timezone.utc),
-            'round_answers': {}
-        }
-        
-        await sio.enter_room(player1['sid'], room_id)
-        await sio.enter_room(player2['sid'], room_id)
-        
-        # Her iki oyuncuya da eşleşme bilgisi gönder
-        await sio.emit('match_found', {
-            'room_id': room_id,
-            'opponent': {'user_id': player2['user_id'], 'username': player2['username']},
-            'game_mode': game_mode,
-            'total_questions': len(questions)
-        }, to=player1['sid'])
-        
-        await sio.emit('match_found', {
-            'room_id': room_id,
-            'opponent': {'user_id': player1['user_id'], 'username': player1['username']},
-            'game_mode': game_mode,
-            'total_questions': len(questions)
-        }, to=player2['sid'])
-        
-        logger.info(f"Match created: {room_id} between {player1['username']} and {player2['username']}")
-        
-        # 3 saniye sonra oyunu başlat
-        import asyncio
-        await asyncio.sleep(3)
-        await start_game_round(room_id)
-    else:
-        await sio.emit('searching', {
-            'position': len(matchmaking_queue[game_mode]),
-            'estimated_wait': '~30 saniye'
-        }, to=sid)
+    await sio.enter_room(player1.sid, room_id)
+    await sio.enter_room(player2.sid, room_id)
+    socket_registry.join_room(player1.sid, room_id)
+    socket_registry.join_room(player2.sid, room_id)
+    
+    # Her iki oyuncuya da eşleşme bilgisi gönder
+    await sio.emit('match_found', {
+        'room_id': room_id,
+        'opponent': {'user_id': player2.user_id, 'username': player2.username},
+        'game_mode': game_mode,
+        'total_questions': len(questions)
+    }, to=player1.sid)
+    
+    await sio.emit('match_found', {
+        'room_id': room_id,
+        'opponent': {'user_id': player1.user_id, 'username': player1.username},
+        'game_mode': game_mode,
+        'total_questions': len(questions)
+    }, to=player2.sid)
+    
+    logger.info(f"Match created: {room_id} between {player1.username} ({player1.elo}) and {player2.username} ({player2.elo})")
+    
+    # 3 saniye sonra oyunu başlat (handler beklemeden döner)
+    round_scheduler.schedule(room_id, 3, start_game_round, room_id)
+
+matchmaking = MatchmakingService(
+    on_match=create_match,
+    shared_queue=game_store if game_store.shared else None,
+    tick_interval=float(os.environ.get('MATCHMAKING_TICK_SECONDS', '1.0')),
+    base_window=int(os.environ.get('MATCHMAKING_BASE_WINDOW', '100')),
+    widen_per_second=float(os.environ.get('MATCHMAKING_WIDEN_PER_SECOND', '20')),
+    max_window=int(os.environ.get('MATCHMAKING_MAX_WINDOW', '1000'))
+)
 
 @sio.event
 async def leave_matchmaking(sid, data):
     """Leave matchmaking queue"""
-    game_mode = data.get('game_mode')
-    if game_mode and game_mode in matchmaking_queue:
-        matchmaking_queue[game_mode] = [
-            p for p in matchmaking_queue[game_mode] if p['sid'] != sid
-        ]
+    game_mode = socket_registry.dequeue(sid) or data.get('game_mode')
+    user_id = socket_registry.user_of(sid)
+    if game_mode and user_id:
+        await matchmaking.remove(game_mode, user_id, sid)
     await sio.emit('left_queue', {}, to=sid)
 
 @sio.event
 async def create_private_room(sid, data):
     """Create a private room for friend match"""
-    user_id = data.get('user_id')
-    username = data.get('username', 'Player')
+    profile = await match_profile(sid, data)
+    if profile is None:
+        return
+    user_id = profile['user_id']
+    username = profile['username']
     game_mode = data.get('game_mode')
     
     import random
     import string
-    room_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
     room_id = f"private_{uuid.uuid4().hex[:12]}"
-    
-    private_rooms[room_code] = {
+    room = {
         'room_id': room_id,
         'host': {'sid': sid, 'user_id': user_id, 'username': username},
         'game_mode': game_mode,
         'created_at': datetime.now(timezone.utc)
     }
     
+    # Kod çakışırsa yenisini üret
+    room_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+    while not await game_store.open_private_room(room_code, room):
+        room_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+    
     await sio.enter_room(sid, room_id)
+    socket_registry.bind(sid, user_id)
+    socket_registry.join_room(sid, room_id)
+    socket_registry.host_private_room(sid, room_code)
     
     await sio.emit('room_created', {
         'room_code': room_code,
@@ -1771,37 +2194,44 @@ async def create_private_room(sid, data):
 async def join_private_room(sid, data):
     """Join a private room with code"""
     room_code = data.get('room_code', '').upper()
-    user_id = data.get('user_id')
-    username = data.get('username', 'Player')
+    profile = await match_profile(sid, data)
+    if profile is None:
+        return
+    user_id = profile['user_id']
+    username = profile['username']
     
-    if room_code not in private_rooms:
+    # Kodu atomik olarak al; aynı koda gelen ikinci misafir odayı bulamaz
+    room_data = await game_store.claim_private_room(room_code)
+    if room_data is None:
         await sio.emit('error', {'message': 'Oda bulunamadı'}, to=sid)
         return
     
-    room_data = private_rooms[room_code]
     room_id = room_data['room_id']
     host = room_data['host']
     game_mode = room_data['game_mode']
     
-    # Soruları oluştur
-    questions = await generate_questions(game_mode, 10)
+    # Hazır soru setini kuyruktan al
+    questions = question_queue.take(game_mode, [host['user_id'], user_id])
     
     # Oyun odasını oluştur
-    active_games[room_id] = {
+    await game_store.create_game({
         'room_id': room_id,
         'game_mode': game_mode,
         'players': [
-            {'sid': host['sid'], 'user_id': host['user_id'], 'username': host['username'], 'score': 0, 'combo': 0},
-            {'sid': sid, 'user_id': user_id, 'username': username, 'score': 0, 'combo': 0}
+            room_player(host['sid'], host['user_id'], host['username']),
+            room_player(sid, user_id, username)
         ],
         'questions': questions,
         'current_question': 0,
         'status': 'starting',
         'created_at': datetime.now(timezone.utc),
         'round_answers': {}
-    }
+    })
     
     await sio.enter_room(sid, room_id)
+    socket_registry.bind(sid, user_id)
+    socket_registry.join_room(sid, room_id)
+    socket_registry.release_private_room(host['sid'])
     
     # Her iki oyuncuya da bilgi gönder
     await sio.emit('match_found', {
@@ -1818,65 +2248,54 @@ async def join_private_room(sid, data):
         'total_questions': len(questions)
     }, to=sid)
     
-    # Oda kodunu sil
-    del private_rooms[room_code]
-    
-    # 3 saniye sonra oyunu başlat
-    import asyncio
-    await asyncio.sleep(3)
-    await start_game_round(room_id)
+    # 3 saniye sonra oyunu başlat (handler beklemeden döner)
+    round_scheduler.schedule(room_id, 3, start_game_round, room_id)
 
 async def start_game_round(room_id: str):
     """Start a new round/question"""
-    if room_id not in active_games:
-        return
-    
-    game = active_games[room_id]
+    async with game_store.transaction(room_id) as game:
+        if game is None:
+            return
+        
+        game_over = game['current_question'] >= len(game['questions'])
+        if not game_over:
+            question = game['questions'][game['current_question']]
+            game['status'] = 'playing'
+            game['question_start_time'] = datetime.now(timezone.utc)
+            game['round_answers'] = {}
+            
+            # Soruyu gönder (cevabı gizle)
+            question_data = {k: v for k, v in question.items() if k != 'correct_answer'}
+            question_data['question_number'] = game['current_question'] + 1
+            question_data['total_questions'] = len(game['questions'])
+            question_data['time_limit'] = 15  # 15 saniye
     
-    if game['current_question'] >= len(game['questions']):
+    if game_over:
         # Oyun bitti
         await end_game(room_id)
         return
     
-    question = game['questions'][game['current_question']]
-    game['status'] = 'playing'
-    game['question_start_time'] = datetime.now(timezone.utc)
-    game['round_answers'] = {}
-    
-    # Soruyu gönder (cevabı gizle)
-    question_data = {k: v for k, v in question.items() if k != 'correct_answer'}
-    question_data['question_number'] = game['current_question'] + 1
-    question_data['total_questions'] = len(game['questions'])
-    question_data['time_limit'] = 15  # 15 saniye
-    
     await sio.emit('new_question', question_data, room=room_id)
     
     # 15 saniye sonra süre doldu kontrolü
-    import asyncio
-    await asyncio.sleep(15)
-    await check_round_timeout(room_id, game['current_question'])
+    round_scheduler.schedule(room_id, 15, check_round_timeout, room_id, question_data['question_number'] - 1)
 
 async def check_round_timeout(room_id: str, question_index: int):
     """Check if round timed out and move to next question"""
-    if room_id not in active_games:
-        return
-    
-    game = active_games[room_id]
-    
-    # Hala aynı soruda mıyız?
-    if game['current_question'] != question_index:
-        return
-    
-    # Cevap vermeyenlere yanlış say
-    question = game['questions'][question_index]
-    for player in game['players']:
-        if player['user_id'] not in game['round_answers']:
-            game['round_answers'][player['user_id']] = {
-                'answer': None,
-                'time_taken': 15,
-                'correct': False
-            }
-            player['combo'] = 0  # Combo kırıldı
+    async with game_store.transaction(room_id) as game:
+        # Hala aynı soruda mıyız?
+        if game is None or game['current_question'] != question_index:
+            return
+        
+        # Cevap vermeyenlere yanlış say
+        for player in game['players']:
+            if player['user_id'] not in game['round_answers']:
+                game['round_answers'][player['user_id']] = {
+                    'answer': None,
+                    'time_taken': 15,
+                    'correct': False
+                }
+                player['combo'] = 0  # Combo kırıldı
     
     # Sonuçları gönder
     await send_round_results(room_id)
@@ -1886,91 +2305,98 @@ async def submit_answer(sid, data):
     """Player submits an answer"""
     room_id = data.get('room_id')
     answer = data.get('answer')
-    user_id = data.get('user_id')
+    user_id, _ = await socket_identity(sid, data)
     
-    if room_id not in active_games:
-        await sio.emit('error', {'message': 'Oyun bulunamadı'}, to=sid)
-        return
-    
-    game = active_games[room_id]
-    question = game['questions'][game['current_question']]
-    
-    # Süreyi hesapla
-    time_taken = (datetime.now(timezone.utc) - game['question_start_time']).total_seconds()
-    is_correct = answer == question['correct_answer']
-    
-    # Puanı hesapla
-    base_points = 100 if is_correct else 0
-    speed_bonus = max(0, int((15 - time_taken) * 10)) if is_correct else 0
-    
-    # Combo sistemi
-    player = next((p for p in game['players'] if p['user_id'] == user_id), None)
-    if player:
-        if is_correct:
-            player['combo'] += 1
-            combo_multiplier = min(player['combo'], 5)  # Max 5x combo
-        else:
-            player['combo'] = 0
-            combo_multiplier = 1
+    async with game_store.transaction(room_id) as game:
+        if game is None:
+            await sio.emit('error', {'message': 'Oyun bulunamadı'}, to=sid)
+            return
         
-        total_points = (base_points + speed_bonus) * combo_multiplier
-        player['score'] += total_points
+        if game['status'] != 'playing':
+            # Tur sonuçları gönderildi, geç gelen cevap sayılmaz
+            return
+        question = game['questions'][game['current_question']]
         
-        game['round_answers'][user_id] = {
-            'answer': answer,
-            'time_taken': time_taken,
-            'correct': is_correct,
-            'points': total_points,
-            'combo': player['combo'],
-            'speed_bonus': speed_bonus
-        }
+        # Süreyi hesapla
+        time_taken = (datetime.now(timezone.utc) - game['question_start_time']).total_seconds()
+        is_correct = answer == question['correct_answer']
+        
+        # Puanı hesapla
+        base_points = 100 if is_correct else 0
+        speed_bonus = max(0, int((15 - time_taken) * 10)) if is_correct else 0
+        
+        # Combo sistemi
+        player = next((p for p in game['players'] if p['user_id'] == user_id), None)
+        if player:
+            if is_correct:
+                player['combo'] += 1
+                combo_multiplier = min(player['combo'], 5)  # Max 5x combo
+            else:
+                player['combo'] = 0
+                combo_multiplier = 1
+            
+            total_points = (base_points + speed_bonus) * combo_multiplier
+            player['score'] += total_points
+            
+            game['round_answers'][user_id] = {
+                'answer': answer,
+                'time_taken': time_taken,
+                'correct': is_correct,
+                'points': total_points,
+                'combo': player['combo'],
+                'speed_bonus': speed_bonus
+            }
+        
+        all_answered = len(game['round_answers']) >= len(game['players'])
     
     # Tüm oyuncular cevap verdiyse
-    if len(game['round_answers']) >= len(game['players']):
+    if all_answered:
+        round_scheduler.cancel(room_id)
         await send_round_results(room_id)
 
 async def send_round_results(room_id: str):
     """Send round results to all players"""
-    if room_id not in active_games:
-        return
-    
-    game = active_games[room_id]
-    question = game['questions'][game['current_question']]
-    
-    results = {
-        'correct_answer': question['correct_answer'],
-        'player_results': [],
-        'scores': {}
-    }
-    
-    for player in game['players']:
-        answer_data = game['round_answers'].get(player['user_id'], {})
-        results['player_results'].append({
-            'user_id': player['user_id'],
-            'username': player['username'],
-            'correct': answer_data.get('correct', False),
-            'time_taken': answer_data.get('time_taken', 15),
-            'points': answer_data.get('points', 0),
-            'combo': answer_data.get('combo', 0)
-        })
-        results['scores'][player['user_id']] = player['score']
+    async with game_store.transaction(room_id) as game:
+        if game is None or game['status'] != 'playing':
+            return
+        game['status'] = 'round_results'
+        question = game['questions'][game['current_question']]
+        
+        results = {
+            'correct_answer': question['correct_answer'],
+            'player_results': [],
+            'scores': {}
+        }
+        
+        for player in game['players']:
+            answer_data = game['round_answers'].get(player['user_id'], {})
+            results['player_results'].append({
+                'user_id': player['user_id'],
+                'username': player['username'],
+                'correct': answer_data.get('correct', False),
+                'time_taken': answer_data.get('time_taken', 15),
+                'points': answer_data.get('points', 0),
+                'combo': answer_data.get('combo', 0)
+            })
+            results['scores'][player['user_id']] = player['score']
+        
+        # Sonraki soruya geç
+        game['current_question'] += 1
     
     await sio.emit('round_results', results, room=room_id)
     
-    # Sonraki soruya geç
-    game['current_question'] += 1
-    
-    import asyncio
-    await asyncio.sleep(3)  # 3 saniye sonuçları göster
-    await start_game_round(room_id)
+    # 3 saniye sonuçları göster; bekleyen zaman aşımı bu kayıtla yer değiştirir
+    round_scheduler.schedule(room_id, 3, start_game_round, room_id)
 
 async def end_game(room_id: str):
     """End the game and calculate final results"""
-    if room_id not in active_games:
+    # Oyunu depodan al; aynı anda çağrılırsa yalnızca biri bulur
+    async with game_store.lock(room_id):
+        game = await game_store.pop_game(room_id)
+    if game is None:
         return
     
-    game = active_games[room_id]
-    game['status'] = 'finished'
+    round_scheduler.cancel(room_id)
     
     # Kazananı belirle
     sorted_players = sorted(game['players'], key=lambda p: p['score'], reverse=True)
@@ -2006,96 +2432,94 @@ async def end_game(room_id: str):
             'is_winner': is_winner
         }
         
-        # Veritabanını güncelle
-        update_data = {
-            "$inc": {
-                "stats.total_games": 1,
-                "stats.points": player['score'],
-                "stats.xp": xp_earned,
-                "coins": coins_earned
-            }
-        }
-        
-        if is_winner:
-            update_data["$inc"]["stats.wins"] = 1
-            update_data["$inc"]["stats.win_streak"] = 1
-        elif not is_draw:
-            update_data["$inc"]["stats.losses"] = 1
-            update_data["$set"] = {"stats.win_streak": 0}
-        
-        await db.users.update_one({"user_id": player['user_id']}, update_data)
+        if is_guest(player['user_id']):
+            # Misafirin kalıcı kaydı yok
+            continue
         
-        # Lig güncelle
-        user = await db.users.find_one({"user_id": player['user_id']})
-        if user:
-            new_points = user.get("stats", {}).get("points", 0)
-            new_league = get_league_from_points(new_points)
-            await db.users.update_one(
-                {"user_id": player['user_id']},
-                {"$set": {"stats.rank": new_league}}
-            )
+        # Veritabanı güncellemesi toplu yazıcıya; lig Mongo tarafında hesaplanır
+        outcome = 'draw' if is_draw else ('win' if is_winner else 'loss')
+        result_writer.record(player['user_id'], player['score'], xp_earned, coins_earned, outcome)
+        score_ledger.record(player['user_id'], player['score'], game.get('game_mode'), won=outcome == 'win')
     
     await sio.emit('game_over', results, room=room_id)
     
     # Odayı temizle
-    del active_games[room_id]
+    socket_registry.close_room(room_id)
 
 @sio.event
 async def use_joker(sid, data):
     """Use a joker during the game"""
     room_id = data.get('room_id')
-    user_id = data.get('user_id')
+    user_id, _ = await socket_identity(sid, data)
     joker_type = data.get('joker_type')
     
-    if room_id not in active_games:
-        await sio.emit('error', {'message': 'Oyun bulunamadı'}, to=sid)
-        return
-    
-    # Joker kontrolü
-    user = await db.users.find_one({"user_id": user_id})
-    if not user or user.get("jokers", {}).get(joker_type, 0) <= 0:
+    if joker_type not in JOKER_TYPES:
         await sio.emit('error', {'message': 'Joker yok'}, to=sid)
         return
     
-    # Jokeri kullan
-    await db.users.update_one(
-        {"user_id": user_id},
-        {"$inc": {f"jokers.{joker_type}": -1}}
-    )
-    
-    game = active_games[room_id]
-    question = game['questions'][game['current_question']]
-    
     result = {'joker_type': joker_type, 'success': True}
     
-    if joker_type == 'time_extend':
-        result['extra_time'] = 5
-    elif joker_type == 'eliminate_two':
-        # 2 yanlış şıkkı sil
-        import random
-        wrong_options = [o for o in question['options'] if o != question['correct_answer']]
-        eliminated = random.sample(wrong_options, min(2, len(wrong_options)))
-        result['eliminated_options'] = eliminated
-    elif joker_type == 'reveal_letter':
-        # Bir harf aç
-        correct = question['correct_answer']
-        hidden_indices = [i for i, c in enumerate(correct) if c != ' ']
-        if hidden_indices:
+    async with game_store.transaction(room_id) as game:
+        player = next((p for p in game['players'] if p['user_id'] == user_id), None) if game else None
+        if player is None:
+            await sio.emit('error', {'message': 'Oyun bulunamadı'}, to=sid)
+            return
+        if game['status'] != 'playing':
+            # Tur arasında açık soru yok; joker harcanmaz
+            await sio.emit('error', {'message': 'Şu an joker kullanılamaz'}, to=sid)
+            return
+        if is_guest(user_id):
+            # Misafirin joker envanteri yok
+            await sio.emit('error', {'message': 'Joker yok'}, to=sid)
+            return
+        
+        # Kontrol ve düşüm tek atomik DB işlemi: aynı anda süren iki maç
+        # aynı jokeri iki kez harcayamaz, envanter eksiye düşmez
+        spent = await db.users.find_one_and_update(
+            {"user_id": user_id, f"jokers.{joker_type}": {"$gte": 1}},
+            {"$inc": {f"jokers.{joker_type}": -1}},
+            {"_id": 0, "user_id": 1}
+        )
+        if spent is None:
+            await sio.emit('error', {'message': 'Joker yok'}, to=sid)
+            return
+        session_cache.invalidate_user(user_id)
+        
+        question = game['questions'][game['current_question']]
+        
+        if joker_type == 'time_extend':
+            result['extra_time'] = 5
+        elif joker_type == 'eliminate_two':
+            # 2 yanlış şıkkı sil
             import random
-            reveal_idx = random.choice(hidden_indices)
-            result['revealed_letter'] = {'index': reveal_idx, 'letter': correct[reveal_idx]}
-    elif joker_type == 'skip_question':
-        # Soruyu geç
-        game['current_question'] += 1
-        result['skipped'] = True
+            wrong_options = [o for o in question['options'] if o != question['correct_answer']]
+            eliminated = random.sample(wrong_options, min(2, len(wrong_options)))
+            result['eliminated_options'] = eliminated
+        elif joker_type == 'reveal_letter':
+            # Bir harf aç
+            correct = question['correct_answer']
+            hidden_indices = [i for i, c in enumerate(correct) if c != ' ']
+            if hidden_indices:
+                import random
+                reveal_idx = random.choice(hidden_indices)
+                result['revealed_letter'] = {'index': reveal_idx, 'letter': correct[reveal_idx]}
+        elif joker_type == 'skip_question':
+            # Soruyu geç; yeni tur başlayana kadar gelen cevaplar sayılmaz
+            game['status'] = 'skipped'
+            game['current_question'] += 1
+            result['skipped'] = True
     
     await sio.emit('joker_used', result, to=sid)
+    
+    if result.get('skipped'):
+        # Bekleyen zaman aşımının yerine sonraki soruyu hemen başlat (son soruysa oyun biter)
+        round_scheduler.schedule(room_id, 0, start_game_round, room_id)
 
 @sio.event
 async def request_rematch(sid, data):
     """Request a rematch after game ends"""
     room_id = data.get('room_id')
-    user_id = data.get('user_id')
+    user_id, _ = await socket_identity(sid, data)
     
     await sio.emit('rematch_requested', {
         'from_user': user_id
@@ -2118,7 +2542,7 @@ async def send_emote(sid, data):
     """Send emote to opponent"""
     room_id = data.get('room_id')
     emote = data.get('emote')
-    user_id = data.get('user_id')
+    user_id, _ = await socket_identity(sid, data)
     
     await sio.emit('emote_received', {
         'from_user': user_id,
@@ -2141,10 +2565,66 @@ app.include_router(api_router)
 # Mount Socket.IO
 socket_app = socketio.ASGIApp(sio, app)
 
+from db_indexes import ensure_indexes, log_flagged_queries
+
+@app.on_event("startup")
+async def provision_indexes():
+    # user_sessions.expires_at TTL index'i dahil; süresi dolan oturumları Mongo siler
+    await ensure_indexes(db)
+    log_flagged_queries()
+
+@app.on_event("startup")
+async def load_session_revocations():
+    if session_signer is not None:
+        await revoked_sessions.start()
+
+@app.on_event("startup")
+async def open_outbound_http():
+    outbound_http.start()
+
+@app.on_event("startup")
+async def build_user_search():
+    await user_search.start()
+
+@app.on_event("startup")
+async def build_leaderboards():
+    await leaderboards.start(db)
+
+@app.on_event("startup")
+async def load_player_pool():
+    await player_pool_service.load(db)
+    player_pool_service.start(db)
+    question_queue.start()
+
+@app.on_event("startup")
+async def start_round_scheduler():
+    round_scheduler.start()
+    matchmaking.start()
+    result_writer.start()
+    score_ledger.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await matchmaking.stop()
+    await leaderboards.stop()
+    await round_scheduler.stop()
+    await question_queue.stop()
+    await player_pool_service.stop()
+    await game_store.close()
+    # Bekleyen maç sonuçları bağlantı kapanmadan önce yazılır
+    await result_writer.stop()
+    await score_ledger.stop()
+    await revoked_sessions.stop()
+    await user_search.stop()
+    await outbound_http.stop()
+    password_hasher.shutdown()
     client.close()
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("server:socket_app", host="0.0.0.0", port=8001, reload=True)
+    workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+    if workers > 1 and sio_manager is None:
+        raise SystemExit("WEB_CONCURRENCY > 1 requires REDIS_URL=redis://... (shared game state + Socket.IO manager)")
+    # reload tek process ister; çoklu worker'da istemciler websocket transport'u ile
+    # bağlanmalı (polling istekleri sticky session olmadan farklı worker'a düşebilir)
+    uvicorn.run("server:socket_app", host="0.0.0.0", port=8001, reload=workers == 1, workers=workers)
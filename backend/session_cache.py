@@ -0,0 +1,73 @@
+"""
+Oturum Önbelleği - session token -> kullanıcı dokümanı (LRU + TTL)
+
+The cache lives in one process. invalidate_token() on logout only reaches
+the worker that served the logout; any other worker that cached the same
+token keeps accepting it for up to `ttl_seconds`. The server therefore
+caches opaque tokens only when it runs a single worker
+(SESSION_CACHE_OPAQUE).
+"""
+
+import copy
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set
+
+from ttl_cache import TTLCache
+
+
+class SessionCache(TTLCache):
+    """Resolved sessions keyed by token, indexed by user for invalidation"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 60.0):
+        super().__init__(max_entries, ttl_seconds)
+        # user_id -> tokens (aynı kullanıcının birden fazla oturumu olabilir)
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[dict]:
+        """Return a copy of the cached user doc, or None on miss/expiry"""
+        user_doc = super().get(token)
+        # Handler'lar dokümanı yerinde değiştirebiliyor, önbelleği korumak için kopyala
+        return copy.deepcopy(user_doc) if user_doc is not None else None
+
+    def put(self, token: str, user_doc: dict, session_expires_at: Optional[datetime] = None):
+        """Cache a resolved user; the entry never outlives the session itself"""
+        ttl = self.ttl_seconds
+        if session_expires_at is not None:
+            if session_expires_at.tzinfo is None:
+                session_expires_at = session_expires_at.replace(tzinfo=timezone.utc)
+            remaining = (session_expires_at - datetime.now(timezone.utc)).total_seconds()
+            ttl = min(ttl, remaining)
+        if ttl <= 0:
+            return
+
+        # Önce eski kaydı (belki başka kullanıcıya ait) indeksle birlikte at
+        self.pop(token)
+        self._tokens_by_user.setdefault(user_doc["user_id"], set()).add(token)
+        super().put(token, copy.deepcopy(user_doc), ttl)
+
+    def invalidate_token(self, token: str):
+        """Drop a single session (logout)"""
+        if self.pop(token) is not None:
+            self.invalidations += 1
+
+    def invalidate_user(self, user_id: str):
+        """Drop every cached session of a user after their document changed"""
+        for token in list(self._tokens_by_user.get(user_id, ())):
+            self.pop(token)
+            self.invalidations += 1
+
+    def clear(self):
+        super().clear()
+        self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        return {**super().stats(), "invalidations": self.invalidations}
+
+    def _discarded(self, token: str, user_doc: dict):
+        user_id = user_doc.get("user_id")
+        tokens = self._tokens_by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user_id]
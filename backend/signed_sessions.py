@@ -0,0 +1,220 @@
+"""
+İmzalı Oturumlar - user_id + son kullanma taşıyan, HMAC ile imzalı token'lar
+
+    v1.<kid>.<payload>.<signature>      (base64url, payload = compact JSON)
+
+A token is checked with no I/O: known key id, HMAC-SHA256 signature,
+expiry, and the in-memory revocation list. SESSION_SIGNING_KEYS holds
+"kid:secret" pairs, comma separated; the first one signs, the rest are
+still accepted, so keys rotate by prepending a new pair and dropping the
+oldest after the session lifetime.
+
+Logout revokes one token (by its jti) and a password reset revokes every
+token a user was issued before it. Revocations are written to
+`revoked_sessions` (TTL-indexed on the token expiry) and each worker
+polls that collection, so a logout on one worker reaches the others
+within `sync_interval`.
+
+Token times come from the clock of the worker that issued them, while a
+password reset's "not before" comes from the resetting worker's clock.
+revoke_user() moves "not before" `clock_skew` into the future, so tokens
+issued just before the reset by a worker whose clock runs up to that
+much ahead are revoked too. The price is that a login within
+`clock_skew` after the reset is rejected and has to be repeated; workers
+whose clocks differ by more than `clock_skew` (no NTP) can let a
+pre-reset token survive. Expiry is checked against the local clock and
+is off by the same skew, which is harmless at session lifetimes.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PREFIX = "v1."
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def load_signing_keys(spec: Optional[str]) -> Tuple[Optional[str], Dict[str, bytes]]:
+    """"kid1:secret1,kid0:secret0" -> (signing kid, {kid: secret}); (None, {}) if unset"""
+    keys: Dict[str, bytes] = {}
+    active = None
+    for pair in (spec or "").split(","):
+        pair = pair.strip()
+        if not pair:
+            continue
+        kid, sep, secret = pair.partition(":")
+        if not sep or not kid or "." in kid or len(secret) < 16:
+            raise ValueError(f"Invalid signing key entry for kid {kid!r} (need kid:secret, secret >= 16 chars)")
+        keys[kid] = secret.encode("utf-8")
+        if active is None:
+            active = kid
+    return active, keys
+
+
+class SessionClaims(NamedTuple):
+    user_id: str
+    jti: str
+    issued_ms: int
+    expires_at: datetime
+
+
+class SessionSigner:
+    """Issues and verifies signed session tokens"""
+
+    def __init__(self, keys: Dict[str, bytes], active_kid: str, ttl: timedelta = timedelta(days=7)):
+        if active_kid not in keys:
+            raise ValueError("Active signing key is not in the key set")
+        self.keys = keys
+        self.active_kid = active_kid
+        self.ttl = ttl
+
+    @staticmethod
+    def is_signed(token: str) -> bool:
+        return token.startswith(TOKEN_PREFIX)
+
+    def _signature(self, kid: str, signed_part: str) -> bytes:
+        return hmac.new(self.keys[kid], signed_part.encode("ascii"), hashlib.sha256).digest()
+
+    def issue(self, user_id: str) -> Tuple[str, SessionClaims]:
+        now_ms = int(time.time() * 1000)
+        expires = now_ms // 1000 + int(self.ttl.total_seconds())
+        claims = SessionClaims(user_id, secrets.token_hex(8), now_ms, datetime.fromtimestamp(expires, timezone.utc))
+        payload = json.dumps(
+            {"u": user_id, "j": claims.jti, "i": now_ms, "e": expires},
+            separators=(",", ":")
+        )
+        signed_part = f"{TOKEN_PREFIX}{self.active_kid}.{_b64encode(payload.encode('utf-8'))}"
+        return f"{signed_part}.{_b64encode(self._signature(self.active_kid, signed_part))}", claims
+
+    def verify(self, token: str) -> Optional[SessionClaims]:
+        """Claims of a well-signed, unexpired token; None otherwise (revocation not checked)"""
+        try:
+            signed_part, _, signature = token.rpartition(".")
+            _, kid, payload = signed_part.split(".")
+            if kid not in self.keys:
+                return None
+            if not hmac.compare_digest(_b64decode(signature), self._signature(kid, signed_part)):
+                return None
+            data = json.loads(_b64decode(payload))
+            expires_at = datetime.fromtimestamp(data["e"], timezone.utc)
+            if expires_at <= datetime.now(timezone.utc):
+                return None
+            return SessionClaims(data["u"], data["j"], data["i"], expires_at)
+        except (ValueError, KeyError, TypeError):
+            return None
+
+
+class RevocationList:
+    """Revoked jtis and per-user "not before" times, mirrored from Mongo"""
+
+    def __init__(self, collection, sync_interval: float = 5.0, clock_skew: timedelta = timedelta(seconds=2)):
+        self.collection = collection
+        self.sync_interval = sync_interval
+        self.clock_skew = clock_skew
+        # jti -> token'ın son kullanma zamanı (sonrası listede tutulmaz)
+        self._tokens: Dict[str, datetime] = {}
+        # user_id -> (bu ms'den önce verilen token'lar geçersiz, kaydın bitişi)
+        self._users: Dict[str, Tuple[int, datetime]] = {}
+        self._synced_until: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self.syncs = 0
+
+    def is_revoked(self, claims: SessionClaims) -> bool:
+        if claims.jti in self._tokens:
+            return True
+        user = self._users.get(claims.user_id)
+        return user is not None and claims.issued_ms < user[0]
+
+    def _apply(self, doc: dict):
+        expires_at = doc["expires_at"]
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if doc.get("jti"):
+            self._tokens[doc["jti"]] = expires_at
+        else:
+            not_before = doc["not_before_ms"]
+            current = self._users.get(doc["user_id"])
+            if current is None or current[0] < not_before:
+                self._users[doc["user_id"]] = (not_before, expires_at)
+
+    async def revoke_token(self, claims: SessionClaims):
+        doc = {
+            "jti": claims.jti,
+            "user_id": claims.user_id,
+            "expires_at": claims.expires_at,
+            "created_at": datetime.now(timezone.utc),
+        }
+        self._apply(doc)
+        await self.collection.insert_one(doc)
+
+    async def revoke_user(self, user_id: str, ttl: timedelta):
+        """Invalidate every token issued to the user until now (plus clock_skew)"""
+        now = datetime.now(timezone.utc)
+        doc = {
+            "user_id": user_id,
+            # Saati biraz ileride olan worker'ların az önce verdiği token'lar da kapsansın
+            "not_before_ms": int(time.time() * 1000) + int(self.clock_skew.total_seconds() * 1000),
+            # Bu süreden sonra önceki token'ların hepsi zaten dolmuş olur
+            "expires_at": now + ttl,
+            "created_at": now,
+        }
+        self._apply(doc)
+        await self.collection.insert_one(doc)
+
+    def _purge(self):
+        now = datetime.now(timezone.utc)
+        self._tokens = {jti: exp for jti, exp in self._tokens.items() if exp > now}
+        self._users = {uid: entry for uid, entry in self._users.items() if entry[1] > now}
+
+    async def sync(self):
+        now = datetime.now(timezone.utc)
+        query = {"expires_at": {"$gt": now}}
+        if self._synced_until is not None:
+            # Worker saatleri arasındaki küçük farklar için biraz geriden başla
+            query["created_at"] = {"$gt": self._synced_until - timedelta(seconds=self.sync_interval * 2)}
+        async for doc in self.collection.find(query, {"_id": 0}):
+            self._apply(doc)
+        self._synced_until = now
+        self._purge()
+        self.syncs += 1
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error("Revocation sync failed: %s", e)
+
+    async def start(self):
+        if self._task is None:
+            await self.sync()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "revoked_tokens": len(self._tokens),
+            "revoked_users": len(self._users),
+            "syncs": self.syncs,
+        }
@@ -0,0 +1,105 @@
+"""
+Socket Kayıt Defteri - sid <-> user_id <-> oda / kuyruk eşlemeleri
+
+Maintained by the matchmaking and room handlers so that disconnect, leave
+and lookups are O(1) instead of scanning every queue and room.
+"""
+
+from typing import Dict, Optional, Set
+
+
+class SocketRegistry:
+    """Bidirectional index of connected sockets, queues and rooms"""
+
+    def __init__(self):
+        self._user_by_sid: Dict[str, str] = {}
+        self._sid_by_user: Dict[str, str] = {}
+        self._queue_by_sid: Dict[str, str] = {}
+        self._room_by_sid: Dict[str, str] = {}
+        self._sids_by_room: Dict[str, Set[str]] = {}
+        self._code_by_sid: Dict[str, str] = {}
+
+    # ---- kullanıcı ----
+
+    def bind(self, sid: str, user_id: str):
+        if not user_id:
+            return
+        previous = self._user_by_sid.get(sid)
+        if previous and previous != user_id and self._sid_by_user.get(previous) == sid:
+            del self._sid_by_user[previous]
+        self._user_by_sid[sid] = user_id
+        self._sid_by_user[user_id] = sid
+
+    def user_of(self, sid: str) -> Optional[str]:
+        return self._user_by_sid.get(sid)
+
+    def sid_of(self, user_id: str) -> Optional[str]:
+        return self._sid_by_user.get(user_id)
+
+    # ---- matchmaking kuyruğu ----
+
+    def enqueue(self, sid: str, game_mode: str):
+        self._queue_by_sid[sid] = game_mode
+
+    def dequeue(self, sid: str) -> Optional[str]:
+        return self._queue_by_sid.pop(sid, None)
+
+    def queue_of(self, sid: str) -> Optional[str]:
+        return self._queue_by_sid.get(sid)
+
+    # ---- odalar ----
+
+    def join_room(self, sid: str, room_id: str):
+        self.leave_room(sid)
+        self._room_by_sid[sid] = room_id
+        self._sids_by_room.setdefault(room_id, set()).add(sid)
+
+    def leave_room(self, sid: str) -> Optional[str]:
+        room_id = self._room_by_sid.pop(sid, None)
+        if room_id is not None:
+            sids = self._sids_by_room.get(room_id)
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    del self._sids_by_room[room_id]
+        return room_id
+
+    def room_of(self, sid: str) -> Optional[str]:
+        return self._room_by_sid.get(sid)
+
+    def close_room(self, room_id: str) -> Set[str]:
+        sids = self._sids_by_room.pop(room_id, set())
+        for sid in sids:
+            self._room_by_sid.pop(sid, None)
+        return sids
+
+    # ---- özel oda kodları ----
+
+    def host_private_room(self, sid: str, room_code: str):
+        self._code_by_sid[sid] = room_code
+
+    def release_private_room(self, sid: str) -> Optional[str]:
+        return self._code_by_sid.pop(sid, None)
+
+    # ---- bağlantı kopması ----
+
+    def drop(self, sid: str) -> dict:
+        """Forget a socket entirely and report what it was attached to"""
+        user_id = self._user_by_sid.pop(sid, None)
+        if user_id is not None and self._sid_by_user.get(user_id) == sid:
+            del self._sid_by_user[user_id]
+        return {
+            "user_id": user_id,
+            "queue_mode": self.dequeue(sid),
+            "room_id": self.leave_room(sid),
+            "private_code": self.release_private_room(sid),
+        }
+
+    def gauges(self) -> dict:
+        return {
+            "connected_users": len(self._sid_by_user),
+            "queued_users": len(self._queue_by_sid),
+            "in_game_users": len(self._room_by_sid),
+            "rooms": len(self._sids_by_room),
+            "open_private_rooms": len(self._code_by_sid),
+        }
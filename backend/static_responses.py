@@ -0,0 +1,58 @@
+"""
+Sabit Yanıtlar - değişmeyen JSON'ları bir kez serileştirip ETag ile sunar
+
+Leagues, badges, game modes, the joker shop, ... never change while the
+process runs. Each one is encoded once (same bytes FastAPI's JSONResponse
+would produce) and hashed into a strong ETag; a client that sends the tag
+back in If-None-Match gets an empty 304.
+"""
+
+import hashlib
+import json
+from typing import Any, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match zayıf karşılaştırma kullanır: W/"x" ile "x" eşleşir
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+class StaticResponse:
+    """Pre-serialized JSON body with a strong ETag and Cache-Control"""
+
+    def __init__(self, content: Any, max_age: int = 300):
+        self.body = json.dumps(
+            content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+        self.headers = {
+            "ETag": self.etag,
+            # Süre dolunca istemci ETag ile tekrar sorar, değişmediyse 304 alır
+            "Cache-Control": f"public, max-age={max_age}",
+        }
+        self.hits = 0
+        self.not_modified = 0
+
+    def respond(self, request: Request) -> Response:
+        self.hits += 1
+        if _etag_matches(request.headers.get("if-none-match"), self.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=self.headers)
+        return Response(content=self.body, media_type="application/json", headers=self.headers)
+
+    def stats(self) -> dict:
+        return {"bytes": len(self.body), "hits": self.hits, "not_modified": self.not_modified}
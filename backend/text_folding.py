@@ -0,0 +1,164 @@
+"""
+Metin Katlama - aksan / büyük-küçük harf duyarsız karşılaştırma için normalizasyon
+
+fold("Martin Ødegaard") == fold("martin odegaard") == "martin odegaard".
+Combining marks are stripped after NFKD; letters that do not decompose
+(ø, ß, ı, ł, æ, ...) are mapped explicitly. Punctuation and hyphens
+become single spaces, so "Saint-Étienne" folds to "saint etienne".
+
+DeleteIndex finds folded keys within a small edit distance of a query
+from precomputed deletions (SymSpell style); only the keys sharing a
+deletion with the query are checked with a banded edit distance.
+trigrams() feeds the substring index of user search.
+"""
+
+import unicodedata
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Tuple
+
+# NFKD ile ayrışmayan harfler
+_SPECIAL = str.maketrans({
+    "ø": "o", "Ø": "o", "ß": "ss", "ı": "i", "ł": "l", "Ł": "l", "đ": "d", "Đ": "d",
+    "ð": "d", "Ð": "d", "þ": "th", "Þ": "th", "æ": "ae", "Æ": "ae", "œ": "oe", "Œ": "oe",
+})
+
+
+@lru_cache(maxsize=65536)
+def fold(text: str) -> str:
+    """Lowercase ASCII-ish form: no accents, words separated by single spaces"""
+    decomposed = unicodedata.normalize("NFKD", text.translate(_SPECIAL))
+    chars = []
+    for ch in decomposed:
+        if unicodedata.combining(ch):
+            continue
+        chars.append(ch if ch.isalnum() else " ")
+    return " ".join("".join(chars).casefold().split())
+
+
+def trigrams(folded: str) -> FrozenSet[str]:
+    """Padded character trigrams ("  a", " ab", "abc", ..., "yz ")"""
+    padded = "  " + folded + " "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _small_distance(a: str, b: str, limit: int) -> int:
+    # Ortak önek / sonek atılır, ilk farklı karakterde 4 olası düzenleme denenir.
+    # limit <= 2 iken en fazla ~20 çağrı; tam DP tablosundan çok daha hızlı
+    start = 0
+    end_a, end_b = len(a), len(b)
+    while start < end_a and start < end_b and a[start] == b[start]:
+        start += 1
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if not a or not b:
+        distance = len(a) or len(b)
+        return distance if distance <= limit else limit + 1
+    if limit == 0:
+        return 1
+    options = [(a[1:], b[1:]), (a[1:], b), (a, b[1:])]
+    if len(a) > 1 and len(b) > 1 and a[0] == b[1] and a[1] == b[0]:
+        options.insert(0, (a[2:], b[2:]))
+    best = limit + 1
+    for rest_a, rest_b in options:
+        # Bulunandan iyisi aranır; 1 (tek düzenleme) daha iyilenemez
+        best = min(best, 1 + _small_distance(rest_a, rest_b, best - 2))
+        if best == 1:
+            break
+    return best
+
+
+def bounded_distance(a: str, b: str, limit: int) -> int:
+    """Edit distance with adjacent transpositions (OSA), or limit + 1 if above limit"""
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if limit <= 2:
+        return _small_distance(a, b, limit)
+    la, lb = len(a), len(b)
+    if abs(la - lb) > limit:
+        return limit + 1
+    if la > lb:
+        a, b, la, lb = b, a, lb, la
+    over = limit + 1
+    previous2 = None
+    previous = list(range(lb + 1))
+    for i in range(1, la + 1):
+        current = [i] + [over] * lb
+        # Yalnızca köşegen çevresindeki bant hesaplanır
+        low = max(1, i - limit)
+        high = min(lb, i + limit)
+        row_min = current[0] if low == 1 else over
+        ca = a[i - 1]
+        for j in range(low, high + 1):
+            cb = b[j - 1]
+            cost = 0 if ca == cb else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return over
+        previous2, previous = previous, current
+    return previous[lb] if previous[lb] <= limit else over
+
+
+def deletes(key: str, max_distance: int) -> set:
+    """`key` and every string reachable from it by up to max_distance deletions"""
+    found = {key}
+    frontier = {key}
+    for _ in range(max_distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        found |= frontier
+    return found
+
+
+class DeleteIndex:
+    """Folded keys with typo-tolerant lookup over precomputed deletions (SymSpell)
+
+    Two strings within edit distance d share a string reachable from each
+    by at most d deletions, so a lookup generates the query's deletions,
+    collects the keys filed under any of them and checks only those with
+    the banded edit distance. The cost depends on the query length and how
+    crowded its deletion neighbourhood is, not on the number of keys.
+    """
+
+    def __init__(self, max_distance: int = 2):
+        self.max_distance = max_distance
+        self._keys: set = set()
+        # silme sonucu -> onu üreten anahtarlar
+        self._deletes: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def add(self, key: str):
+        """`key` must already be folded"""
+        if key in self._keys:
+            return
+        self._keys.add(key)
+        for variant in deletes(key, self.max_distance):
+            self._deletes.setdefault(variant, []).append(key)
+
+    def search(self, key: str, max_distance: int) -> List[Tuple[int, str]]:
+        """(distance, key) for keys within max_distance, closest first"""
+        max_distance = min(max_distance, self.max_distance)
+        if max_distance == 0:
+            return [(0, key)] if key in self._keys else []
+        candidates = set()
+        for variant in deletes(key, max_distance):
+            candidates.update(self._deletes.get(variant, ()))
+        found = []
+        for candidate in candidates:
+            distance = bounded_distance(key, candidate, max_distance)
+            if distance <= max_distance:
+                found.append((distance, candidate))
+        found.sort()
+        return found
@@ -0,0 +1,83 @@
+"""
+LRU/TTL Önbellek - süreç içi, boyutu sınırlı anahtar -> değer önbelleği
+
+Shared base of the session and profile-card caches. Entries expire after
+`ttl_seconds` and the least recently used entry is evicted once
+`max_entries` is exceeded.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after a TTL"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at_monotonic, value)
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key, now: Optional[float] = None):
+        """Return the cached value, or None on miss/expiry"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= (time.monotonic() if now is None else now):
+            self.pop(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value, ttl: Optional[float] = None, now: Optional[float] = None):
+        """Store a value for `ttl` seconds (default ttl_seconds); ttl <= 0 stores nothing"""
+        ttl = self.ttl_seconds if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        self.pop(key)
+        self._entries[key] = ((time.monotonic() if now is None else now) + ttl, value)
+        while len(self._entries) > self.max_entries:
+            self.pop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def pop(self, key):
+        """Remove an entry and return its value (None if absent)"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self._discarded(key, entry[1])
+        return entry[1]
+
+    def _discarded(self, key, value):
+        # Alt sınıflar ikincil indekslerini burada günceller
+        pass
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
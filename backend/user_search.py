@@ -0,0 +1,343 @@
+"""
+Kullanıcı Arama - /users/search için katlanmış kullanıcı adı anahtarları + trigram indeksi
+
+search_users ran an unanchored case-insensitive $regex over
+users.username, a full collection scan on every keystroke. Now every
+user document carries `username_key`, the accent-folded, lowercased
+username without spaces ("Ayşe_K" -> "aysek"). Results come in four
+tiers, each ordered by (key, user_id):
+
+    exact   username_key == query           Mongo, (username_key, user_id) index
+    prefix  username_key starts with query  Mongo, anchored regex on the same index
+    infix   query appears inside the key    in-memory trigram postings
+    fuzzy   key one typo away from query    in-memory key dict
+
+A fuzzy lookup generates the query's one-edit neighbours (substitution,
+insertion, deletion, adjacent swap) and probes the key dict with each, so
+its cost depends on the query length only, not on the number of users.
+
+Pages are cut with an opaque cursor holding the last (tier, key, user_id),
+so no page ever skips or repeats a user and no offset is
+scanned. The in-memory index holds every user's key. Posting lists are
+sorted, so an infix page walks one list from the cursor. It is built at
+startup, which also backfills missing username_key fields. After that it
+is updated locally on username writes and by polling
+`username_updated_at` for writes made by other workers.
+
+Until that poll, a user renamed on another worker has its new key in
+Mongo and its old key in memory. The exact / prefix tiers therefore fix
+up the in-memory key of every user they return before the memory tiers
+run, so the same user cannot also come back from infix / fuzzy under
+the old key. A renamed user that the query only reaches through the old
+key still matches under that key until the next refresh.
+"""
+
+import asyncio
+import base64
+import bisect
+import json
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from text_folding import fold, trigrams
+
+logger = logging.getLogger(__name__)
+
+TIERS = ("exact", "prefix", "infix", "fuzzy")
+EXACT, PREFIX, INFIX, FUZZY = range(len(TIERS))
+
+# Sıralama anahtarı; imleç de bundan oluşur
+START = (EXACT, "", "")
+
+
+def username_key(username: Optional[str]) -> str:
+    """Folded search key: "Ayşe K" -> "aysek" """
+    return fold(username or "").replace(" ", "")
+
+
+def username_fields(username: str) -> dict:
+    """Fields to $set together with `username`"""
+    return {"username_key": username_key(username), "username_updated_at": datetime.now(timezone.utc)}
+
+
+# Daha kısa sorgularda tek harf farkı neredeyse her şeyle eşleşir
+FUZZY_MIN_LENGTH = 4
+
+
+def one_edit_neighbors(key: str, alphabet: str) -> set:
+    """Every string one substitution, insertion, deletion or adjacent swap away"""
+    splits = [(key[:i], key[i:]) for i in range(len(key) + 1)]
+    neighbors = {left + right[1:] for left, right in splits if right}
+    neighbors.update(left + right[1] + right[0] + right[2:] for left, right in splits if len(right) > 1)
+    for ch in alphabet:
+        neighbors.update(left + ch + right[1:] for left, right in splits if right)
+        neighbors.update(left + ch + right for left, right in splits)
+    neighbors.discard(key)
+    return neighbors
+
+
+def encode_cursor(rank: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(rank, separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: Optional[str]) -> tuple:
+    """ValueError for anything that is not a cursor we issued"""
+    if not cursor:
+        return START
+    try:
+        tier, key, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if tier not in range(len(TIERS)) or not isinstance(key, str) or not isinstance(user_id, str):
+        raise ValueError("Invalid cursor")
+    return (tier, key, user_id)
+
+
+class SearchHit(NamedTuple):
+    match: str
+    user_id: str
+
+
+class UsernameIndex:
+    """Folded username keys -> user ids, with sorted trigram postings"""
+
+    def __init__(self):
+        self._users_by_key: Dict[str, List[str]] = {}
+        self._key_by_user: Dict[str, str] = {}
+        # trigram -> o trigramı içeren anahtarlar (sıralı)
+        self._postings: Dict[str, List[str]] = {}
+        # Anahtarlarda geçen karakterler (fuzzy komşuları bunlarla üretilir)
+        self._alphabet: set = set()
+        self._alphabet_text = ""
+
+    def __len__(self) -> int:
+        return len(self._key_by_user)
+
+    def load(self, users):
+        """Bulk build from (user_id, username) pairs; postings are sorted once at the end"""
+        for user_id, username in users:
+            key = username_key(username)
+            if not key:
+                continue
+            self._key_by_user[user_id] = key
+            owners = self._users_by_key.get(key)
+            if owners is None:
+                self._users_by_key[key] = [user_id]
+                self._alphabet.update(key)
+                for gram in trigrams(key):
+                    self._postings.setdefault(gram, []).append(key)
+            else:
+                owners.append(user_id)
+        self._alphabet_text = "".join(sorted(self._alphabet))
+        for owners in self._users_by_key.values():
+            owners.sort()
+        for posting in self._postings.values():
+            posting.sort()
+
+    def put(self, user_id: str, username: Optional[str]):
+        self.put_key(user_id, username_key(username))
+
+    def put_key(self, user_id: str, key: str):
+        old = self._key_by_user.get(user_id)
+        if old == key:
+            return
+        if old is not None:
+            self._remove(user_id, old)
+        if key:
+            self._key_by_user[user_id] = key
+            owners = self._users_by_key.get(key)
+            if owners is None:
+                self._users_by_key[key] = [user_id]
+                if not self._alphabet.issuperset(key):
+                    self._alphabet.update(key)
+                    self._alphabet_text = "".join(sorted(self._alphabet))
+                for gram in trigrams(key):
+                    bisect.insort(self._postings.setdefault(gram, []), key)
+            else:
+                bisect.insort(owners, user_id)
+
+    def key_of(self, user_id: str) -> Optional[str]:
+        return self._key_by_user.get(user_id)
+
+    def _remove(self, user_id: str, key: str):
+        del self._key_by_user[user_id]
+        owners = self._users_by_key[key]
+        owners.remove(user_id)
+        if owners:
+            return
+        del self._users_by_key[key]
+        for gram in trigrams(key):
+            posting = self._postings[gram]
+            del posting[bisect.bisect_left(posting, key)]
+            if not posting:
+                del self._postings[gram]
+
+    def _ranked(self, tier: int, key: str, after: tuple, exclude: Optional[str]):
+        for user_id in self._users_by_key[key]:
+            rank = (tier, key, user_id)
+            if rank > after and user_id != exclude:
+                yield rank
+
+    def infix(self, query: str, after: tuple, exclude: Optional[str], limit: int) -> List[tuple]:
+        """Keys containing the query (not at the start), in key order after `after`"""
+        if len(query) < 3:
+            return []
+        posting = min((self._postings.get(query[i:i + 3], ()) for i in range(len(query) - 2)), key=len)
+        start = bisect.bisect_left(posting, after[1]) if after[0] == INFIX else 0
+        found = []
+        # En kısa liste sırayla yürünür; sayfa dolunca durulur (dilimleme listeyi kopyalardı)
+        for i in range(start, len(posting)):
+            key = posting[i]
+            if query in key and not key.startswith(query):
+                found.extend(self._ranked(INFIX, key, after, exclude))
+                if len(found) >= limit:
+                    break
+        return found[:limit]
+
+    def fuzzy(self, query: str, after: tuple, exclude: Optional[str], limit: int) -> List[tuple]:
+        """Keys one edit away that do not contain the query, in key order after `after`"""
+        if len(query) < FUZZY_MIN_LENGTH:
+            return []
+        found = []
+        for key in one_edit_neighbors(query, self._alphabet_text):
+            # Sorguyu içerenler zaten önek / infix katmanında
+            if key in self._users_by_key and query not in key:
+                found.extend(self._ranked(FUZZY, key, after, exclude))
+        found.sort()
+        return found[:limit]
+
+    def stats(self) -> dict:
+        return {"users": len(self._key_by_user), "keys": len(self._users_by_key), "trigrams": len(self._postings)}
+
+
+class UserSearch:
+    """Ranked, cursor-paginated username search"""
+
+    def __init__(self, collection, refresh_interval: float = 10.0):
+        self.collection = collection
+        self.refresh_interval = refresh_interval
+        self.index = UsernameIndex()
+        self._synced_until: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self.searches = 0
+        self.backfilled = 0
+
+    async def _mongo_tier(self, tier: int, query: str, after: tuple, exclude: Optional[str], limit: int):
+        conditions = [{"user_id": {"$ne": exclude}}]
+        if tier == EXACT:
+            conditions.append({"username_key": query})
+        else:
+            # Çapalı, büyük-küçük harf duyarlı regex index üzerinde aralık taraması olur
+            conditions.append({"username_key": {"$regex": "^" + re.escape(query), "$gt": query}})
+        if after[0] == tier:
+            conditions.append({"$or": [
+                {"username_key": {"$gt": after[1]}},
+                {"username_key": after[1], "user_id": {"$gt": after[2]}}
+            ]})
+        docs = await self.collection.find(
+            {"$and": conditions}, {"_id": 0, "username_key": 1, "user_id": 1}
+        ).sort([("username_key", 1), ("user_id", 1)]).limit(limit).to_list(limit)
+        for doc in docs:
+            # Başka worker'da değişmiş ad: bellek katmanları eski anahtarla tekrar bulmasın
+            if self.index.key_of(doc["user_id"]) != doc["username_key"]:
+                self.index.put_key(doc["user_id"], doc["username_key"])
+        return [(tier, doc["username_key"], doc["user_id"]) for doc in docs]
+
+    async def search(
+        self, text: str, exclude: Optional[str] = None, limit: int = 20, cursor: Optional[str] = None
+    ) -> Tuple[List[SearchHit], Optional[str]]:
+        """One page of hits and the cursor of the next page (None on the last page)"""
+        after = decode_cursor(cursor)
+        query = username_key(text)
+        self.searches += 1
+        if not query:
+            return [], None
+
+        # Bir fazlası, sonraki sayfanın olup olmadığını söyler
+        wanted = limit + 1
+        ranks: List[tuple] = []
+        for tier in range(after[0], len(TIERS)):
+            missing = wanted - len(ranks)
+            if tier in (EXACT, PREFIX):
+                ranks += await self._mongo_tier(tier, query, after, exclude, missing)
+            elif tier == INFIX:
+                ranks += self.index.infix(query, after, exclude, missing)
+            else:
+                ranks += self.index.fuzzy(query, after, exclude, missing)
+            if len(ranks) >= wanted:
+                break
+
+        page = ranks[:limit]
+        next_cursor = encode_cursor(page[-1]) if len(ranks) > limit else None
+        return [SearchHit(TIERS[rank[0]], rank[2]) for rank in page], next_cursor
+
+    def updated(self, user_id: str, username: Optional[str]):
+        """Apply a username write made by this worker right away"""
+        self.index.put(user_id, username)
+
+    async def build(self):
+        """Load every username; write username_key where it is missing or stale"""
+        started = datetime.now(timezone.utc)
+        users = []
+        fixes = []
+        async for doc in self.collection.find({}, {"_id": 0, "user_id": 1, "username": 1, "username_key": 1}):
+            users.append((doc["user_id"], doc.get("username")))
+            key = username_key(doc.get("username"))
+            if doc.get("username_key") != key:
+                fixes.append(UpdateOne({"user_id": doc["user_id"]}, {"$set": {"username_key": key}}))
+            if len(fixes) >= 1000:
+                await self.collection.bulk_write(fixes, ordered=False)
+                self.backfilled += len(fixes)
+                fixes = []
+        if fixes:
+            await self.collection.bulk_write(fixes, ordered=False)
+            self.backfilled += len(fixes)
+
+        index = UsernameIndex()
+        index.load(users)
+        self.index = index
+        self._synced_until = started
+        logger.info("User search index built: %d users, %d keys backfilled", len(index), self.backfilled)
+
+    async def refresh(self):
+        """Pick up username changes made by other workers"""
+        if self._synced_until is None:
+            # Başlangıçtaki kurulum başarısız olduysa baştan kur
+            await self.build()
+            return
+        now = datetime.now(timezone.utc)
+        # Worker saatleri arasındaki küçük farklar için biraz geriden başla
+        since = self._synced_until - timedelta(seconds=self.refresh_interval * 2)
+        async for doc in self.collection.find(
+            {"username_updated_at": {"$gt": since}}, {"_id": 0, "user_id": 1, "username": 1}
+        ):
+            self.index.put(doc["user_id"], doc.get("username"))
+        self._synced_until = now
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("User search refresh failed: %s", e)
+
+    async def start(self):
+        if self._task is None:
+            try:
+                await self.build()
+            except Exception as e:
+                logger.error("User search index build failed, retrying in background: %s", e)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {**self.index.stats(), "searches": self.searches, "backfilled": self.backfilled}
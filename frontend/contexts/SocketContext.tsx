@@ -1,6 +1,8 @@
 import React, { createContext, useContext, useEffect, useState } from 'react';
 import { io, Socket } from 'socket.io-client';
 import Constants from 'expo-constants';
+import { api } from '../services/api';
+import { useAuth } from './AuthContext';
 
 interface SocketContextType {
   socket: Socket | null;
@@ -13,6 +15,8 @@ interface SocketContextType {
 const SocketContext = createContext<SocketContextType | undefined>(undefined);
 
 export const SocketProvider: React.FC<{ children: React.ReactNode }> = ({ children }) => {
+  const { user } = useAuth();
+  const userId = user?.user_id;
   const [socket, setSocket] = useState<Socket | null>(null);
   const [connected, setConnected] = useState(false);
   const [matchFound, setMatchFound] = useState<{ room_id: string; opponent: string } | null>(null);
@@ -26,6 +30,12 @@ export const SocketProvider: React.FC<{ children: React.ReactNode }> = ({ childr
         transports: ['websocket', 'polling'],
         reconnection: true,
         reconnectionAttempts: 3,
+        // Session token is read on every (re)connect; the server binds the
+        // socket to that user. Without a token the socket joins as a guest,
+        // which the server rejects once SOCKET_AUTH_MODE=required.
+        auth: (cb) => {
+          api.getToken().then((token) => cb(token ? { token } : {}), () => cb({}));
+        },
       });
 
       socketInstance.on('connect', () => {
@@ -55,11 +65,12 @@ export const SocketProvider: React.FC<{ children: React.ReactNode }> = ({ childr
     } catch (error) {
       console.log('Socket connection failed, bot mode only');
     }
-  }, []);
+  }, [userId]);
 
   const joinMatchmaking = (gameMode: string) => {
     if (socket) {
-      socket.emit('join_matchmaking', { game_mode: gameMode, user_id: 'guest_' + Date.now() });
+      // The server identifies the socket (session user or a guest_<sid> id)
+      socket.emit('join_matchmaking', { game_mode: gameMode });
     }
   };
 
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Backend modülleri düz import edilir (server.py ile aynı: `from game_state import ...`)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
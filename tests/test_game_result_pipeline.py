@@ -0,0 +1,228 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from game_systems import (
+    GAME_MODES, calculate_game_rewards, game_result_pipeline, get_league_for_elo
+)
+
+
+def time_bonus_for(time_taken: float) -> float:
+    if time_taken < 5:
+        return 1.5
+    if time_taken < 10:
+        return 1.25
+    if time_taken < 15:
+        return 1.1
+    return 1.0
+
+
+def elo_change_for(result) -> int:
+    config = GAME_MODES.get(result.game_mode, GAME_MODES["career_path"])
+    return config["elo_gain"] if result.won else -config["elo_loss"]
+
+
+def previous_update(user: dict, result, time_bonus: float, elo_change: int) -> dict:
+    """The read-modify-$set rules submit-result used before the pipeline"""
+    current_elo = user.get("elo", 1000)
+    current_streak = user.get("win_streak", 0) if result.won else 0
+    new_streak = current_streak + 1 if result.won else 0
+    rewards = calculate_game_rewards(
+        won=result.won, elo=current_elo, streak=new_streak,
+        time_bonus=time_bonus, perfect_game=result.perfect_game
+    )
+    new_elo = max(0, current_elo + elo_change)
+    new_league = get_league_for_elo(new_elo)
+
+    current_badges = user.get("badges", [])
+    new_badges = []
+    if result.won and "first_win" not in current_badges:
+        new_badges.append("first_win")
+    streak_bonus = rewards.get("streak_bonus")
+    if streak_bonus and "badge" in streak_bonus and streak_bonus["badge"] not in current_badges:
+        new_badges.append(streak_bonus["badge"])
+    if result.won and result.time_taken < 3 and "speed_demon" not in current_badges:
+        new_badges.append("speed_demon")
+    if result.perfect_game and "perfect_game" not in current_badges:
+        new_badges.append("perfect_game")
+    if new_league["id"] == "legend" and "legend_rank" not in current_badges:
+        new_badges.append("legend_rank")
+
+    update = {
+        "elo": new_elo,
+        "coins": user.get("coins", 0) + rewards["coins"],
+        "xp": user.get("xp", 0) + rewards["xp"],
+        "win_streak": new_streak,
+        "best_streak": max(user.get("best_streak", 0), new_streak),
+        "total_games": user.get("total_games", 0) + 1,
+    }
+    outcome = "wins" if result.won else "losses"
+    update[outcome] = user.get(outcome, 0) + 1
+
+    game_stats = {mode: dict(stats) for mode, stats in user.get("game_stats", {}).items()}
+    mode_stats = game_stats.get(result.game_mode, {"games_played": 0, "wins": 0, "high_score": 0, "total_score": 0})
+    mode_stats["games_played"] += 1
+    mode_stats["total_score"] += result.score
+    if result.won:
+        mode_stats["wins"] += 1
+    mode_stats["high_score"] = max(mode_stats["high_score"], result.score)
+    game_stats[result.game_mode] = mode_stats
+    update["game_stats"] = game_stats
+    if new_badges:
+        update["badges"] = current_badges + new_badges
+    return update
+
+
+def random_case(rng: random.Random):
+    user = {"user_id": "u1"}
+    if rng.random() < 0.8:
+        user["elo"] = rng.choice([0, 5, 999, 1000, 1199, 1200, 1499, 1500, 1999, 2000, 2500, 3000, rng.randint(0, 4000)])
+    for field in ("coins", "xp", "total_games", "wins", "losses", "best_streak"):
+        if rng.random() < 0.7:
+            user[field] = rng.randint(0, 500)
+    if rng.random() < 0.8:
+        user["win_streak"] = rng.choice([0, 1, 2, 4, 5, 9, 10, 19, 20, rng.randint(0, 40)])
+    if rng.random() < 0.6:
+        user["badges"] = rng.sample(["first_win", "speed_demon", "perfect_game", "legend_rank", "streak_3",
+                                     "streak_5", "streak_10"], rng.randint(0, 4))
+    mode = rng.choice(list(GAME_MODES) + ["unknown_mode"])
+    if rng.random() < 0.5:
+        user["game_stats"] = {mode: {"games_played": 3, "wins": 1, "high_score": rng.randint(0, 900), "total_score": 1000}}
+    result = SimpleNamespace(
+        game_mode=mode,
+        won=rng.random() < 0.5,
+        score=rng.randint(0, 1000),
+        time_taken=rng.choice([0.5, 2.9, 3, 4.99, 5, 9.5, 10, 14.9, 15, 40]),
+        perfect_game=rng.random() < 0.3,
+    )
+    return user, result
+
+
+CASES = [random_case(random.Random(seed)) for seed in range(400)]
+
+
+# ---- update pipeline'ın kullandığı ifadeler için küçük bir değerlendirici ----
+# (mongomock $filter girdisindeki dizi elemanlarını ve $unset aşamasını işlemiyor)
+
+MISSING = object()
+
+
+def get_path(doc, path: str):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return MISSING
+        doc = doc[part]
+    return doc
+
+
+def set_path(doc: dict, path: str, value):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def evaluate(expr, doc: dict, variables: dict):
+    if isinstance(expr, str):
+        if expr.startswith("$$"):
+            return variables[expr[2:]]
+        if expr.startswith("$"):
+            value = get_path(doc, expr[1:])
+            return None if value is MISSING else value
+        return expr
+    if isinstance(expr, list):
+        return [evaluate(item, doc, variables) for item in expr]
+    if not isinstance(expr, dict):
+        return expr
+    if len(expr) != 1 or not next(iter(expr)).startswith("$"):
+        return {key: evaluate(value, doc, variables) for key, value in expr.items()}
+
+    (op, arg), = expr.items()
+    if op == "$switch":
+        for branch in arg["branches"]:
+            if evaluate(branch["case"], doc, variables):
+                return evaluate(branch["then"], doc, variables)
+        return evaluate(arg["default"], doc, variables)
+    if op == "$cond":
+        condition, then, otherwise = arg
+        return evaluate(then if evaluate(condition, doc, variables) else otherwise, doc, variables)
+    if op == "$filter":
+        items = evaluate(arg["input"], doc, variables)
+        return [item for item in items if evaluate(arg["cond"], doc, {**variables, "this": item})]
+
+    values = evaluate(arg if isinstance(arg, list) else [arg], doc, variables)
+    if op == "$ifNull":
+        return values[0] if values[0] is not None else values[1]
+    if op == "$add":
+        return sum(values)
+    if op == "$multiply":
+        total = 1
+        for value in values:
+            total *= value
+        return total
+    if op == "$trunc":
+        return float(int(values[0])) if isinstance(values[0], float) else values[0]
+    if op == "$toInt":
+        return int(values[0])
+    if op == "$max":
+        return max(values)
+    if op == "$min":
+        return min(values)
+    if op == "$gte":
+        return values[0] >= values[1]
+    if op == "$lte":
+        return values[0] <= values[1]
+    if op == "$ne":
+        return values[0] != values[1]
+    if op == "$eq":
+        return values[0] == values[1]
+    if op == "$in":
+        return values[0] in values[1]
+    if op == "$not":
+        return not values[0]
+    if op == "$and":
+        return all(values)
+    if op == "$concatArrays":
+        return [item for value in values for item in value]
+    raise NotImplementedError(op)
+
+
+def run_update_pipeline(doc: dict, pipeline: list) -> dict:
+    for stage in pipeline:
+        (op, arg), = stage.items()
+        if op == "$set":
+            values = {path: evaluate(expr, doc, {}) for path, expr in arg.items()}
+            doc = {**doc}
+            for path, value in values.items():
+                set_path(doc, path, value)
+        elif op == "$unset":
+            doc = {key: value for key, value in doc.items() if key != arg}
+        else:
+            raise NotImplementedError(op)
+    return doc
+
+
+def test_evaluator_truncates_like_int():
+    expr = {"$toInt": {"$trunc": {"$multiply": ["$x", 1.5]}}}
+    assert evaluate(expr, {"x": 7}, {}) == int(7 * 1.5)
+    assert evaluate({"$ifNull": ["$missing", 3]}, {}, {}) == 3
+
+
+@pytest.mark.parametrize("user,result", CASES)
+def test_pipeline_matches_previous_rules(user, result):
+    time_bonus = time_bonus_for(result.time_taken)
+    elo_change = elo_change_for(result)
+
+    written = run_update_pipeline(
+        {**user, "game_stats": {mode: dict(stats) for mode, stats in user.get("game_stats", {}).items()}}
+        if "game_stats" in user else dict(user),
+        game_result_pipeline(result, time_bonus, elo_change)
+    )
+
+    expected = {**user, **previous_update(user, result, time_bonus, elo_change)}
+    # Pipeline rozet alanı olmayan belgeye boş liste yazar; okuyanlar zaten [] varsayıyor
+    expected.setdefault("badges", [])
+    assert written == expected
+    # int(x * factor) ile aynı tip: coin ve xp tamsayı kalır
+    assert type(written["coins"]) is int and type(written["xp"]) is int
@@ -0,0 +1,209 @@
+import asyncio
+import time
+
+from fakeredis import FakeAsyncRedis, FakeServer
+
+from game_state import InMemoryGameStore, RedisGameStore, RedisLock, create_game_store
+from matchmaking import MatchmakingService, Searcher
+
+
+def redis_stores(count: int = 2):
+    """Stores of `count` workers sharing one fake Redis server"""
+    server = FakeServer()
+    return [RedisGameStore(FakeAsyncRedis(server=server, decode_responses=True)) for _ in range(count)]
+
+
+def new_game(room_id: str = "room1") -> dict:
+    return {
+        "room_id": room_id,
+        "players": [{"sid": "sid1", "user_id": "u1", "score": 0}, {"sid": "sid2", "user_id": "u2", "score": 0}],
+        "current_question": 0,
+    }
+
+
+def test_create_game_store_fakeredis():
+    assert isinstance(create_game_store("fakeredis://"), RedisGameStore)
+    assert isinstance(create_game_store(None), InMemoryGameStore)
+
+
+def test_redis_transaction_saves_game_for_other_workers():
+    async def scenario():
+        store1, store2 = redis_stores()
+        await store1.create_game(new_game())
+        assert await store2.room_of("sid2") == "room1"
+
+        async with store1.transaction("room1") as game:
+            game["players"][0]["score"] = 10
+        async with store2.transaction("room1") as game:
+            assert game["players"][0]["score"] == 10
+            game["current_question"] = 1
+        assert (await store1.get_game("room1"))["current_question"] == 1
+
+        async with store2.transaction("missing") as game:
+            assert game is None
+        assert await store1.get_game("missing") is None
+
+    asyncio.run(scenario())
+
+
+def test_redis_transactions_serialize_concurrent_updates():
+    async def scenario():
+        store1, store2 = redis_stores()
+        await store1.create_game(new_game())
+
+        async def add_point(store):
+            async with store.transaction("room1") as game:
+                score = game["players"][0]["score"]
+                await asyncio.sleep(0.001)
+                game["players"][0]["score"] = score + 1
+
+        await asyncio.gather(*(add_point(store) for store in (store1, store2) * 10))
+        assert (await store1.get_game("room1"))["players"][0]["score"] == 20
+
+    asyncio.run(scenario())
+
+
+def test_redis_pop_game_is_single_and_not_resurrected():
+    async def scenario():
+        store1, store2 = redis_stores()
+        await store1.create_game(new_game())
+        game = await store1.get_game("room1")
+
+        popped = await asyncio.gather(store1.pop_game("room1"), store2.pop_game("room1"))
+        assert sum(result is not None for result in popped) == 1
+        assert await store1.room_of("sid1") is None
+
+        # Geç gelen bir save_game silinen oyunu geri getirmez
+        await store2.save_game(game)
+        assert await store1.get_game("room1") is None
+
+    asyncio.run(scenario())
+
+
+def test_redis_lock_release_only_by_holder():
+    async def scenario():
+        redis = FakeAsyncRedis(decode_responses=True)
+        async with RedisLock(redis, "fc:lock:room1", ttl_ms=50):
+            # TTL dolunca kilit başkasına geçer; ilk sahibin çıkışı onu silmemeli
+            await asyncio.sleep(0.1)
+            assert await redis.set("fc:lock:room1", "other", nx=True, px=5000)
+        assert await redis.get("fc:lock:room1") == "other"
+
+        await redis.delete("fc:lock:room1")
+        async with RedisLock(redis, "fc:lock:room1"):
+            assert await redis.get("fc:lock:room1") is not None
+        assert await redis.get("fc:lock:room1") is None
+
+    asyncio.run(scenario())
+
+
+def test_redis_lock_times_out():
+    async def scenario():
+        redis = FakeAsyncRedis(decode_responses=True)
+        await redis.set("fc:lock:room1", "other", px=5000)
+        try:
+            async with RedisLock(redis, "fc:lock:room1", timeout=0.05):
+                raise AssertionError("lock should not be acquired")
+        except TimeoutError:
+            pass
+
+    asyncio.run(scenario())
+
+
+def test_private_room_claimed_once():
+    async def scenario():
+        store1, store2 = redis_stores()
+        assert await store1.open_private_room("ABC123", {"host_sid": "sid1"})
+        assert not await store2.open_private_room("ABC123", {"host_sid": "sid9"})
+
+        claims = await asyncio.gather(store1.claim_private_room("ABC123"), store2.claim_private_room("ABC123"))
+        assert [claim for claim in claims if claim] == [{"host_sid": "sid1"}]
+        assert await store2.claim_private_room("ABC123") is None
+
+    asyncio.run(scenario())
+
+
+def test_shared_queue_and_claim_searchers():
+    async def scenario():
+        store1, store2 = redis_stores()
+        now = time.monotonic()
+        alice = Searcher("u1", "sid1", "alice", 1000, now)
+        bob = Searcher("u2", "sid2", "bob", 1020, now)
+
+        assert await store1.queue_searcher("classic", alice)
+        assert not await store2.queue_searcher("classic", alice)
+        assert await store2.queue_searcher("classic", bob)
+        assert await store1.queue_length("classic") == 2
+        assert await store2.queue_modes() == ["classic"]
+
+        queued = await store2.queued_searchers("classic")
+        assert abs(queued["u1"].joined_at - now) < 0.5
+
+        # Başka soketle gelen çıkış isteği kaydı silmez
+        assert not await store1.dequeue_searcher("classic", "u1", "other_sid")
+
+        # Biri kuyruktan çıktıysa eşleşme kurulmaz, diğeri geri konur
+        assert await store2.dequeue_searcher("classic", "u2", "sid2")
+        assert not await store1.claim_searchers("classic", [alice, bob])
+        assert list(await store1.queued_searchers("classic")) == ["u1"]
+
+        await store1.queue_searcher("classic", bob)
+        assert await store1.claim_searchers("classic", [alice, bob])
+        assert await store2.queue_length("classic") == 0
+
+    asyncio.run(scenario())
+
+
+def test_leader_lease_has_one_holder():
+    async def scenario():
+        store1, store2 = redis_stores()
+        assert await store1.acquire_leader("matchmaking", ttl_ms=50)
+        assert not await store2.acquire_leader("matchmaking", ttl_ms=50)
+        # Sahibi yenileyebilir
+        assert await store1.acquire_leader("matchmaking", ttl_ms=50)
+        await asyncio.sleep(0.1)
+        # Yenilenmeyen kira düşer, başka worker alır
+        assert await store2.acquire_leader("matchmaking", ttl_ms=50)
+        assert not await store1.acquire_leader("matchmaking", ttl_ms=50)
+
+    asyncio.run(scenario())
+
+
+def test_shared_matchmaking_pairs_once_across_workers():
+    async def scenario():
+        store1, store2 = redis_stores()
+        matches = []
+
+        async def on_match(game_mode, player1, player2):
+            matches.append((game_mode, {player1.user_id, player2.user_id}))
+
+        service1 = MatchmakingService(on_match, shared_queue=store1)
+        service2 = MatchmakingService(on_match, shared_queue=store2)
+        now = time.monotonic()
+        await service1.add("classic", Searcher("u1", "sid1", "alice", 1000, now))
+        await service2.add("classic", Searcher("u2", "sid2", "bob", 1010, now))
+
+        await asyncio.gather(service1.tick(), service2.tick())
+        await asyncio.gather(service1.tick(), service2.tick())
+        assert matches == [("classic", {"u1", "u2"})]
+        assert await service2.queue_length("classic") == 0
+
+    asyncio.run(scenario())
+
+
+def test_memory_lock_not_kept_for_unknown_rooms():
+    async def scenario():
+        store = InMemoryGameStore()
+        for i in range(100):
+            async with store.transaction(f"made_up_{i}") as game:
+                assert game is None
+        assert store._locks == {}
+
+        await store.create_game(new_game())
+        async with store.transaction("room1") as game:
+            assert game is not None
+        assert list(store._locks) == ["room1"]
+        await store.pop_game("room1")
+        assert store._locks == {}
+
+    asyncio.run(scenario())
@@ -0,0 +1,163 @@
+import asyncio
+import random
+
+import pytest
+from fakeredis import FakeAsyncRedis
+
+from leaderboard import (
+    InMemoryLeaderboardStore, LeaderboardService, RankedSet, RedisLeaderboardStore, board_scores
+)
+
+
+def expected_order(scores: dict) -> list:
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def test_ranked_set_matches_sorted_reference():
+    rng = random.Random(14)
+    ranked = RankedSet()
+    scores = {}
+    for _ in range(3000):
+        member = f"u{rng.randrange(300)}"
+        if rng.random() < 0.3:
+            assert ranked.remove(member) == (member in scores)
+            scores.pop(member, None)
+        else:
+            score = rng.randrange(50)
+            ranked.add(member, score)
+            scores[member] = score
+
+    order = expected_order(scores)
+    assert len(ranked) == len(scores)
+    assert ranked.range(0, len(order)) == order
+    assert ranked.range(10, 25) == order[10:25]
+    for position, (member, score) in enumerate(order, 1):
+        assert ranked.rank(member) == position
+        assert ranked.score(member) == score
+    for score in range(-1, 52):
+        assert ranked.count_above(score) == sum(1 for value in scores.values() if value > score)
+        assert ranked.count_above(score, inclusive=True) == sum(1 for value in scores.values() if value >= score)
+    assert ranked.rank("nobody") is None
+    assert ranked.range(len(order), len(order) + 5) == []
+
+
+def test_ranked_set_ties_order_by_user_id():
+    ranked = RankedSet()
+    for member in ("c", "a", "b"):
+        ranked.add(member, 10)
+    ranked.add("d", 20)
+    assert [member for member, _ in ranked.range(0, 4)] == ["d", "a", "b", "c"]
+    ranked.add("a", 5)
+    assert ranked.rank("a") == 4
+
+
+def card(user_id: str, points: int, elo: int = 0, location: str = None, high_score: int = 0) -> dict:
+    return {
+        "user_id": user_id, "username": user_id, "stats": {"points": points}, "elo": elo,
+        "location": location, "career_path_stats": {"high_score": high_score},
+    }
+
+
+def test_board_scores_skip_empty_boards():
+    assert board_scores(card("u1", 0)) == {"points": 0}
+    assert board_scores(card("u1", 5, elo=1000, location="Ankara", high_score=3)) == {
+        "points": 5, "elo": 1000, "career": 3, "location:Ankara": 5
+    }
+
+
+def new_store(backend: str):
+    if backend == "redis":
+        return RedisLeaderboardStore(FakeAsyncRedis(decode_responses=True))
+    return InMemoryLeaderboardStore()
+
+
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+def test_store_upsert_moves_location_and_ranks(backend):
+    async def scenario():
+        store = new_store(backend)
+        await store.upsert_many([card("u1", 30, location="Ankara"), card("u2", 50, location="Ankara"),
+                                 card("u3", 10, elo=1200)])
+        assert [c["user_id"] for c in await store.top("points", 10)] == ["u2", "u1", "u3"]
+        assert await store.rank("location:Ankara", "u1") == 2
+
+        await store.upsert_many([card("u1", 60, location="İzmir")])
+        assert await store.rank("points", "u1") == 1
+        assert await store.rank("location:Ankara", "u1") is None
+        assert await store.size("location:Ankara") == 1
+        assert await store.rank("location:İzmir", "u1") == 1
+        assert await store.count_above("points", 30) == 2
+        assert await store.count_above("points", 50, inclusive=True) == 2
+
+        await store.remove_many(["u2"])
+        assert [c["user_id"] for c in await store.top("points", 10)] == ["u1", "u3"]
+        assert await store.size("location:Ankara") == 0
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+def test_store_replace_all_drops_users_missing_from_source(backend):
+    async def scenario():
+        store = new_store(backend)
+        await store.upsert_many([card("u1", 30, elo=1100, location="Ankara"), card("u2", 50), card("u3", 10)])
+        await store.replace_all([card("u2", 55), card("u4", 5, elo=900)])
+
+        assert [c["user_id"] for c in await store.top("points", 10)] == ["u2", "u4"]
+        assert await store.rank("points", "u1") is None
+        assert await store.size("location:Ankara") == 0
+        assert [c["user_id"] for c in await store.top("elo", 10)] == ["u4"]
+        assert (await store.stats())["cards"] == 2
+
+        await store.replace_all([])
+        assert await store.top("points", 10) == []
+        assert (await store.stats())["cards"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_redis_replace_all_leaves_no_staging_keys():
+    async def scenario():
+        redis = FakeAsyncRedis(decode_responses=True)
+        store = RedisLeaderboardStore(redis)
+        await store.replace_all([card(f"u{i}", i, location="Ankara") for i in range(1200)])
+        keys = sorted(await redis.keys("*"))
+        assert keys == ["fc:lb:board:location:Ankara", "fc:lb:board:points", "fc:lb:cards"]
+        assert [await redis.ttl(key) for key in keys] == [-1, -1, -1]
+        assert await store.size("points") == 1200
+
+    asyncio.run(scenario())
+
+
+class FakeUsers:
+    def __init__(self, docs):
+        self.docs = {doc["user_id"]: doc for doc in docs}
+
+    def find(self, query, projection=None):
+        user_ids = query.get("user_id", {}).get("$in")
+        docs = [doc for user_id, doc in self.docs.items() if user_ids is None or user_id in user_ids]
+
+        class Cursor:
+            async def to_list(self, length):
+                return docs
+        return Cursor()
+
+
+class FakeDb:
+    def __init__(self, docs):
+        self.users = FakeUsers(docs)
+
+
+def test_service_refresh_and_standing():
+    async def scenario():
+        db = FakeDb([card("u1", 30), card("u2", 50), card("u3", 10)])
+        service = LeaderboardService(InMemoryLeaderboardStore())
+        await service.rebuild(db)
+        assert await service.standing("points", 40) == {"rank": 2, "total": 3, "percentile": 66.7}
+
+        db.users.docs["u3"]["stats"]["points"] = 70
+        del db.users.docs["u1"]
+        service.mark_dirty(["u1", "u3"])
+        await service.flush_dirty(db)
+        assert [c["user_id"] for c in await service.top("points", 10)] == ["u3", "u2"]
+
+    asyncio.run(scenario())
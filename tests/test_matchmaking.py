@@ -0,0 +1,84 @@
+from matchmaking import DEPTH_BUCKETS, Histogram, MatchmakingEngine, Searcher
+
+
+def searcher(user_id: str, elo: int, joined_at: float = 0.0) -> Searcher:
+    return Searcher(user_id, f"sid-{user_id}", user_id, elo, joined_at)
+
+
+def test_window_widens_with_waiting_time():
+    engine = MatchmakingEngine(base_window=100, widen_per_second=20, max_window=400)
+    first = searcher("a", 1000)
+    assert engine.window_for(first, 0) == 100
+    assert engine.window_for(first, 10) == 300
+    assert engine.window_for(first, 1000) == 400
+
+    engine.add(first)
+    engine.add(searcher("b", 1250))
+    assert engine.tick(now=5) == []
+    assert len(engine) == 2
+    # 8 saniye sonra pencere 260'a çıktı
+    assert [(p.user_id, q.user_id) for p, q in engine.tick(now=8)] == [("a", "b")]
+    assert len(engine) == 0 and engine.matches == 1
+
+
+def test_nearest_elo_is_chosen_across_buckets():
+    engine = MatchmakingEngine(bucket_width=50, base_window=200, widen_per_second=0)
+    engine.add(searcher("me", 1000))
+    # Komşu bucket'taki aday daha uzak, iki bucket ötedeki daha yakın
+    engine.add(searcher("far", 1080, joined_at=1))
+    engine.add(searcher("near", 940, joined_at=2))
+    engine.add(searcher("out", 1300, joined_at=3))
+    pairs = engine.tick(now=3)
+    assert [(p.user_id, q.user_id) for p, q in pairs] == [("me", "near")]
+    assert set(s.user_id for s in engine) == {"far", "out"}
+
+
+def test_oldest_searchers_are_paired_first():
+    engine = MatchmakingEngine(base_window=100, widen_per_second=0)
+    engine.add(searcher("a", 1000, joined_at=0))
+    engine.add(searcher("b", 1500, joined_at=1))
+    engine.add(searcher("c", 1010, joined_at=2))
+    engine.add(searcher("d", 1010, joined_at=3))
+    engine.add(searcher("e", 1490, joined_at=4))
+    pairs = engine.tick(now=5)
+    # Aynı farkta önce gelen (c) seçilir; d tek kalır
+    assert [(p.user_id, q.user_id) for p, q in pairs] == [("a", "c"), ("b", "e")]
+    assert [s.user_id for s in engine] == ["d"]
+
+
+def test_add_twice_and_remove_cleans_empty_buckets():
+    engine = MatchmakingEngine(bucket_width=50)
+    assert engine.add(searcher("a", 1000))
+    assert not engine.add(searcher("a", 1200))
+    engine.add(searcher("b", 1010))
+    engine.add(searcher("c", 1400))
+    assert engine._bucket_keys == [20, 28]
+
+    assert engine.remove("a").elo == 1000
+    assert engine._bucket_keys == [20, 28]
+    engine.remove("b")
+    assert engine._bucket_keys == [28] and 20 not in engine._buckets
+    assert engine.remove("b") is None
+    assert "c" in engine and engine.get("c").elo == 1400
+    assert engine.stats()["elo_buckets"] == 1
+
+
+def test_histogram_snapshots_are_cumulative():
+    histogram = Histogram((1, 5, 10))
+    for value in (0.5, 1, 3, 7, 30):
+        histogram.observe(value)
+    assert histogram.snapshot() == {
+        "buckets": {"1": 2, "5": 3, "10": 4, "+Inf": 5},
+        "count": 5,
+        "mean": 8.3,
+    }
+    assert Histogram((1,)).snapshot() == {"buckets": {"1": 0, "+Inf": 0}, "count": 0, "mean": 0.0}
+
+    engine = MatchmakingEngine(widen_per_second=0)
+    engine.add(searcher("a", 1000, joined_at=0))
+    engine.add(searcher("b", 1000, joined_at=4))
+    engine.tick(now=6)
+    stats = engine.stats()
+    assert stats["wait_seconds"]["count"] == 2 and stats["wait_seconds"]["mean"] == 4.0
+    assert stats["queue_depth"]["count"] == 1
+    assert stats["queue_depth"]["buckets"][str(DEPTH_BUCKETS[2])] == 1
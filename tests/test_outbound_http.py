@@ -0,0 +1,137 @@
+import asyncio
+
+import httpx
+import pytest
+
+from outbound_http import CircuitBreaker, CircuitOpen, OutboundClient
+
+URL = "http://upstream.test/session-data"
+
+
+class Upstream:
+    """MockTransport handler whose behaviour is switched by the test"""
+
+    def __init__(self):
+        self.status = 200
+        self.body = b'{"ok": true}'
+        self.headers = {}
+        self.hang = None
+        self.calls = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        if self.hang is not None:
+            await self.hang.wait()
+        return httpx.Response(self.status, headers=self.headers, content=self.body)
+
+
+def client_for(upstream: Upstream, **kwargs) -> OutboundClient:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    return OutboundClient(retries=0, breaker=breaker, transport=httpx.MockTransport(upstream), **kwargs)
+
+
+async def open_circuit(client: OutboundClient, upstream: Upstream):
+    upstream.status = 503
+    for _ in range(client.breaker.failure_threshold):
+        await client.get(URL)
+    assert client.breaker.state == "open"
+    with pytest.raises(CircuitOpen):
+        await client.get(URL)
+    await asyncio.sleep(client.breaker.reset_timeout)
+    assert client.breaker.state == "half_open"
+    upstream.status = 200
+
+
+def test_retries_then_opens_and_closes_after_a_good_trial():
+    async def scenario():
+        upstream = Upstream()
+        upstream.status = 503
+        client = OutboundClient(
+            retries=2, backoff=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.05),
+            transport=httpx.MockTransport(upstream)
+        )
+        assert (await client.get(URL)).status_code == 503
+        assert upstream.calls == 3
+        with pytest.raises(CircuitOpen):
+            await client.get(URL)
+        assert upstream.calls == 3
+
+        await asyncio.sleep(0.05)
+        upstream.status = 200
+        assert (await client.get(URL)).status_code == 200
+        assert client.breaker.state == "closed"
+        assert client.stats()["rejected"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_trial_does_not_lock_the_circuit():
+    async def scenario():
+        upstream = Upstream()
+        client = client_for(upstream)
+        await open_circuit(client, upstream)
+
+        upstream.hang = asyncio.Event()
+        trial = asyncio.create_task(client.get(URL))
+        await asyncio.sleep(0.01)
+        # Deneme sürerken ikinci çağrı reddedilir
+        with pytest.raises(CircuitOpen):
+            await client.get(URL)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        upstream.hang = None
+        assert (await client.get(URL)).status_code == 200
+        assert client.breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_trial_ending_in_an_unrelated_error_is_released():
+    async def scenario():
+        upstream = Upstream()
+        client = client_for(upstream)
+        await open_circuit(client, upstream)
+
+        # Bozuk gzip gövdesi: karşı taraf cevap verdi ama okunamadı
+        upstream.headers = {"Content-Encoding": "gzip"}
+        with pytest.raises(httpx.DecodingError):
+            await client.get(URL)
+        assert client.breaker.state == "half_open"
+        upstream.headers = {}
+        assert (await client.get(URL)).status_code == 200
+        assert client.breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_failed_trial_reopens_the_circuit():
+    async def scenario():
+        upstream = Upstream()
+        client = client_for(upstream)
+        await open_circuit(client, upstream)
+
+        upstream.status = 502
+        assert (await client.get(URL)).status_code == 502
+        assert client.breaker.state == "open"
+        assert client.breaker.opens == 1
+
+    asyncio.run(scenario())
+
+
+def test_transport_errors_count_as_failures():
+    async def scenario():
+        def refuse(request):
+            raise httpx.ConnectError("refused", request=request)
+
+        client = OutboundClient(
+            retries=1, backoff=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=10),
+            transport=httpx.MockTransport(refuse)
+        )
+        with pytest.raises(httpx.ConnectError):
+            await client.get(URL)
+        assert client.breaker.state == "open"
+        assert client.stats()["retried"] == 1 and client.stats()["failed"] == 1
+
+    asyncio.run(scenario())
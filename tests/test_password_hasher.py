@@ -0,0 +1,70 @@
+import asyncio
+import json
+import threading
+
+import bcrypt
+import pytest
+
+from password_hasher import HasherOverloaded, PasswordHasher, hash_rounds, hasher_overloaded_handler
+
+
+def test_hash_verify_and_rehash():
+    async def scenario():
+        hasher = PasswordHasher(rounds=4)
+        hashed = await hasher.hash("gizli")
+        assert hash_rounds(hashed) == 4
+        assert await hasher.verify("gizli", hashed)
+        assert not await hasher.verify("yanlış", hashed)
+        assert not hasher.needs_rehash(hashed)
+
+        old = bcrypt.hashpw(b"gizli", bcrypt.gensalt(5)).decode()
+        assert hasher.needs_rehash(old)
+        assert await hasher.verify("gizli", old)
+        hasher.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_empty_or_corrupt_hash_is_rejected():
+    async def scenario():
+        hasher = PasswordHasher(rounds=4)
+        # OAuth hesaplarında özet yok; bozuk özet istisna yerine False döner
+        assert not await hasher.verify("gizli", "")
+        assert not await hasher.verify("gizli", None)
+        assert not await hasher.verify("gizli", "not-a-bcrypt-hash")
+        assert not await hasher.verify("gizli", "$2b$04$kısa")
+        assert not await hasher.verify("gizli", "$2b$99$" + "a" * 53)
+        assert hash_rounds("not-a-bcrypt-hash") is None and hash_rounds("$2b$xx$...") is None
+        assert not hasher.needs_rehash("not-a-bcrypt-hash")
+        assert hasher.stats()["completed"] == 1
+        hasher.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_overload_is_shed_with_503_and_retry_after():
+    async def scenario():
+        hasher = PasswordHasher(rounds=4, max_workers=1, max_queue=1)
+        release = threading.Event()
+        busy = [asyncio.ensure_future(hasher._run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        assert hasher.stats()["in_flight"] == 2
+
+        with pytest.raises(HasherOverloaded) as overloaded:
+            await hasher.hash("gizli")
+        assert hasher.stats()["rejected"] == 1
+
+        response = await hasher_overloaded_handler(None, overloaded.value)
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert "detail" in json.loads(response.body)
+        slow = await hasher_overloaded_handler(None, HasherOverloaded(retry_after=2.2))
+        assert slow.headers["retry-after"] == "3"
+
+        release.set()
+        await asyncio.gather(*busy)
+        # Kuyruk boşalınca yeni çağrılar kabul edilir
+        assert await hasher.verify("gizli", await hasher.hash("gizli"))
+        hasher.shutdown()
+
+    asyncio.run(scenario())
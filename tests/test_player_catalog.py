@@ -0,0 +1,117 @@
+import random
+
+from player_catalog import PlayerCatalog
+from text_folding import DeleteIndex, bounded_distance, deletes, fold
+
+
+def player(name: str, **fields) -> dict:
+    return {"name": name, "nationality": "", "position": "", "difficulty": "medium", **fields}
+
+
+PLAYERS = [
+    player("Martin Ødegaard"),
+    player("Erling Haaland"),
+    player("Thiago Silva"),
+    player("David Silva"),
+    player("Bernardo Silva"),
+    player("Kylian Mbappé"),
+    player("Neymar"),
+    player("Alassane Nubel"),
+    player("Lucas Hernández"),
+    player("Theo Hernández"),
+    player("Mohamed Salah"),
+]
+
+
+def test_fold():
+    assert fold("Martin Ødegaard") == fold("martin odegaard") == "martin odegaard"
+    assert fold("Saint-Étienne") == "saint etienne"
+    assert fold("  Łukasz   Piszczek ") == "lukasz piszczek"
+    assert fold("Müller, Thomas") == "muller thomas"
+    assert fold("Straße") == "strasse"
+
+
+def test_bounded_distance_matches_full_levenshtein():
+    def reference(a, b):
+        table = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+        for i in range(len(a) + 1):
+            for j in range(len(b) + 1):
+                if not i or not j:
+                    table[i][j] = i or j
+                    continue
+                table[i][j] = min(table[i - 1][j] + 1, table[i][j - 1] + 1, table[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+                if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                    table[i][j] = min(table[i][j], table[i - 2][j - 2] + 1)
+        return table[-1][-1]
+
+    rng = random.Random(20)
+    for _ in range(2000):
+        a = "".join(rng.choice("abc") for _ in range(rng.randrange(7)))
+        b = "".join(rng.choice("abc") for _ in range(rng.randrange(7)))
+        limit = rng.randrange(4)
+        expected = reference(a, b)
+        assert bounded_distance(a, b, limit) == (expected if expected <= limit else limit + 1), (a, b, limit)
+
+
+def test_delete_index_finds_every_key_within_distance():
+    rng = random.Random(21)
+    keys = {"".join(rng.choice("abcd") for _ in range(rng.randrange(2, 8))) for _ in range(300)}
+    index = DeleteIndex(max_distance=2)
+    for key in keys:
+        index.add(key)
+    assert len(index) == len(keys)
+    assert "abc" in deletes("abcd", 1) and "ab" in deletes("abcd", 2) and "ab" not in deletes("abcd", 1)
+
+    for _ in range(200):
+        query = "".join(rng.choice("abcde") for _ in range(rng.randrange(1, 9)))
+        for distance in (0, 1, 2):
+            expected = sorted(
+                (bounded_distance(query, key, distance), key) for key in keys
+                if bounded_distance(query, key, distance) <= distance
+            )
+            assert index.search(query, distance) == expected
+
+
+def test_exact_folded_and_alias_guesses():
+    catalog = PlayerCatalog(PLAYERS)
+    assert catalog.resolve("erling haaland").player["name"] == "Erling Haaland"
+    assert catalog.resolve("MARTIN ODEGAARD").player["name"] == "Martin Ødegaard"
+    assert catalog.resolve("odegaard").player["name"] == "Martin Ødegaard"
+    assert catalog.resolve("Mbappe").player["name"] == "Kylian Mbappé"
+    # Boşluksuz tam ad
+    assert catalog.resolve("alassanenubel").player["name"] == "Alassane Nubel"
+    assert catalog.resolve("neymar").player["name"] == "Neymar"
+
+
+def test_typos():
+    catalog = PlayerCatalog(PLAYERS)
+    assert catalog.resolve("Erling Halaand").player["name"] == "Erling Haaland"
+    assert catalog.resolve("Martin Odegard").player["name"] == "Martin Ødegaard"
+    assert catalog.resolve("Odegard").player["name"] == "Martin Ødegaard"
+    assert catalog.resolve("Mohamed Slaah").player["name"] == "Mohamed Salah"
+    assert catalog.resolve("Neymr").player["name"] == "Neymar"
+    # Kısa tahminlerde hata kabul edilmez
+    assert catalog.resolve("Nymr") is None
+    assert catalog.resolve("Somebody Else") is None
+
+
+def test_ambiguous_surname_resolves_to_nobody():
+    catalog = PlayerCatalog(PLAYERS)
+    thiago = catalog.entry("Thiago Silva")
+    assert catalog.resolve("Silva") is None
+    assert catalog.resolve("Silav") is None
+    # Tahmin edilen oyuncu belirsiz bir soyadıyla doğru sayılmaz
+    assert catalog.resolve("Silva", prefer=thiago) is None
+    assert catalog.resolve("Hernandez", prefer=catalog.entry("Theo Hernández")) is None
+    assert catalog.resolve("Thiago Silva", prefer=catalog.entry("David Silva")) is thiago
+
+
+def test_prefer_breaks_ties_between_players_of_the_same_name():
+    first = player("Danilo Pereira", nationality="Portugal")
+    second = player("Danilo Peréira", nationality="Brazil")
+    catalog = PlayerCatalog([first, second])
+    assert catalog.resolve("danilo pereira").player is first
+    assert catalog.resolve("Danilo Pereira").player is first
+    other = catalog.entry("Danilo Peréira")
+    assert catalog.resolve("danilo pereira", prefer=other) is other
+    assert catalog.resolve("danilo pereria", prefer=other) is other
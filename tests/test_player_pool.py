@@ -0,0 +1,160 @@
+import asyncio
+import random
+
+import mongomock
+
+from player_pool import (
+    PlayerPool, PlayerPoolService, TeamUniverse, bump_pool_version, compact_player, format_market_value
+)
+
+
+class AsyncCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    async def to_list(self, length):
+        return list(self.cursor)
+
+
+class AsyncCollection:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def find(self, query, projection=None):
+        return AsyncCursor(self.collection.find(query, projection))
+
+    async def find_one(self, query, projection=None):
+        return self.collection.find_one(query, projection)
+
+    async def find_one_and_update(self, query, update, **kwargs):
+        return self.collection.find_one_and_update(query, update, **kwargs)
+
+
+class AsyncDb:
+    def __init__(self):
+        self.sync = mongomock.MongoClient().db
+
+    def __getattr__(self, name):
+        return AsyncCollection(self.sync[name])
+
+
+DOCS = [
+    {
+        "name": "Arda Güler", "nationality": "Turkey", "position": "Midfielder",
+        "team_history": [{"team": "Fenerbahçe", "years": "2021-2023"}, {"team": "Real Madrid", "years": "2023-"}],
+        "market_values": [{"value": 10_000_000}, {"value": 45_000_000}],
+    },
+    {
+        # Eski seed şeması: teams + yıl listesi
+        "name": "Hakan Şükür", "nationality": "Turkey", "position": "Forward", "difficulty": "easy",
+        "teams": [{"team": "Galatasaray", "years": [1992, 2000]}, {"team": ""}],
+    },
+    {"name": "Arda Güler", "nationality": "Spain"},
+    {"nationality": "Nowhere"},
+    {
+        "name": "Kylian Mbappé", "nationality": "France", "position": "Forward",
+        "team_history": [{"team": "Real Madrid", "years": "2024-"}], "market_values": [{"value": 180_000_000}],
+    },
+]
+
+
+def test_compact_player_normalizes_both_schemas():
+    arda = compact_player(DOCS[0])
+    assert arda.teams == ("Fenerbahçe", "Real Madrid")
+    assert arda.market_value == "45M €" and arda.difficulty == "medium"
+    hakan = compact_player(DOCS[1])
+    assert hakan.team_history == (("Galatasaray", "1992-2000"),)
+    assert hakan.market_value is None and hakan.difficulty == "easy"
+    assert compact_player(DOCS[3]) is None
+    assert format_market_value(750_000) == "750K €" and format_market_value("5M") == "5M"
+    assert "market_values" not in arda.as_dict()
+
+
+def test_indexes():
+    pool = PlayerPool.from_documents(DOCS, version=3)
+    # Aynı isim bir kez alınır, isimsiz doküman atlanır
+    assert pool.names == ("Arda Güler", "Hakan Şükür", "Kylian Mbappé")
+    assert pool.version == 3
+    assert [pool.players[i].name for i in pool.by_nationality["Turkey"]] == ["Arda Güler", "Hakan Şükür"]
+    assert [pool.players[i].name for i in pool.by_team["Real Madrid"]] == ["Arda Güler", "Kylian Mbappé"]
+    assert [pool.players[i].name for i in pool.by_position["Forward"]] == ["Hakan Şükür", "Kylian Mbappé"]
+    assert {pool.players[i].name for i in pool.by_difficulty["easy"]} == {"Hakan Şükür", "Kylian Mbappé"}
+
+    assert {p.name for p in pool.sample(5, "easy")} == {"Hakan Şükür", "Kylian Mbappé"}
+    assert len(pool.sample(2)) == 2
+    for _ in range(20):
+        names = pool.random_names(1, exclude="Arda Güler")
+        assert len(names) == 1 and names[0] != "Arda Güler"
+    assert sorted(pool.random_names(5, exclude="Arda Güler")) == ["Hakan Şükür", "Kylian Mbappé"]
+
+
+def test_service_reloads_after_a_version_bump():
+    async def scenario():
+        db = AsyncDb()
+        db.sync.players.insert_many([dict(doc) for doc in DOCS[:2]])
+        service = PlayerPoolService(max_age=3600)
+        pool = await service.load(db)
+        assert len(pool) == 2 and pool.version == 0
+        assert not await service.refresh_if_stale(db)
+        assert service.current is pool
+
+        db.sync.players.insert_one(dict(DOCS[4]))
+        assert await bump_pool_version(db) == 1
+        assert await service.refresh_if_stale(db)
+        assert service.current is not pool
+        assert len(service.current) == 3 and service.stats()["version"] == 1
+
+        # Sürüm değişmese de çok eski snapshot yeniden yüklenir
+        service.max_age = 0
+        assert await service.refresh_if_stale(db)
+
+    asyncio.run(scenario())
+
+
+def universe_players(*careers):
+    players = []
+    for i, career in enumerate(careers):
+        players.append(compact_player({
+            "name": f"p{i}", "team_history": [{"team": team, "years": years} for team, years in career]
+        }))
+    return tuple(players)
+
+
+def test_team_universe_eras_and_plausible_links():
+    universe = TeamUniverse(universe_players(
+        [("A", "2001-2004"), ("B", "2004-2008"), ("C", "2008-")],
+        [("A", "2003-2005"), ("D", "1975-1980")],
+        [("E", "")],
+    ))
+    assert universe.teams == ("A", "B", "C", "D", "E")
+    assert universe.era["A"] == 2003 and universe.era["E"] is None
+    # D aynı oyuncunun kariyerinde ama 10 yıldan uzak dönem
+    assert universe.plausible["A"] == ("B", "C")
+    assert universe.by_decade[200] == ("A", "B", "C")
+
+
+def test_distractors_are_distinct_and_never_the_answer():
+    careers = [[(f"T{i}", f"{1990 + i % 30}-"), (f"T{(i + 1) % 60}", f"{1991 + i % 30}-")] for i in range(60)]
+    universe = TeamUniverse(universe_players(*careers))
+    for _ in range(500):
+        team = random.choice(universe.teams)
+        picked = universe.sample_distractors(team, exclude=("T0",))
+        assert len(picked) == 3
+        assert len(set(picked)) == 3
+        assert team not in picked and "T0" not in picked
+
+
+def test_distractors_fall_back_when_linked_and_era_buckets_are_small():
+    # X'in bağlı takımı ve aynı on yıldan takımı yok; sadece genel liste kalıyor
+    universe = TeamUniverse(universe_players(
+        [("X", "1950-1955")], [("A", "2001-")], [("B", "2002-")], [("C", "2003-")], [("D", "1990-")]
+    ))
+    assert universe.plausible["X"] == ()
+    for _ in range(2000):
+        picked = universe.sample_distractors("X")
+        assert len(picked) == 3 and "X" not in picked and len(set(picked)) == 3
+
+    # Yeterli takım yoksa olabildiği kadar
+    tiny = TeamUniverse(universe_players([("X", "2000-"), ("Y", "2001-")]))
+    assert tiny.sample_distractors("X") == ["Y"]
+    assert sorted(tiny.sample_distractors("Z")) == ["X", "Y"]
@@ -0,0 +1,100 @@
+import asyncio
+
+import mongomock
+
+from profile_cards import ProfileCardCache
+
+
+class AsyncCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    async def to_list(self, length):
+        return list(self.cursor)
+
+
+class CountingUsers:
+    """Async stand-in for db.users that records every find() filter"""
+
+    def __init__(self):
+        self.collection = mongomock.MongoClient().db.users
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        return AsyncCursor(self.collection.find(query, projection))
+
+
+def users_with(*user_ids) -> CountingUsers:
+    users = CountingUsers()
+    for user_id in user_ids:
+        users.collection.insert_one({"user_id": user_id, "username": user_id.upper(), "email": "x", "elo": 1000})
+    return users
+
+
+def test_misses_are_read_with_one_in_query():
+    async def scenario():
+        users = users_with("u1", "u2", "u3")
+        cache = ProfileCardCache(users)
+        cards = await cache.hydrate(["u1", "u2", "u1", None, "ghost"])
+        assert set(cards) == {"u1", "u2"}
+        assert cards["u1"] == {"user_id": "u1", "username": "U1"}
+        assert users.queries == [{"user_id": {"$in": ["u1", "u2", "ghost"]}}]
+
+        # Önbellekteki kartlar tekrar okunmaz; yalnızca eksikler sorgulanır
+        cards = await cache.hydrate(["u2", "u3"])
+        assert set(cards) == {"u2", "u3"}
+        assert users.queries[1] == {"user_id": {"$in": ["u3"]}}
+
+        await cache.hydrate(["u1", "u2", "u3"])
+        assert len(users.queries) == 2
+        assert cache.stats()["queries"] == 2 and cache.stats()["hits"] == 4
+
+    asyncio.run(scenario())
+
+
+def test_cards_expire_and_can_be_invalidated():
+    async def scenario():
+        users = users_with("u1", "u2")
+        cache = ProfileCardCache(users, ttl_seconds=0.05)
+        await cache.hydrate(["u1", "u2"])
+
+        users.collection.update_one({"user_id": "u1"}, {"$set": {"username": "renamed"}})
+        cache.invalidate("u1")
+        cards = await cache.hydrate(["u1", "u2"])
+        assert cards["u1"]["username"] == "renamed"
+        assert users.queries[-1] == {"user_id": {"$in": ["u1"]}}
+
+        await asyncio.sleep(0.06)
+        await cache.hydrate(["u1", "u2"])
+        assert users.queries[-1] == {"user_id": {"$in": ["u1", "u2"]}}
+
+    asyncio.run(scenario())
+
+
+def test_lru_eviction():
+    async def scenario():
+        cache = ProfileCardCache(users_with("u1", "u2", "u3"), max_entries=2)
+        await cache.hydrate(["u1", "u2"])
+        await cache.hydrate(["u1"])
+        await cache.hydrate(["u3"])
+        assert cache.stats()["size"] == 2 and cache.stats()["evictions"] == 1
+        assert cache.get("u2") is None and cache.get("u1") is not None
+
+    asyncio.run(scenario())
+
+
+def test_returned_cards_are_copies():
+    async def scenario():
+        users = users_with("u1")
+        cache = ProfileCardCache(users)
+        first = await cache.hydrate(["u1"])
+        first["u1"]["username"] = "changed"
+        # Önbellekten gelen kart da kopya olmalı
+        second = await cache.hydrate(["u1"])
+        assert second["u1"]["username"] == "U1"
+        second["u1"]["rank"] = 1
+        assert "rank" not in (await cache.hydrate(["u1"]))["u1"]
+        assert len(users.queries) == 1
+
+    asyncio.run(scenario())
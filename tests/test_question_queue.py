@@ -0,0 +1,81 @@
+import asyncio
+import itertools
+
+from question_queue import QuestionSetQueue, RecentPlayers
+
+
+class Generator:
+    """Each call returns a set with fresh player names: set1-p0, set1-p1, ..."""
+
+    def __init__(self):
+        self.counter = itertools.count(1)
+        self.calls = []
+
+    def __call__(self, mode: str, count: int):
+        number = next(self.counter)
+        self.calls.append(mode)
+        return [{"player_name": f"set{number}-p{i}", "correct_answer": "x"} for i in range(count)]
+
+
+def test_recent_players_evicts_least_recent_user_and_oldest_players():
+    recent = RecentPlayers(per_user=3, max_users=2)
+    recent.remember("u1", ["a", "b"])
+    recent.remember("u2", ["c"])
+    recent.remember("u1", ["b", "d", "e"])
+    # u1 için en eski "a" düştü; tekrar eden "b" iki kez sayılmadı
+    assert recent.seen("u1") == {"b", "d", "e"}
+
+    recent.remember("u3", ["f"])
+    # u2 en uzun süredir kullanılmayan kullanıcıydı
+    assert recent.seen("u2") == set()
+    assert recent.seen("u1") == {"b", "d", "e"} and recent.seen("u3") == {"f"}
+
+
+def test_take_skips_sets_with_recently_seen_players():
+    queue = QuestionSetQueue(Generator(), lambda: 1, depth=3, questions_per_set=2)
+    queue.fill()
+    buffer = queue._sets["career-path"]
+    assert len(buffer) == 3
+    head, second = buffer[0].questions, buffer[1].questions
+
+    # u1 sıradaki ilk setin oyuncularını yakın zamanda gördü
+    queue.recent.remember("u1", [q["player_name"] for q in head])
+    assert queue.take("career-path", ["u2", "u1"]) == second
+    assert queue.repeats_avoided == 1
+
+    # Kimse görmediyse sıradaki set alınır
+    assert queue.take("career-path", ["u9"]) == head
+    assert queue.repeats_avoided == 1 and queue.stats()["hits"] == 2
+
+
+def test_empty_queue_generates_in_place_and_unknown_modes_share_default():
+    generator = Generator()
+    queue = QuestionSetQueue(generator, lambda: 1, depth=2)
+    questions = queue.take("no-such-mode", ["u1"])
+    assert len(questions) == 10
+    assert generator.calls == ["default"]
+    assert queue.stats()["misses"] == 1 and queue.stats()["hits"] == 0
+    assert queue.recent.seen("u1") == {q["player_name"] for q in questions}
+
+
+def test_sets_from_an_old_pool_version_are_dropped():
+    version = [1]
+    queue = QuestionSetQueue(Generator(), lambda: version[0], depth=2)
+    queue.fill()
+    version[0] = 2
+    queue.take("letter-hunt")
+    assert queue.stats()["misses"] == 1
+    assert all(s.pool_version == 2 for s in queue._sets["letter-hunt"])
+
+
+def test_producer_refills_after_take():
+    async def scenario():
+        queue = QuestionSetQueue(Generator(), lambda: 1, depth=2)
+        queue.start()
+        queue.take("value-guess")
+        assert queue.stats()["depth"]["value-guess"] == 1
+        await asyncio.sleep(0.01)
+        assert queue.stats()["depth"]["value-guess"] == 2
+        await queue.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,128 @@
+import asyncio
+
+import mongomock
+from pymongo.errors import BulkWriteError
+
+from game_systems import LeagueTable
+from result_writer import ResultWriter
+
+LEAGUES = LeagueTable({"Bronze": {"min_points": 0}, "Silver": {"min_points": 100}}, "min_points", default="Bronze")
+
+
+class FlakyUsers:
+    """Async stand-in for db.users; the next `fail` bulk_writes raise `error`"""
+
+    def __init__(self, fail: int = 0, error: Exception = None):
+        self.users = mongomock.MongoClient().db.users
+        self.fail = fail
+        self.error = error or ConnectionError("primary stepped down")
+        self.batches = []
+
+    async def bulk_write(self, operations, ordered=True):
+        self.batches.append(len(operations))
+        if self.fail:
+            self.fail -= 1
+            raise self.error
+        return self.users.bulk_write(operations, ordered=ordered)
+
+    def user(self, user_id: str) -> dict:
+        return self.users.find_one({"user_id": user_id}, {"_id": 0})
+
+
+def seeded(collection: FlakyUsers, *user_ids: str) -> FlakyUsers:
+    for user_id in user_ids:
+        collection.users.insert_one({
+            "user_id": user_id, "coins": 0, "stats": {"points": 90, "win_streak": 3}
+        })
+    return collection
+
+
+def test_results_of_one_user_coalesce_into_one_update():
+    async def scenario():
+        users = seeded(FlakyUsers(), "u1", "u2")
+        writer = ResultWriter(users, LEAGUES)
+        writer.record("u1", 10, 20, 5, "win")
+        writer.record("u1", -3, 10, 1, "loss")
+        writer.record("u1", 10, 20, 5, "win")
+        writer.record("u2", 1, 10, 2, "draw")
+
+        assert await writer.flush() == 2
+        assert users.batches == [2]
+        u1 = users.user("u1")
+        assert u1["stats"]["points"] == 107
+        assert u1["stats"]["total_games"] == 3
+        assert u1["stats"]["wins"] == 2 and u1["stats"]["losses"] == 1
+        # Yenilgi seriyi sıfırladı, sonrasında bir galibiyet
+        assert u1["stats"]["win_streak"] == 1
+        assert u1["stats"]["rank"] == "Silver"
+        assert u1["coins"] == 11
+        assert users.user("u2")["stats"]["win_streak"] == 3
+        assert await writer.flush() == 0
+
+    asyncio.run(scenario())
+
+
+def test_failed_bulk_write_is_requeued_and_merged_with_newer_results():
+    async def scenario():
+        users = seeded(FlakyUsers(fail=1), "u1")
+        flushed = []
+        writer = ResultWriter(users, LEAGUES, on_flushed=flushed.extend)
+        writer.record("u1", 10, 20, 5, "win")
+
+        assert await writer.flush() == 0
+        assert writer.failures == 1
+        assert users.user("u1")["stats"]["points"] == 90
+
+        writer.record("u1", 10, 20, 5, "win")
+        assert await writer.flush() == 1
+        assert flushed == ["u1"]
+        u1 = users.user("u1")
+        assert u1["stats"]["points"] == 110
+        assert u1["stats"]["win_streak"] == 5
+
+    asyncio.run(scenario())
+
+
+def test_partial_bulk_write_error_requeues_only_failed_users():
+    async def scenario():
+        error = BulkWriteError({"writeErrors": [{"index": 1, "code": 121, "errmsg": "validation"}]})
+        users = seeded(FlakyUsers(fail=1, error=error), "u1", "u2")
+        writer = ResultWriter(users, LEAGUES)
+        writer.record("u1", 10, 0, 0, "win")
+        writer.record("u2", 10, 0, 0, "win")
+
+        assert await writer.flush() == 1
+        assert list(writer._pending) == ["u2"]
+        assert writer.stats()["pending_users"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_stop_flushes_everything_pending():
+    async def scenario():
+        users = seeded(FlakyUsers(), "u1")
+        writer = ResultWriter(users, LEAGUES, flush_interval=60)
+        writer.start()
+        writer.record("u1", 10, 0, 0, "win")
+        await writer.stop()
+        assert users.user("u1")["stats"]["points"] == 100
+        assert writer.stats()["pending_users"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_max_pending_wakes_the_flush_loop():
+    async def scenario():
+        users = seeded(FlakyUsers(), "u1", "u2")
+        writer = ResultWriter(users, LEAGUES, flush_interval=60, max_pending=2)
+        writer.start()
+        writer.record("u1", 10, 0, 0, "win")
+        writer.record("u2", 10, 0, 0, "win")
+        for _ in range(50):
+            if writer.flushes:
+                break
+            await asyncio.sleep(0.01)
+        assert writer.users_written == 2
+        await writer.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,88 @@
+import asyncio
+
+from round_scheduler import RoundScheduler
+
+
+def test_deadlines_fire_in_order_and_replace_per_room():
+    async def scenario():
+        scheduler = RoundScheduler()
+        scheduler.start()
+        fired = []
+
+        async def record(label):
+            fired.append(label)
+
+        scheduler.schedule("room-c", 0.06, record, "c")
+        scheduler.schedule("room-a", 0.02, record, "a")
+        scheduler.schedule("room-b", 0.04, record, "b-old")
+        # Aynı oda için yeni zamanlama eskisinin yerini alır
+        scheduler.schedule("room-b", 0.01, record, "b")
+        await asyncio.sleep(0.1)
+        assert fired == ["b", "a", "c"]
+        assert scheduler.stats()["fired"] == 3 and scheduler.stats()["pending"] == 0
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+
+
+def test_cancel_drops_the_stale_deadline_lazily():
+    async def scenario():
+        scheduler = RoundScheduler()
+        scheduler.start()
+        fired = []
+
+        async def record(label):
+            fired.append(label)
+
+        scheduler.schedule("room-a", 0.01, record, "a")
+        scheduler.schedule("room-b", 0.03, record, "b")
+        scheduler.cancel("room-a")
+        # Kayıt heap'te kalır ama artık canlı değil
+        assert scheduler.stats()["pending"] == 1 and scheduler.stats()["heap_size"] == 2
+        await asyncio.sleep(0.06)
+        assert fired == ["b"]
+        assert scheduler.stats()["heap_size"] == 0
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+
+
+def test_heap_is_compacted_when_cancelled_entries_pile_up():
+    async def scenario():
+        scheduler = RoundScheduler()
+
+        async def noop():
+            pass
+
+        for _ in range(200):
+            scheduler.schedule("room", 60, noop)
+        assert scheduler.stats()["pending"] == 1
+        assert scheduler.stats()["heap_size"] <= 2 + 64 + 1
+
+    asyncio.run(scenario())
+
+
+def test_failing_callback_does_not_stop_the_loop():
+    async def scenario():
+        scheduler = RoundScheduler()
+        scheduler.start()
+        fired = []
+
+        async def explode():
+            raise RuntimeError("boom")
+
+        async def record(label):
+            fired.append(label)
+
+        scheduler.schedule("room-a", 0.01, explode)
+        scheduler.schedule("room-b", 0.03, record, "b")
+        await asyncio.sleep(0.06)
+        assert fired == ["b"]
+        assert scheduler.stats()["running_callbacks"] == 0
+
+        scheduler.schedule("room-a", 0.01, record, "a")
+        await asyncio.sleep(0.03)
+        assert fired == ["b", "a"]
+        await scheduler.stop()
+
+    asyncio.run(scenario())
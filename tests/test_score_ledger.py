@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import mongomock
+from pymongo.errors import BulkWriteError
+
+from score_ledger import EVENTS, ScoreLedger, rollup_match
+
+
+class FlakyDb:
+    """db[...] stand-in; insert_many on score_events raises the queued errors first"""
+
+    def __init__(self, *errors):
+        self.db = mongomock.MongoClient(tz_aware=True).db
+        self.errors = list(errors)
+
+    def __getitem__(self, name):
+        outer = self
+        collection = self.db[name]
+
+        class Collection:
+            async def insert_many(self, documents, ordered=True):
+                if outer.errors:
+                    raise outer.errors.pop(0)
+                return collection.insert_many(documents, ordered=ordered)
+
+        return Collection()
+
+
+def test_events_retried_after_an_outage_stay_past_the_watermark():
+    async def scenario():
+        db = FlakyDb(ConnectionError("no primary"))
+        ledger = ScoreLedger(db)
+        ledger.record("u1", 120, "quiz", won=True)
+        assert await ledger.flush() == 0
+
+        # Kesinti sürerken rollup filigranı olayın oynandığı anın ötesine geçer
+        await asyncio.sleep(0.01)
+        watermark = datetime.now(timezone.utc)
+        await asyncio.sleep(0.01)
+
+        assert await ledger.flush() == 1
+        event = db.db[EVENTS].find_one()
+        assert event["at"] < watermark < event["logged_at"]
+        later = datetime.now(timezone.utc) + timedelta(minutes=5)
+        assert db.db[EVENTS].count_documents(rollup_match(watermark, later)) == 1
+
+    asyncio.run(scenario())
+
+
+def test_flush_stamps_each_attempt():
+    async def scenario():
+        db = FlakyDb(ConnectionError("no primary"))
+        ledger = ScoreLedger(db)
+        ledger.record("u1", 10, "quiz")
+        await ledger.flush()
+        first = ledger._pending[0]["logged_at"]
+        await asyncio.sleep(0.01)
+        await ledger.flush()
+        assert db.db[EVENTS].find_one()["logged_at"] > first
+
+    asyncio.run(scenario())
+
+
+def test_duplicate_key_on_retry_counts_as_written():
+    async def scenario():
+        error = BulkWriteError({"writeErrors": [
+            {"index": 0, "code": 11000, "errmsg": "duplicate key"},
+            {"index": 1, "code": 121, "errmsg": "validation"},
+        ]})
+        ledger = ScoreLedger(FlakyDb(error))
+        ledger.record("u1", 10, "quiz")
+        ledger.record("u2", 20, "quiz")
+        assert await ledger.flush() == 1
+        assert [event["user_id"] for event in ledger._pending] == ["u2"]
+
+    asyncio.run(scenario())
+
+
+def test_rollup_match_reads_events_without_logged_at_by_play_time():
+    events = mongomock.MongoClient(tz_aware=True).db[EVENTS]
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    events.insert_many([
+        {"user_id": "old", "at": start + timedelta(minutes=1)},
+        {"user_id": "new", "at": start - timedelta(days=1), "logged_at": start + timedelta(minutes=2)},
+        {"user_id": "done", "at": start - timedelta(days=1), "logged_at": start - timedelta(minutes=1)},
+    ])
+    window = rollup_match(start, start + timedelta(hours=1))
+    assert sorted(doc["user_id"] for doc in events.find(window)) == ["new", "old"]
+    backfill = rollup_match(start - timedelta(days=5), start + timedelta(hours=1), played_from=start)
+    assert [doc["user_id"] for doc in events.find(backfill)] == ["old"]
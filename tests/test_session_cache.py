@@ -0,0 +1,67 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from session_cache import SessionCache
+
+
+def user(user_id: str, **fields) -> dict:
+    return {"user_id": user_id, **fields}
+
+
+def test_ttl_is_capped_by_the_session_expiry():
+    cache = SessionCache(ttl_seconds=60)
+    cache.put("t1", user("u1"), datetime.now(timezone.utc) + timedelta(seconds=0.05))
+    cache.put("t2", user("u2"))
+    assert cache.get("t1") == user("u1")
+    time.sleep(0.06)
+    assert cache.get("t1") is None
+    assert cache.get("t2") == user("u2")
+
+    # Süresi dolmuş oturum hiç önbelleğe girmez; naive datetime UTC sayılır
+    cache.put("t3", user("u3"), datetime.now(timezone.utc) - timedelta(seconds=1))
+    cache.put("t4", user("u4"), datetime.utcnow() - timedelta(seconds=1))
+    assert cache.stats()["size"] == 1
+
+
+def test_ttl_expiry():
+    cache = SessionCache(ttl_seconds=0.05)
+    cache.put("t1", user("u1"))
+    time.sleep(0.06)
+    assert cache.get("t1") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_lru_eviction():
+    cache = SessionCache(max_entries=2)
+    cache.put("t1", user("u1"))
+    cache.put("t2", user("u2"))
+    assert cache.get("t1") is not None
+    cache.put("t3", user("u3"))
+    assert cache.get("t2") is None
+    assert cache.get("t1") is not None and cache.get("t3") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_user_drops_every_token_of_the_user():
+    cache = SessionCache()
+    cache.put("phone", user("u1"))
+    cache.put("web", user("u1"))
+    cache.put("web", user("u1", username="again"))
+    cache.put("other", user("u2"))
+    cache.invalidate_user("u1")
+    assert cache.get("phone") is None and cache.get("web") is None
+    assert cache.get("other") is not None
+    assert cache.stats()["invalidations"] == 2
+
+    cache.invalidate_token("other")
+    assert cache.get("other") is None
+    assert cache._tokens_by_user == {}
+
+
+def test_returned_documents_are_copies():
+    cache = SessionCache()
+    cache.put("t1", user("u1", stats={"points": 1}))
+    cache.get("t1")["stats"]["points"] = 99
+    assert cache.get("t1")["stats"]["points"] == 1
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 0 and stats["hit_ratio"] == 1.0
@@ -0,0 +1,162 @@
+import asyncio
+import time
+from datetime import timedelta
+
+import mongomock
+import pytest
+
+from signed_sessions import RevocationList, SessionSigner, _b64decode, _b64encode, load_signing_keys
+
+NEW = "k2:" + "n" * 32
+OLD = "k1:" + "o" * 32
+
+
+class AsyncCollection:
+    """Async stand-in for the motor collection of revoked_sessions"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def insert_one(self, doc):
+        # motor gibi: eklenen sözlüğe _id yazılır
+        return self.collection.insert_one(doc)
+
+    def find(self, query, projection=None):
+        docs = list(self.collection.find(query, projection))
+
+        async def iterate():
+            for doc in docs:
+                yield doc
+
+        return iterate()
+
+
+def shared_collection():
+    return mongomock.MongoClient(tz_aware=True).db.revoked_sessions
+
+
+def signer(spec: str = f"{NEW},{OLD}", ttl: timedelta = timedelta(days=7)) -> SessionSigner:
+    kid, keys = load_signing_keys(spec)
+    return SessionSigner(keys, kid, ttl)
+
+
+def test_load_signing_keys():
+    assert load_signing_keys(None) == (None, {})
+    assert load_signing_keys(f" {NEW} , {OLD},") == ("k2", {"k2": b"n" * 32, "k1": b"o" * 32})
+    for bad in ("k1", "k1:short", ":" + "x" * 16, "k.1:" + "x" * 16):
+        with pytest.raises(ValueError):
+            load_signing_keys(bad)
+    with pytest.raises(ValueError):
+        SessionSigner({"k1": b"o" * 32}, "k2")
+
+
+def test_issue_and_verify():
+    sessions = signer()
+    token, claims = sessions.issue("user_1")
+    assert SessionSigner.is_signed(token) and token.startswith("v1.k2.")
+    assert not SessionSigner.is_signed("session_abc")
+    assert sessions.verify(token) == claims
+    assert claims.user_id == "user_1"
+    assert sessions.issue("user_1")[1].jti != claims.jti
+
+
+def test_rotation_keeps_old_tokens_valid_until_the_key_is_dropped():
+    old_token, old_claims = signer(OLD).issue("user_1")
+    rotated = signer(f"{NEW},{OLD}")
+    assert rotated.verify(old_token) == old_claims
+    assert rotated.issue("user_1")[0].startswith("v1.k2.")
+    assert signer(NEW).verify(old_token) is None
+
+
+def test_expired_token_is_rejected():
+    token, _ = signer(ttl=timedelta(seconds=-1)).issue("user_1")
+    assert signer().verify(token) is None
+
+
+def test_tampered_token_is_rejected():
+    sessions = signer()
+    token, _ = sessions.issue("user_1")
+    signed_part, _, signature = token.rpartition(".")
+    prefix, kid, payload = signed_part.split(".")
+
+    forged_payload = _b64encode(_b64decode(payload).replace(b"user_1", b"user_2"))
+    assert sessions.verify(f"{prefix}.{kid}.{forged_payload}.{signature}") is None
+    flipped = _b64encode(bytes([_b64decode(signature)[0] ^ 1]) + _b64decode(signature)[1:])
+    assert sessions.verify(f"{signed_part}.{flipped}") is None
+    # Aynı imza başka bir kid altında
+    assert sessions.verify(f"{prefix}.k1.{payload}.{signature}") is None
+    assert sessions.verify(f"{prefix}.k9.{payload}.{signature}") is None
+    for garbage in ("v1.", "v1.k2", "v1.k2.!!.!!", token + ".x"):
+        assert sessions.verify(garbage) is None
+
+
+def test_revoke_token_only_revokes_that_token():
+    async def scenario():
+        sessions = signer()
+        revocations = RevocationList(AsyncCollection(shared_collection()))
+        _, first = sessions.issue("user_1")
+        _, second = sessions.issue("user_1")
+        await revocations.revoke_token(first)
+        assert revocations.is_revoked(first)
+        assert not revocations.is_revoked(second)
+
+    asyncio.run(scenario())
+
+
+def test_revoke_user_covers_earlier_tokens_and_clock_skew():
+    async def scenario():
+        sessions = signer()
+        revocations = RevocationList(AsyncCollection(shared_collection()), clock_skew=timedelta(seconds=2))
+        _, before = sessions.issue("user_1")
+        _, other_user = sessions.issue("user_2")
+        await revocations.revoke_user("user_1", timedelta(days=7))
+        assert revocations.is_revoked(before)
+        assert not revocations.is_revoked(other_user)
+
+        # Saati 1 s ileride bir worker'ın sıfırlamadan hemen önce verdiği token
+        ahead = before._replace(issued_ms=before.issued_ms + 1000)
+        assert revocations.is_revoked(ahead)
+        # clock_skew geçtikten sonra verilenler geçerli
+        later = before._replace(issued_ms=int(time.time() * 1000) + 2500)
+        assert not revocations.is_revoked(later)
+
+    asyncio.run(scenario())
+
+
+def test_sync_reaches_other_workers():
+    async def scenario():
+        collection = shared_collection()
+        sessions = signer()
+        first = RevocationList(AsyncCollection(collection), sync_interval=5)
+        second = RevocationList(AsyncCollection(collection), sync_interval=5)
+        await second.sync()
+
+        _, logged_out = sessions.issue("user_1")
+        _, reset = sessions.issue("user_2")
+        await first.revoke_token(logged_out)
+        await first.revoke_user("user_2", timedelta(days=7))
+        assert not second.is_revoked(logged_out) and not second.is_revoked(reset)
+
+        await second.sync()
+        assert second.is_revoked(logged_out) and second.is_revoked(reset)
+        assert second.stats() == {"revoked_tokens": 1, "revoked_users": 1, "syncs": 2}
+
+        # Süresi dolmuş kayıtlar yüklenmez
+        _, expired = signer(ttl=timedelta(seconds=-1)).issue("user_3")
+        await first.revoke_token(expired)
+        fresh = RevocationList(AsyncCollection(collection))
+        await fresh.sync()
+        assert fresh.stats()["revoked_tokens"] == 1
+        assert not fresh.is_revoked(expired)
+
+    asyncio.run(scenario())
+
+
+def test_newer_reset_replaces_older_one():
+    revocations = RevocationList(None)
+    expires = signer().issue("user_1")[1].expires_at
+    revocations._apply({"user_id": "user_1", "not_before_ms": 2000, "expires_at": expires})
+    revocations._apply({"user_id": "user_1", "not_before_ms": 1000, "expires_at": expires})
+    claims = signer().issue("user_1")[1]
+    assert revocations.is_revoked(claims._replace(issued_ms=1500))
+    assert not revocations.is_revoked(claims._replace(issued_ms=2000))
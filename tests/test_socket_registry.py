@@ -0,0 +1,63 @@
+from socket_registry import SocketRegistry
+
+
+def test_bind_and_rebind():
+    registry = SocketRegistry()
+    registry.bind("sid1", "u1")
+    registry.bind("sid1", None)
+    assert registry.user_of("sid1") == "u1" and registry.sid_of("u1") == "sid1"
+
+    # Aynı soket başka bir kullanıcıya geçerse eski eşleme silinir
+    registry.bind("sid1", "u2")
+    assert registry.sid_of("u1") is None and registry.sid_of("u2") == "sid1"
+
+
+def test_reconnect_keeps_the_new_sid_when_the_old_one_drops():
+    registry = SocketRegistry()
+    registry.bind("old", "u1")
+    registry.enqueue("old", "career-path")
+    registry.bind("new", "u1")
+    assert registry.sid_of("u1") == "new"
+
+    # Eski soketin kopması yeni bağlantıyı silmez
+    dropped = registry.drop("old")
+    assert dropped == {"user_id": "u1", "queue_mode": "career-path", "room_id": None, "private_code": None}
+    assert registry.sid_of("u1") == "new" and registry.user_of("new") == "u1"
+    assert registry.gauges()["connected_users"] == 1
+
+
+def test_queue_and_room_bookkeeping():
+    registry = SocketRegistry()
+    registry.enqueue("a", "value-guess")
+    assert registry.queue_of("a") == "value-guess"
+    assert registry.dequeue("a") == "value-guess" and registry.dequeue("a") is None
+
+    registry.join_room("a", "room1")
+    registry.join_room("b", "room1")
+    registry.join_room("a", "room2")
+    assert registry.room_of("a") == "room2"
+    assert registry.gauges()["rooms"] == 2
+
+    assert registry.leave_room("b") == "room1"
+    # Boşalan oda listeden çıkar
+    assert registry.gauges()["rooms"] == 1
+
+    registry.join_room("b", "room2")
+    assert registry.close_room("room2") == {"a", "b"}
+    assert registry.room_of("a") is None and registry.room_of("b") is None
+    assert registry.close_room("room2") == set()
+
+
+def test_drop_reports_and_clears_everything():
+    registry = SocketRegistry()
+    registry.bind("sid1", "u1")
+    registry.join_room("sid1", "room1")
+    registry.host_private_room("sid1", "ABC123")
+    assert registry.drop("sid1") == {
+        "user_id": "u1", "queue_mode": None, "room_id": "room1", "private_code": "ABC123"
+    }
+    assert registry.gauges() == {
+        "connected_users": 0, "queued_users": 0, "in_game_users": 0, "rooms": 0, "open_private_rooms": 0
+    }
+    assert registry.drop("sid1") == {"user_id": None, "queue_mode": None, "room_id": None, "private_code": None}
+    assert registry.release_private_room("sid1") is None
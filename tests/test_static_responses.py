@@ -0,0 +1,48 @@
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from static_responses import StaticResponse, _etag_matches
+
+ETAG = '"abc123"'
+
+
+def request_with(if_none_match=None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_etag_matching():
+    assert _etag_matches("*", ETAG)
+    assert _etag_matches(' * ', ETAG)
+    assert _etag_matches('"abc123"', ETAG)
+    assert _etag_matches('"old", "abc123" ,"other"', ETAG)
+    # Zayıf karşılaştırma: W/ öneki her iki tarafta da yok sayılır
+    assert _etag_matches('W/"abc123"', ETAG)
+    assert _etag_matches('"abc123"', 'W/"abc123"')
+
+    assert not _etag_matches(None, ETAG)
+    assert not _etag_matches("", ETAG)
+    assert not _etag_matches('"abc12"', ETAG)
+    assert not _etag_matches('abc123', ETAG)
+    assert not _etag_matches('"old", W/"other"', ETAG)
+
+
+def test_body_matches_json_response_and_304_when_unchanged():
+    content = {"leagues": [{"name": "Altın", "min_elo": 1400}], "ratio": 0.5}
+    response = StaticResponse(content, max_age=60)
+    assert response.body == JSONResponse(content).body
+
+    full = response.respond(request_with())
+    assert full.status_code == 200 and full.body == response.body
+    assert full.headers["etag"] == response.etag
+    assert full.headers["cache-control"] == "public, max-age=60"
+
+    cached = response.respond(request_with(f'W/{response.etag}'))
+    assert cached.status_code == 304 and cached.body == b""
+    assert cached.headers["etag"] == response.etag
+
+    assert response.respond(request_with('"stale"')).status_code == 200
+    assert response.stats() == {"bytes": len(response.body), "hits": 3, "not_modified": 1}
+
+    # İçerik değişirse etiket de değişir
+    assert StaticResponse({**content, "ratio": 0.25}).etag != response.etag
@@ -0,0 +1,177 @@
+import asyncio
+import random
+
+import mongomock
+import pytest
+
+from user_search import (
+    EXACT, FUZZY, INFIX, PREFIX, START, TIERS, UserSearch, UsernameIndex, decode_cursor, encode_cursor,
+    one_edit_neighbors, username_fields, username_key
+)
+
+
+class AsyncCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def sort(self, keys):
+        self.cursor = self.cursor.sort(keys)
+        return self
+
+    def limit(self, count):
+        self.cursor = self.cursor.limit(count)
+        return self
+
+    async def to_list(self, length):
+        return list(self.cursor)[:length]
+
+    def __aiter__(self):
+        async def iterate():
+            for doc in self.cursor:
+                yield doc
+
+        return iterate()
+
+
+class AsyncUsers:
+    """Async stand-in for db.users over one mongomock collection"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def find(self, query, projection=None):
+        return AsyncCursor(self.collection.find(query, projection))
+
+    async def bulk_write(self, operations, ordered=True):
+        return self.collection.bulk_write(operations, ordered=ordered)
+
+    def rename(self, user_id: str, username: str):
+        self.collection.update_one({"user_id": user_id}, {"$set": {"username": username, **username_fields(username)}})
+
+
+def users_collection(names: dict) -> AsyncUsers:
+    collection = mongomock.MongoClient(tz_aware=True).db.users
+    for user_id, username in names.items():
+        # username_key yok: build() doldurur
+        collection.insert_one({"user_id": user_id, "username": username})
+    return AsyncUsers(collection)
+
+
+def expected_ranks(names: dict, query: str, exclude=None) -> list:
+    """Brute-force tiering over every key"""
+    ranks = []
+    for user_id, username in names.items():
+        key = username_key(username)
+        if user_id == exclude or not key:
+            continue
+        if key == query:
+            ranks.append((EXACT, key, user_id))
+        elif key.startswith(query):
+            ranks.append((PREFIX, key, user_id))
+        elif len(query) >= 3 and query in key:
+            ranks.append((INFIX, key, user_id))
+        elif len(query) >= 4 and key in one_edit_neighbors(query, "".join(sorted(set(key)))):
+            ranks.append((FUZZY, key, user_id))
+    return sorted(ranks)
+
+
+def test_username_key_and_cursor():
+    assert username_key("Ayşe K") == "aysek"
+    assert username_key(None) == ""
+    rank = (INFIX, "aysek", "user_1")
+    assert decode_cursor(encode_cursor(rank)) == rank
+    assert decode_cursor(None) == START
+    for bad in ("nope", encode_cursor((9, "a", "b")), encode_cursor((0, 1, "b"))):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+
+def test_one_edit_neighbors():
+    neighbors = one_edit_neighbors("abc", "abcx")
+    assert {"bc", "ac", "ab", "bac", "acb", "xbc", "abx", "xabc", "abcx", "abxc"} <= neighbors
+    assert "abc" not in neighbors and "cab" not in neighbors
+    assert all(abs(len(n) - 3) <= 1 for n in neighbors)
+
+
+def test_put_and_remove_keep_postings_sorted_and_clean():
+    index = UsernameIndex()
+    index.load([("u2", "Kerem"), ("u1", "Kerem"), ("u3", "Ekrem")])
+    assert index._users_by_key["kerem"] == ["u1", "u2"]
+
+    index.put("u1", "Kerem")
+    index.put("u4", "Kerem")
+    assert index._users_by_key["kerem"] == ["u1", "u2", "u4"]
+    index.put("u3", "Zeynep")
+    assert "ekrem" not in index._users_by_key
+    assert all("ekrem" not in posting for posting in index._postings.values())
+    assert "zeynep" in index._postings["eyn"]
+    assert "z" in index._alphabet_text
+
+    for user_id in ("u1", "u2", "u4"):
+        index.put(user_id, None)
+    assert "kerem" not in index._users_by_key
+    assert all("kerem" not in posting for posting in index._postings.values())
+    assert index.stats()["users"] == 1
+    for posting in index._postings.values():
+        assert posting == sorted(posting)
+
+
+def test_infix_and_fuzzy_match_brute_force():
+    rng = random.Random(25)
+    names = {f"u{i:03d}": "".join(rng.choice("abcde") for _ in range(rng.randrange(3, 8))) for i in range(400)}
+    index = UsernameIndex()
+    index.load(names.items())
+    for query in ("abc", "bcd", "abca", "eded", "aabb"):
+        expected = expected_ranks(names, query)
+        assert index.infix(query, START, None, 1000) == [r for r in expected if r[0] == INFIX]
+        assert index.fuzzy(query, START, None, 1000) == [r for r in expected if r[0] == FUZZY]
+
+
+def test_cursor_pages_cover_every_tier_without_gaps_or_repeats():
+    async def scenario():
+        rng = random.Random(26)
+        names = {"me": "kerem"}
+        for i in range(150):
+            names[f"u{i:03d}"] = rng.choice(["kerem", "keremx", "akerem", "kerm", "kerem" + str(i), "ali", "kereme"])
+        users = users_collection(names)
+        search = UserSearch(users)
+        await search.build()
+        assert search.backfilled == len(names)
+
+        expected = expected_ranks(names, "kerem", exclude="me")
+        assert {rank[0] for rank in expected} == {EXACT, PREFIX, INFIX, FUZZY}
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            hits, cursor = await search.search("Kerem", exclude="me", limit=7, cursor=cursor)
+            seen.extend(hits)
+            pages += 1
+            if cursor is None:
+                break
+        assert [(hit.match, hit.user_id) for hit in seen] == [(TIERS[rank[0]], rank[2]) for rank in expected]
+        assert pages == -(-len(expected) // 7)
+
+    asyncio.run(scenario())
+
+
+def test_user_renamed_on_another_worker_is_not_returned_twice():
+    async def scenario():
+        names = {"u1": "ahmetcan", "u2": "mehmet"}
+        users = users_collection(names)
+        this_worker, other_worker = UserSearch(users), UserSearch(users)
+        await this_worker.build()
+        await other_worker.build()
+
+        # Diğer worker adı değiştirdi; bu worker'ın indeksi henüz eski anahtarı tutuyor
+        users.rename("u1", "metin")
+        other_worker.updated("u1", "metin")
+        assert this_worker.index.key_of("u1") == "ahmetcan"
+
+        hits, _ = await this_worker.search("met")
+        assert [(hit.match, hit.user_id) for hit in hits] == [("prefix", "u1"), ("infix", "u2")]
+        assert this_worker.index.key_of("u1") == "metin"
+
+        await this_worker.refresh()
+        assert this_worker.index.key_of("u1") == "metin"
+
+    asyncio.run(scenario())